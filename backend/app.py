@@ -1,19 +1,39 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 from bson import ObjectId
 import os
+import json
+import base64
+import hashlib
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 from typing import Optional
 from model import (
+    BudgetPreview,
+    extract_playlist_id,
+    fetch_course_details,
     fetch_playlist_details,
-    create_schedule_time_based,
-    create_schedule_day_based,
+    iter_playlist_details,
+    iter_schedule_time_based,
+    plan_schedule,
+    reschedule_days,
     validate_playlist_url,
     get_schedule_summary
 )
+from cache import ExpiringCache, ResponseCache, create_playlist_cache
+from codec import FULL, JSON, SCHEDULE_FORMS, body_types, compress, content_codings, dumps, encode_schedule
+from chat import build_prompt, build_schedule_context, create_chat_client, response_key, stream_answer
+from fetcher import FetchTimeout
+from jobs import create_job_queue, format_job
+from storage import COMPLETED_COUNT, ScheduleStore
+from progress import ProgressCoalescer
+from rollups import ProgressRollups, days_rollup, schedule_status
+from search import TitleIndex
+from singleflight import SingleFlight, create_flight_lock
+import metrics
+from health import CachedCheck, DependencyMonitor, liveness
+from providers import get_database, get_genai, get_mongo_client, lazy
 
 # Load environment variables
 load_dotenv()
@@ -21,28 +41,132 @@ load_dotenv()
 app = Flask(__name__)
 
 # Updated CORS configuration
+CORS_ORIGINS = ["http://localhost:3000"]
 CORS(app, resources={
     r"/*": {
-        "origins": ["http://localhost:3000"],
+        "origins": CORS_ORIGINS,
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "X-Server-Timing"],
+        "expose_headers": ["Content-Type", "Authorization", "Server-Timing"],
         "supports_credentials": True,
         "max_age": 120
     }
 })
 
-# MongoDB connection
+# MongoDB settings; clients and services below are created on first use
 MONGO_URI = os.getenv('MONGODB_URI')
 DB_NAME = os.getenv('DB_NAME', 'your_database_name')
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-schedules_collection = db.schedules
-
-# Configure Gemini
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-pro')
+
+def get_schedules_collection():
+    return get_database().schedules
+
+@lazy
+def get_schedule_store():
+    """Schedule store ('embedded' or 'normalized' layout, 'compact' or 'full' videos); create_app ensures its indexes."""
+    return ScheduleStore(
+        get_schedules_collection(),
+        get_database().schedule_videos,
+        layout=os.getenv('SCHEDULE_STORAGE_LAYOUT', 'embedded'),
+        encoding=os.getenv('SCHEDULE_VIDEO_ENCODING', 'compact')
+    )
+
+@lazy
+def get_progress_writer():
+    # Progress toggles for a schedule that arrive while it is being written are merged into its next write
+    return ProgressCoalescer(
+        write_progress,
+        locate=get_schedule_store().present_links,
+        coalesce=os.getenv('PROGRESS_COALESCE', 'true').lower() in ('1', 'true', 'yes')
+    )
+
+@lazy
+def get_progress_rollups():
+    # Per-schedule rollups live on the schedules, per-user ones in user_progress,
+    # re-summed in the background ROLLUP_USER_DELAY seconds after a change
+    return ProgressRollups(
+        get_schedules_collection(),
+        get_database().schedule_videos,
+        get_database().user_progress,
+        user_delay=float(os.getenv('ROLLUP_USER_DELAY', 1.0))
+    )
+
+def add_rollup(schedule_doc):
+    """Count the progress rollup of a schedule document about to be stored."""
+    schedule_doc['rollup'] = days_rollup(schedule_doc['schedule_data'])
+    return schedule_doc
+
+def rollup_users_changed(user_ids):
+    """Queue the user rollups of written schedules' owners; a failure only leaves them stale until the next write."""
+    try:
+        get_progress_rollups().users_changed(user_ids)
+    except Exception as e:
+        print(f"Error refreshing progress rollups: {str(e)}")
+
+def apply_progress_rollup(schedule_id, videos, updates):
+    """Move a schedule's rollup past a progress write, given its matched videos from before the write."""
+    try:
+        with metrics.stage('rollup'):
+            get_progress_rollups().apply_progress(schedule_id, videos, updates)
+    except Exception as e:
+        print(f"Error refreshing progress rollups: {str(e)}")
+
+def write_progress(schedule_id, updates):
+    store = get_schedule_store()
+    # The rollup deltas need each video's flag from before the write
+    videos = store.locate_videos(schedule_id, list(updates))
+    if not videos:
+        return False
+    found = store.set_videos_completed(schedule_id, updates)
+    if found:
+        apply_progress_rollup(schedule_id, videos, updates)
+    return found
+
+def ensure_indexes(store):
+    """Create the indexes the schedule endpoints rely on (idempotent)."""
+    # User schedule listing, newest first, with (created_at, _id) as the pagination cursor
+    get_schedules_collection().create_index([('userId', 1), ('created_at', -1), ('_id', -1)])
+    store.ensure_indexes()
+
+@lazy
+def get_playlist_cache():
+    # Playlist metadata cache ('memory' per process, 'mongo' shared by all workers)
+    return create_playlist_cache(
+        os.getenv('PLAYLIST_CACHE_BACKEND', 'memory'),
+        collection=get_database().playlist_cache,
+        ttl_seconds=int(os.getenv('PLAYLIST_CACHE_TTL', 6 * 3600)),
+        max_entries=int(os.getenv('PLAYLIST_CACHE_MAX_ENTRIES', 256))
+    )
+
+# Serialised schedule responses, keyed by schedule ID and only served for a matching updated_at
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_ENTRIES', 512)),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MB', 64)) * 1024 * 1024
+)
+
+# Title lookup indexes for verify-video and video-context, per schedule version like the bodies above
+title_index_cache = ResponseCache(
+    max_entries=int(os.getenv('TITLE_INDEX_CACHE_ENTRIES', 256)),
+    max_bytes=int(os.getenv('TITLE_INDEX_CACHE_MB', 64)) * 1024 * 1024,
+    sizeof=lambda index: index.size
+)
+
+# Compact, columnar, MessagePack and compressed schedule bodies, per schedule version as {variant: body}
+encoded_cache = ResponseCache(
+    max_entries=int(os.getenv('ENCODED_CACHE_ENTRIES', 512)),
+    max_bytes=int(os.getenv('ENCODED_CACHE_MB', 64)) * 1024 * 1024,
+    sizeof=lambda variants: sum(map(len, variants.values()))
+)
+
+# JSON and MessagePack responses from this size up are compressed for clients that accept it
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+
+# Prepared what-if previews (prefix sums of what is left), per schedule version
+preview_cache = ResponseCache(
+    max_entries=int(os.getenv('PREVIEW_CACHE_ENTRIES', 128)),
+    max_bytes=int(os.getenv('PREVIEW_CACHE_MB', 32)) * 1024 * 1024,
+    sizeof=lambda preview: preview.size
+)
 
 # Helper Functions
 def validate_object_id(id_string: str) -> bool:
@@ -60,18 +184,594 @@ def format_schedule_response(schedule):
     schedule['userId'] = str(schedule['userId'])
     schedule['created_at'] = schedule['created_at'].isoformat()
     schedule['updated_at'] = schedule['updated_at'].isoformat()
+    # Served by the stats endpoints; cached bodies would carry it stale
+    schedule.pop('rollup', None)
     
     for day_schedule in schedule['schedule_data']:
         if isinstance(day_schedule['date'], datetime):
             day_schedule['date'] = day_schedule['date'].strftime('%Y-%m-%d')
     
-    return schedule# Middleware for handling preflight requests
+    return schedule
+
+# Top-level fields a schedule listing can be trimmed to with ?fields=
+LISTING_FIELDS = {
+    'title': '$title',
+    'summary': '$summary',
+    'status': '$status',
+    'schedule_type': '$schedule_type',
+    'settings': '$settings',
+    'playlist_url': '$playlist_url',
+    'playlist_urls': '$playlist_urls',
+    'created_at': '$created_at',
+    'updated_at': '$updated_at',
+    # Read from the denormalised summary counters; schedules written before
+    # they existed are counted server-side so the nested videos never leave MongoDB
+    'progress': {'$cond': [
+        {'$ne': [{'$type': '$summary.completedVideos'}, 'missing']},
+        {
+            'totalVideos': '$summary.totalVideos',
+            'completedVideos': '$summary.completedVideos'
+        },
+        {
+            'totalVideos': {'$sum': {'$map': {'input': '$schedule_data', 'as': 'day', 'in': {'$size': '$$day.videos'}}}},
+            'completedVideos': COMPLETED_COUNT
+        }
+    ]},
+    # Materialised progress rollup, with pace and percentages added when listed
+    'rollup': '$rollup'
+}
+
+def encode_cursor(schedule):
+    """Opaque pagination cursor pointing just after a listed schedule."""
+    raw = f"{schedule['created_at'].isoformat()}|{schedule['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    created_at, schedule_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), ObjectId(schedule_id)
+
+def schedule_version(schedule):
+    """Version tag of a stored schedule; every write bumps updated_at."""
+    return f"{schedule['_id']}-{int(schedule['updated_at'].timestamp() * 1000)}"
+
+def cached_schedule_bodies(schedules):
+    """Serialised formatted schedules for ``{_id, updated_at}`` heads, loading only cache misses.
+
+    Missing schedules are fetched in one query and cached under the version
+    they were read at.
+    """
+    bodies = {}
+    missing = []
+    for head in schedules:
+        body = response_cache.get(str(head['_id']), schedule_version(head))
+        if body is None:
+            missing.append(head['_id'])
+        else:
+            bodies[str(head['_id'])] = body
+    metrics.inc('learnfast_response_cache_total', len(bodies), result='hit')
+    metrics.inc('learnfast_response_cache_total', len(missing), result='miss')
+
+    if missing:
+        store = get_schedule_store()
+        for schedule in store.hydrate(list(get_schedules_collection().find({'_id': {'$in': missing}}))):
+            bodies.update(cache_schedule_body(schedule))
+    return bodies
+
+def cached_schedule_view(schedule_id, cache, build, view, projection=None):
+    """``(version, build(schedule))`` for the current version of a schedule; None if it does not exist.
+
+    Only the version is read while the cached view is current; the schedule
+    itself is loaded (with ``projection``) and rebuilt once per version.
+    """
+    head = get_schedules_collection().find_one({'_id': ObjectId(schedule_id)}, {'updated_at': 1})
+    if not head:
+        return None
+    version = schedule_version(head)
+    value = cache.get(schedule_id, version)
+    metrics.inc('learnfast_schedule_view_cache_total', view=view, result='miss' if value is None else 'hit')
+    if value is not None:
+        return version, value
+
+    with metrics.stage(view):
+        schedule = get_schedule_store().get(schedule_id, projection)
+        if not schedule:
+            return None
+        version = schedule_version(schedule)
+        value = build(schedule)
+    cache.put(schedule_id, version, value)
+    return version, value
+
+def schedule_title_index(schedule_id):
+    """Title index of a schedule's current version, or None if the schedule does not exist."""
+    found = cached_schedule_view(
+        schedule_id,
+        title_index_cache,
+        lambda schedule: TitleIndex(schedule['schedule_data']),
+        'title_index',
+        projection={'schedule_data': 1, 'layout': 1, 'updated_at': 1}
+    )
+    return found[1] if found else None
+
+def invalidate_schedule(schedule_id):
+    """Drop every cached view of a schedule after writing it."""
+    for cache in (response_cache, encoded_cache, title_index_cache, chat_context_cache, preview_cache):
+        cache.invalidate(schedule_id)
+
+def cache_schedule_body(schedule):
+    """Format and serialise a loaded schedule, cache it, and return ``{schedule_id: body}``."""
+    schedule_id = str(schedule['_id'])
+    version = schedule_version(schedule)
+    body = app.json.dumps(format_schedule_response(schedule), separators=(',', ':')).encode()
+    response_cache.put(schedule_id, version, body)
+    return {schedule_id: body}
+
+def schedules_etag(heads):
+    """ETag for a list of schedules, derived from their versions only."""
+    return hashlib.sha1('|'.join(schedule_version(head) for head in heads).encode()).hexdigest()
+
+def join_schedule_bodies(heads, bodies):
+    # Schedules deleted since the version lookup are left out
+    return b'{"schedules":[' + b','.join(
+        bodies[str(head['_id'])] for head in heads if str(head['_id']) in bodies
+    ) + b']}\n'
+
+def listing_pipeline(user_id, fields, limit, cursor):
+    """Aggregation pipeline for one page of a projected schedule listing. Raises ScheduleError."""
+    fields = fields.split(',') if fields else ['title', 'summary', 'status', 'progress', 'created_at', 'updated_at']
+    unknown = [field for field in fields if field not in LISTING_FIELDS]
+    if unknown:
+        raise ScheduleError(f"Unknown fields: {', '.join(unknown)}")
+
+    try:
+        limit = min(max(int(limit or 20), 1), 100)
+    except ValueError:
+        raise ScheduleError('Limit must be a number')
+
+    match = {'userId': ObjectId(user_id)}
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except Exception:
+            raise ScheduleError('Invalid cursor')
+        match['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]
+
+    projection = {field: LISTING_FIELDS[field] for field in fields}
+    # The cursor needs created_at even when the client did not ask for it
+    projection['cursor_created_at'] = '$created_at'
+    return limit, [
+        {'$match': match},
+        {'$sort': {'created_at': -1, '_id': -1}},
+        {'$limit': limit + 1},
+        {'$project': projection}
+    ]
+
+def listing_page(schedules, limit):
+    """Response body for a listing page fetched with ``limit + 1`` rows."""
+    next_cursor = None
+    if len(schedules) > limit:
+        schedules = schedules[:limit]
+        last = schedules[-1]
+        next_cursor = encode_cursor({'created_at': last['cursor_created_at'], '_id': last['_id']})
+    for schedule in schedules:
+        del schedule['cursor_created_at']
+
+    return {
+        'schedules': [format_schedule_listing(schedule) for schedule in schedules],
+        'nextCursor': next_cursor
+    }
+
+def conditional_json(etag, build_body, mimetype=JSON, coding=None):
+    """304 when the client already holds ``etag``, otherwise the bytes from ``build_body()``.
+
+    ``build_body`` returns the body already compressed with ``coding``, if
+    any; each coding gets its own ETag.
+    """
+    if coding:
+        etag = f"{etag}-{coding}"
+    if request.if_none_match.contains(etag):
+        metrics.inc('learnfast_response_cache_total', result='not_modified')
+        response = Response(status=304)
+    else:
+        response = Response(build_body(), mimetype=mimetype)
+        if coding:
+            response.headers['Content-Encoding'] = coding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate on every use
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def response_coding(req):
+    """Content coding to compress the response to ``req`` with, or None."""
+    return req.accept_encodings.best_match(content_codings())
+
+def finished_response_coding(response, req, streamed):
+    """Content coding a finished response to ``req`` is compressed with, or None; shared by the Flask and Quart apps.
+
+    Only large 200 JSON and MessagePack bodies qualify; streams and
+    pre-compressed bodies pass through.
+    """
+    if (response.status_code != 200 or streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in body_types()):
+        return None
+    response.vary.add('Accept-Encoding')
+    coding = response_coding(req)
+    if coding and (response.content_length or 0) >= COMPRESS_MIN_BYTES:
+        return coding
+    return None
+
+def compress_body(body, coding):
+    with metrics.stage('compress'):
+        return compress(body, coding)
+
+def schedule_variant(req):
+    """``(form, expand_urls, mimetype, coding)`` a schedule detail request asks for. Raises ScheduleError.
+
+    ``?format=`` picks one of SCHEDULE_FORMS and ``?expand=urls`` keeps the
+    video URLs in the compact forms; Accept and Accept-Encoding pick
+    MessagePack and compression.
+    """
+    form = req.args.get('format', FULL)
+    if form not in SCHEDULE_FORMS:
+        raise ScheduleError(f"Unknown format: {form}")
+    expand_urls = form != FULL and req.args.get('expand') == 'urls'
+    mimetype = req.accept_mimetypes.best_match(body_types()) or JSON
+    return form, expand_urls, mimetype, response_coding(req)
+
+def is_plain_variant(variant):
+    """Whether a variant is the uncompressed full JSON body kept in response_cache."""
+    form, _, mimetype, coding = variant
+    return (form, mimetype, coding) == (FULL, JSON, None)
+
+def schedule_variant_etag(head, variant):
+    form, expand_urls, mimetype, _ = variant
+    tags = [schedule_version(head)]
+    if form != FULL:
+        tags.append(form)
+    if expand_urls:
+        tags.append('urls')
+    if mimetype != JSON:
+        tags.append(mimetype.rsplit('/', 1)[-1])
+    return '-'.join(tags)
+
+def cached_variant(schedule_id, version, variant):
+    body = (encoded_cache.get(schedule_id, version) or {}).get(variant)
+    metrics.inc('learnfast_schedule_view_cache_total', view='encoded', result='miss' if body is None else 'hit')
+    return body
+
+def cache_variant(schedule_id, version, variant, body):
+    # Re-read so variants cached meanwhile by other requests are kept
+    variants = dict(encoded_cache.get(schedule_id, version) or {})
+    variants[variant] = body
+    encoded_cache.put(schedule_id, version, variants)
+
+def encode_schedule_body(schedule, variant):
+    """Serialise a loaded schedule in an uncompressed variant."""
+    form, expand_urls, mimetype, _ = variant
+    with metrics.stage('encode'):
+        return dumps({'schedule': encode_schedule(format_schedule_response(schedule), form, expand_urls)}, mimetype)
+
+def compress_variant(body, variant):
+    with metrics.stage('compress'):
+        return compress(body, variant[3])
+
+def schedule_variant_body(head, variant):
+    """Response body of a schedule in ``variant`` (see schedule_variant), built once per version.
+
+    Raises LookupError if the schedule no longer exists.
+    """
+    schedule_id = str(head['_id'])
+    version = schedule_version(head)
+    if is_plain_variant(variant):
+        body = cached_schedule_bodies([head]).get(schedule_id)
+        if body is None:
+            raise LookupError(schedule_id)
+        return b'{"schedule":' + body + b'}\n'
+
+    body = cached_variant(schedule_id, version, variant)
+    if body is not None:
+        return body
+    if variant[3]:
+        body = compress_variant(schedule_variant_body(head, variant[:3] + (None,)), variant)
+    else:
+        # The compact forms are built straight from the stored video records
+        schedule = get_schedule_store().get(schedule_id, expand=variant[0] == FULL)
+        if not schedule:
+            raise LookupError(schedule_id)
+        # A schedule written since the version lookup is served but not cached under the old version
+        current = schedule_version(schedule) == version
+        body = encode_schedule_body(schedule, variant)
+        if not current:
+            return body
+    cache_variant(schedule_id, version, variant, body)
+    return body
+
+def format_schedule_listing(schedule):
+    """Format a projected schedule listing entry."""
+    schedule['_id'] = str(schedule['_id'])
+    for field in ('created_at', 'updated_at'):
+        if isinstance(schedule.get(field), datetime):
+            schedule[field] = schedule[field].isoformat()
+    if schedule.get('rollup'):
+        schedule['rollup'] = schedule_status(schedule['rollup'], datetime.now().date())
+    return schedule
+
+def build_schedule_day(day, videos):
+    """Build a stored schedule_data entry for a 'Day N' key."""
+    return {
+        'day': day,
+        'date': (datetime.now() + timedelta(days=int(day.split()[1]) - 1)).strftime('%Y-%m-%d'),
+        'videos': videos
+    }
+
+def build_schedule_document(user_id, title, playlist_url, schedule_type, settings, schedule, summary=None, playlist_urls=None):
+    """Build the MongoDB document for a freshly generated schedule.
+
+    Multi-playlist courses keep their first playlist in ``playlist_url`` and
+    the full ordered list in ``playlist_urls``.
+    """
+    document = {
+        'userId': ObjectId(user_id),
+        'title': title,
+        'playlist_url': playlist_url,
+        'schedule_type': schedule_type,
+        'settings': settings,
+        'schedule_data': [build_schedule_day(day, videos) for day, videos in schedule.items()],
+        'summary': summary or get_schedule_summary(schedule),
+        'status': 'active',
+        'created_at': datetime.now(),
+        'updated_at': datetime.now()
+    }
+    if playlist_urls and len(playlist_urls) > 1:
+        document['playlist_urls'] = list(playlist_urls)
+    return document
+
+def format_sse(event, data):
+    """Serialise one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class ScheduleError(Exception):
+    """Schedule request failure carrying the HTTP status to report."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+MAX_COURSE_PLAYLISTS = int(os.getenv('MAX_COURSE_PLAYLISTS', 20))
+
+def request_playlist_urls(data):
+    """Ordered playlist URLs of a request: ``playlistUrls`` for a course, else ``[playlistUrl]``."""
+    playlist_urls = data.get('playlistUrls')
+    if playlist_urls is None:
+        return [data.get('playlistUrl')]
+    if not isinstance(playlist_urls, list) or not playlist_urls:
+        raise ScheduleError('playlistUrls must be a non-empty list')
+    if len(playlist_urls) > MAX_COURSE_PLAYLISTS:
+        raise ScheduleError(f'At most {MAX_COURSE_PLAYLISTS} playlists per schedule')
+    return playlist_urls
+
+def parse_schedule_settings(data, require_user=True):
+    """Validate a schedule request body and return its scheduling settings."""
+    required = ['scheduleType'] + (['userId'] if require_user else [])
+    if not all(data.get(field) for field in required) or not (data.get('playlistUrl') or data.get('playlistUrls')):
+        raise ScheduleError('Missing required fields')
+
+    try:
+        for playlist_url in request_playlist_urls(data):
+            validate_playlist_url(playlist_url)
+        if data['scheduleType'] == 'daily':
+            daily_hours = float(data.get('dailyHours', 2))
+            if int(daily_hours * 60) <= 10:
+                raise ScheduleError('Daily study time must be greater than 10 minutes')
+            return {'daily_hours': daily_hours}
+
+        target_days = int(data.get('targetDays', 7))
+        if target_days <= 0:
+            raise ScheduleError('Target days must be greater than 0')
+        return {'target_days': target_days}
+    except ValueError as e:
+        raise ScheduleError(str(e))
+
+def plan_request_schedule(data, settings, video_details):
+    """Run the scheduler a create request asks for; returns ``(schedule, summary)``."""
+    try:
+        if data.get('scheduleType') == 'daily':
+            return plan_schedule(
+                video_details,
+                daily_time_minutes=int(settings['daily_hours'] * 60),
+                completed_videos=data.get('completedVideos', []),
+                last_day_number=data.get('lastDayNumber', 0),
+                completed_video_details=data.get('completedVideoDetails', [])
+            )
+        return plan_schedule(
+            video_details,
+            num_days=settings['target_days'],
+            completed_videos=data.get('completedVideos', []),
+            last_day_number=data.get('lastDayNumber', 0),
+            completed_video_details=data.get('completedVideoDetails', []),
+            balanced=data.get('scheduleType') == 'balanced'
+        )
+    except Exception as e:
+        raise ScheduleError(str(e))
+
+@lazy
+def get_fetch_lock():
+    # 'local' coalesces identical fetches per process; 'mongo' also makes other
+    # workers wait for the fetch and read it from the (shared) playlist cache,
+    # so it refuses to run over a per-process cache those workers cannot see
+    backend_name = os.getenv('FETCH_COALESCE_BACKEND', 'local')
+    cache_backend = os.getenv('PLAYLIST_CACHE_BACKEND', 'memory')
+    if backend_name == 'mongo' and cache_backend != 'mongo':
+        raise RuntimeError(
+            f"FETCH_COALESCE_BACKEND=mongo needs the shared playlist cache; "
+            f"set PLAYLIST_CACHE_BACKEND=mongo (not '{cache_backend}')"
+        )
+    return create_flight_lock(
+        backend_name,
+        collection=get_database().fetch_locks,
+        lease_seconds=int(os.getenv('FETCH_LOCK_LEASE_SECONDS', 180)),
+        wait_seconds=int(os.getenv('FETCH_LOCK_WAIT_SECONDS', 120))
+    )
+
+@lazy
+def get_playlist_flights():
+    return SingleFlight(lock=get_fetch_lock())
+
+def playlist_flight_key(playlist_urls):
+    """Singleflight key of a playlist or course fetch."""
+    return 'playlists:' + ','.join(extract_playlist_id(url) or url for url in playlist_urls)
+
+def fetch_request_videos(data, progress=None):
+    """Fetch the videos of a request's playlist, or its merged course. Raises ScheduleError.
+
+    Concurrent requests for the same playlists share one fetch; only the
+    request that started it reports ``progress``.
+    """
+    playlist_urls = request_playlist_urls(data)
+
+    def fetch():
+        if len(playlist_urls) > 1:
+            return fetch_course_details(playlist_urls, cache=get_playlist_cache(), progress=progress)
+        return fetch_playlist_details(playlist_urls[0], cache=get_playlist_cache(), progress=progress)
+
+    try:
+        video_details = get_playlist_flights().do(playlist_flight_key(playlist_urls), fetch)
+    except FetchTimeout as e:
+        raise ScheduleError(f'Error fetching playlist: {str(e)}', 504)
+    except Exception as e:
+        raise ScheduleError(f'Error fetching playlist: {str(e)}')
+    if not video_details:
+        raise ScheduleError('No videos found in playlist')
+    # Shared with the other waiters, and schedulers decorate the records
+    return [dict(video) for video in video_details]
+
+def copy_completion(old_schedule, schedule_doc):
+    """Carry completion flags from a replaced schedule over to the same videos in a new one."""
+    completed_map = {
+        video['link']: video['completed']
+        for day in old_schedule['schedule_data']
+        for video in day['videos']
+    }
+    for day in schedule_doc['schedule_data']:
+        for video in day['videos']:
+            if video['link'] in completed_map:
+                video['completed'] = completed_map[video['link']]
+
+def run_schedule_pipeline(data, progress=None):
+    """Fetch the playlist, build the schedule and store it. Raises ScheduleError."""
+    settings = parse_schedule_settings(data)
+
+    # Extract request data
+    user_id = data.get('userId')
+    playlist_urls = request_playlist_urls(data)
+    schedule_type = data.get('scheduleType')
+    title = data.get('title', 'Untitled Schedule')
+    is_adjustment = data.get('isAdjustment', False)
+    old_schedule_id = data.get('oldScheduleId')
+
+    # Fetch video details
+    video_details = fetch_request_videos(data, progress=progress)
+
+    # Generate schedule based on type; durations are parsed once for scheduling and summary
+    schedule, summary = plan_request_schedule(data, settings, video_details)
+
+    # Format and save schedule to MongoDB
+    schedule_doc = build_schedule_document(
+        user_id, title, playlist_urls[0], schedule_type, settings, schedule, summary, playlist_urls=playlist_urls
+    )
+
+    # If this is an adjustment, handle the old schedule
+    if is_adjustment and old_schedule_id:
+        try:
+            old_schedule = get_schedule_store().get(old_schedule_id)
+            if old_schedule:
+                copy_completion(old_schedule, schedule_doc)
+
+                # Delete old schedule
+                get_schedule_store().delete(old_schedule_id)
+                invalidate_schedule(old_schedule_id)
+        except Exception as e:
+            raise ScheduleError(f'Error handling schedule adjustment: {str(e)}', 500)
+
+    # Save to MongoDB
+    with metrics.stage('store'):
+        schedule_id = get_schedule_store().insert(add_rollup(schedule_doc))
+    rollup_users_changed([schedule_doc['userId']])
+
+    return {
+        'message': 'Schedule created successfully',
+        'scheduleId': str(schedule_id),
+        'schedule': schedule,
+        'summary': schedule_doc['summary']
+    }
+
+def run_schedule_job(payload, progress):
+    """Job queue handler: run the pipeline and keep only what the status endpoint reports."""
+    try:
+        result = run_schedule_pipeline(payload, progress=progress)
+    except ScheduleError as e:
+        raise Exception(e.message)
+    return {'scheduleId': result['scheduleId'], 'summary': result['summary']}
+
+@lazy
+def get_job_queue():
+    # Background schedule jobs ('local' worker pool or 'mongo' queue shared by all workers)
+    return create_job_queue(
+        os.getenv('JOB_QUEUE_BACKEND', 'local'),
+        run_schedule_job,
+        collection=get_database().schedule_jobs,
+        workers=int(os.getenv('JOB_WORKERS', 4))
+    )
+
+# Return a Server-Timing breakdown when the client sends this header (or always, if enabled)
+SERVER_TIMING_HEADER = 'X-Server-Timing'
+SERVER_TIMING_ALWAYS = os.getenv('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# Per-request instrumentation
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.inc('learnfast_http_requests_total', route=route, method=request.method, status=str(response.status_code))
+    metrics.registry.observe('learnfast_http_request_duration_seconds', elapsed, route=route, method=request.method)
+
+    timings = metrics.current_timings()
+    if timings is not None and (SERVER_TIMING_ALWAYS or request.headers.get(SERVER_TIMING_HEADER)):
+        response.headers['Server-Timing'] = timings.server_timing(total=elapsed)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli other large JSON and MessagePack bodies."""
+    coding = finished_response_coding(response, request, response.is_streamed or response.direct_passthrough)
+    if coding:
+        response.set_data(compress_body(response.get_data(), coding))
+        response.headers['Content-Encoding'] = coding
+    return response
+
+@app.teardown_request
+def end_request_timer(exc):
+    metrics.end_request()
+
+# Middleware for handling preflight requests
 @app.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
         response = make_response()
         response.headers.add("Access-Control-Allow-Origin", "http://localhost:3000")
-        response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
+        response.headers.add("Access-Control-Allow-Headers", f"Content-Type,Authorization,{SERVER_TIMING_HEADER}")
         response.headers.add("Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS")
         response.headers.add("Access-Control-Allow-Credentials", "true")
         return response
@@ -85,13 +785,26 @@ def get_schedule_detail(schedule_id):
         if not validate_object_id(schedule_id):
             return jsonify({'error': 'Invalid schedule ID format'}), 400
 
-        schedule = schedules_collection.find_one({'_id': ObjectId(schedule_id)})
-        
-        if not schedule:
+        # Only the version travels for a revalidation or a cached body
+        head = get_schedules_collection().find_one({'_id': ObjectId(schedule_id)}, {'updated_at': 1})
+        if not head:
             return jsonify({'error': 'Schedule not found'}), 404
 
-        formatted_schedule = format_schedule_response(schedule)
-        return jsonify({'schedule': formatted_schedule})
+        variant = schedule_variant(request)
+        response = conditional_json(
+            schedule_variant_etag(head, variant),
+            lambda: schedule_variant_body(head, variant),
+            mimetype=variant[2],
+            coding=variant[3]
+        )
+        response.vary.add('Accept')
+        return response
+
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+
+    except LookupError:
+        return jsonify({'error': 'Schedule not found'}), 404
 
     except Exception as e:
         print(f"Error fetching schedule: {str(e)}")
@@ -107,125 +820,198 @@ def create_schedule():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        # Extract request data
-        user_id = data.get('userId')
-        playlist_url = data.get('playlistUrl')
-        schedule_type = data.get('scheduleType')
-        title = data.get('title', 'Untitled Schedule')
-        completed_videos = data.get('completedVideos', [])
-        last_day_number = data.get('lastDayNumber', 0)
-        completed_video_details = data.get('completedVideoDetails', [])
-        is_adjustment = data.get('isAdjustment', False)
-        old_schedule_id = data.get('oldScheduleId')
-
-        # Validate required fields
-        if not all([user_id, playlist_url, schedule_type]):
-            return jsonify({'error': 'Missing required fields'}), 400
-
-        # Validate playlist URL
-        try:
-            validate_playlist_url(playlist_url)
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
+        # Validate before queuing or fetching anything
+        parse_schedule_settings(data)
+
+        # Hand slow playlists to the job queue and let the client poll
+        if data.get('async'):
+            payload = {key: value for key, value in data.items() if key != 'async'}
+            job_id = get_job_queue().submit(payload)
+            return jsonify({
+                'message': 'Schedule job queued',
+                'jobId': job_id,
+                'statusUrl': f'/api/jobs/{job_id}'
+            }), 202
+
+        return jsonify(run_schedule_pipeline(data))
 
-        # Fetch video details
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error creating schedule: {str(e)}")
+        return jsonify({'error': 'Failed to create schedule'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+def get_job_status(job_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        job = get_job_queue().get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify({'job': format_job(job)})
+    except Exception as e:
+        print(f"Error fetching job: {str(e)}")
+        return jsonify({'error': 'Failed to fetch job'}), 500
+
+@app.route('/api/schedule/stream', methods=['POST', 'OPTIONS'])
+def create_schedule_stream():
+    """Create a schedule, pushing each day to the client as soon as it is closed."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    try:
+        settings = parse_schedule_settings(data)
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+
+    user_id = data['userId']
+    playlist_urls = request_playlist_urls(data)
+    schedule_type = data['scheduleType']
+    title = data.get('title', 'Untitled Schedule')
+
+    def generate():
+        schedule = {}
         try:
-            video_details = fetch_playlist_details(playlist_url)
-            if not video_details:
-                return jsonify({'error': 'No videos found in playlist'}), 400
+            if len(playlist_urls) > 1:
+                # Courses are merged before scheduling, so days start once every playlist is in
+                videos = iter(fetch_course_details(playlist_urls, cache=get_playlist_cache()))
+            else:
+                videos = iter_playlist_details(playlist_urls[0], cache=get_playlist_cache())
+            if schedule_type == 'daily':
+                # Time-based days only depend on the videos before them, so stream as we fetch
+                days = iter_schedule_time_based(videos, int(settings['daily_hours'] * 60))
+            else:
+                # Day-based cuts need the total duration up front
+                days = plan_schedule(
+                    list(videos),
+                    num_days=settings['target_days'],
+                    balanced=schedule_type == 'balanced'
+                )[0].items()
+
+            for day, day_videos in days:
+                schedule[day] = day_videos
+                yield format_sse('day', build_schedule_day(day, day_videos))
+
+            if not schedule:
+                yield format_sse('error', {'error': 'No videos found in playlist'})
+                return
+
+            schedule_doc = build_schedule_document(
+                user_id, title, playlist_urls[0], schedule_type, settings, schedule, playlist_urls=playlist_urls
+            )
+            schedule_id = get_schedule_store().insert(add_rollup(schedule_doc))
+            rollup_users_changed([schedule_doc['userId']])
+            yield format_sse('done', {
+                'message': 'Schedule created successfully',
+                'scheduleId': str(schedule_id),
+                'summary': schedule_doc['summary']
+            })
         except Exception as e:
-            return jsonify({'error': f'Error fetching playlist: {str(e)}'}), 400
+            print(f"Error streaming schedule: {str(e)}")
+            yield format_sse('error', {'error': f'Failed to create schedule: {str(e)}'})
 
-        # Generate schedule based on type
-        if schedule_type == 'daily':
-            try:
-                daily_hours = float(data.get('dailyHours', 2))
-                daily_minutes = int(daily_hours * 60)
-                if daily_minutes <= 10:
-                    return jsonify({'error': 'Daily study time must be greater than 10 minutes'}), 400
-                
-                schedule = create_schedule_time_based(
-                    video_details=video_details,
-                    daily_time_minutes=daily_minutes,
-                    completed_videos=completed_videos,
-                    last_day_number=last_day_number,
-                    completed_video_details=completed_video_details
-                )
-                settings = {'daily_hours': daily_hours}
-            except ValueError as e:
-                return jsonify({'error': str(e)}), 400
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+BULK_IMPORT_MAX_USERS = int(os.getenv('BULK_IMPORT_MAX_USERS', 2000))
+
+def split_cohort(user_ids):
+    """Split requested user IDs into the ones to import and ``{index: error}`` for the rest."""
+    accepted = {}
+    rejected = {}
+    for index, user_id in enumerate(user_ids):
+        if not isinstance(user_id, str) or not validate_object_id(user_id):
+            rejected[index] = 'Invalid user ID format'
+        elif user_id in accepted:
+            rejected[index] = 'Duplicate user ID'
         else:
-            try:
-                target_days = int(data.get('targetDays', 7))
-                if target_days <= 0:
-                    return jsonify({'error': 'Target days must be greater than 0'}), 400
-                
-                schedule = create_schedule_day_based(
-                    video_details=video_details,
-                    num_days=target_days,
-                    completed_videos=completed_videos,
-                    last_day_number=last_day_number,
-                    completed_video_details=completed_video_details
-                )
-                settings = {'target_days': target_days}
-            except ValueError as e:
-                return jsonify({'error': str(e)}), 400
-
-        # Format and save schedule to MongoDB
-        schedule_doc = {
-            'userId': ObjectId(user_id),
-            'title': title,
-            'playlist_url': playlist_url,
-            'schedule_type': schedule_type,
-            'settings': settings,
-            'schedule_data': [
-                {
-                    'day': day,
-                    'date': (datetime.now() + timedelta(days=int(day.split()[1]) - 1)).strftime('%Y-%m-%d'),
-                    'videos': videos
-                }
-                for day, videos in schedule.items()
-            ],
-            'summary': get_schedule_summary(schedule),
-            'status': 'active',
-            'created_at': datetime.now(),
-            'updated_at': datetime.now()
-        }
+            accepted[user_id] = index
+    return accepted, rejected
 
-        # If this is an adjustment, handle the old schedule
-        if is_adjustment and old_schedule_id:
-            try:
-                old_schedule = schedules_collection.find_one({'_id': ObjectId(old_schedule_id)})
-                if old_schedule:
-                    # Copy completion status from old schedule
-                    completed_map = {
-                        video['link']: video['completed']
-                        for day in old_schedule['schedule_data']
-                        for video in day['videos']
-                    }
-                    for day in schedule_doc['schedule_data']:
-                        for video in day['videos']:
-                            if video['link'] in completed_map:
-                                video['completed'] = completed_map[video['link']]
-                    
-                    # Delete old schedule
-                    schedules_collection.delete_one({'_id': ObjectId(old_schedule_id)})
-            except Exception as e:
-                return jsonify({'error': f'Error handling schedule adjustment: {str(e)}'}), 500
+def run_bulk_import(data, user_ids):
+    """Fetch and schedule the playlist once, then store one copy per user. Raises ScheduleError."""
+    settings = parse_schedule_settings(data, require_user=False)
+    accepted, rejected = split_cohort(user_ids)
+    results = [None] * len(user_ids)
+    for index, error in rejected.items():
+        results[index] = {'userId': user_ids[index], 'error': error}
 
-        # Save to MongoDB
-        result = schedules_collection.insert_one(schedule_doc)
-        
-        return jsonify({
-            'message': 'Schedule created successfully',
-            'scheduleId': str(result.inserted_id),
-            'schedule': schedule,
-            'summary': schedule_doc['summary']
-        })
+    summary = None
+    if accepted:
+        video_details = fetch_request_videos(data)
+        playlist_urls = request_playlist_urls(data)
+        schedule, summary = plan_request_schedule(data, settings, video_details)
+        template = add_rollup(build_schedule_document(
+            next(iter(accepted)),
+            data.get('title', 'Untitled Schedule'),
+            playlist_urls[0],
+            data['scheduleType'],
+            settings,
+            schedule,
+            summary,
+            playlist_urls=playlist_urls
+        ))
+        # Documents share the (read-only) days, videos and rollup; only the owner and _id differ
+        documents = [dict(template, userId=ObjectId(user_id)) for user_id in accepted]
+
+        with metrics.stage('store'):
+            schedule_ids, errors = get_schedule_store().insert_many(documents)
+        rollup_users_changed([
+            document['userId'] for document, schedule_id in zip(documents, schedule_ids) if schedule_id is not None
+        ])
+
+        for position, ((user_id, index), schedule_id) in enumerate(zip(accepted.items(), schedule_ids)):
+            if schedule_id is None:
+                results[index] = {'userId': user_id, 'error': f'Failed to store schedule: {errors[position]}'}
+            else:
+                results[index] = {'userId': user_id, 'scheduleId': str(schedule_id)}
+
+    created = sum(1 for result in results if 'scheduleId' in result)
+    metrics.inc('learnfast_bulk_import_users_total', created, result='created')
+    metrics.inc('learnfast_bulk_import_users_total', len(results) - created, result='failed')
+    return {
+        'message': f'Created {created} of {len(results)} schedules',
+        'created': created,
+        'failed': len(results) - created,
+        'results': results,
+        'summary': summary
+    }
+
+@app.route('/api/schedule/bulk', methods=['POST', 'OPTIONS'])
+def create_schedules_bulk():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        user_ids = data.get('userIds')
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({'error': 'userIds must be a non-empty list'}), 400
+        if len(user_ids) > BULK_IMPORT_MAX_USERS:
+            return jsonify({'error': f'At most {BULK_IMPORT_MAX_USERS} users per import'}), 400
 
+        result = run_bulk_import(data, user_ids)
+        # Nothing stored means every user was rejected up front
+        return jsonify(result), 200 if result['created'] else 400
+
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
-        print(f"Error creating schedule: {str(e)}")
-        return jsonify({'error': 'Failed to create schedule'}), 500
+        print(f"Error importing schedules: {str(e)}")
+        return jsonify({'error': 'Failed to import schedules'}), 500
 
 @app.route('/api/schedules/<user_id>', methods=['GET', 'OPTIONS'])
 def get_user_schedules(user_id):
@@ -236,13 +1022,31 @@ def get_user_schedules(user_id):
         if not validate_object_id(user_id):
             return jsonify({'error': 'Invalid user ID format'}), 400
 
-        schedules = list(schedules_collection.find({'userId': ObjectId(user_id)}))
-        formatted_schedules = [format_schedule_response(schedule) for schedule in schedules]
-        
-        return jsonify({'schedules': formatted_schedules})
+        fields = request.args.get('fields')
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+
+        # Without listing parameters keep returning every full document, served
+        # from the response cache and revalidated against the schedule versions
+        if not (fields or limit or cursor):
+            heads = list(get_schedules_collection().find({'userId': ObjectId(user_id)}, {'updated_at': 1}))
+            coding = response_coding(request)
+            return conditional_json(
+                schedules_etag(heads),
+                lambda: compress(join_schedule_bodies(heads, cached_schedule_bodies(heads)), coding),
+                coding=coding
+            )
+
+        limit, pipeline = listing_pipeline(user_id, fields, limit, cursor)
+        schedules = list(get_schedules_collection().aggregate(pipeline))
+        return jsonify(listing_page(schedules, limit))
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         print(f"Error fetching user schedules: {str(e)}")
-        return jsonify({'error': 'Failed to fetch schedules'}), 500@app.route('/api/schedules/<schedule_id>/adjust', methods=['POST', 'OPTIONS'])
+        return jsonify({'error': 'Failed to fetch schedules'}), 500
+
+@app.route('/api/schedules/<schedule_id>/adjust', methods=['POST', 'OPTIONS'])
 def adjust_schedule(schedule_id):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
@@ -255,40 +1059,181 @@ def adjust_schedule(schedule_id):
         if not validate_object_id(schedule_id):
             return jsonify({'error': 'Invalid schedule ID format'}), 400
 
-        old_schedule = schedules_collection.find_one({'_id': ObjectId(schedule_id)})
-        if not old_schedule:
+        try:
+            daily_hours = float(data['newDailyHours'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'New daily hours must be a number'}), 400
+        daily_minutes = int(daily_hours * 60)
+        if daily_minutes <= 10:
+            return jsonify({'error': 'Daily study time must be greater than 10 minutes'}), 400
+
+        schedule = get_schedule_store().get(schedule_id, {'userId': 1, 'schedule_data': 1, 'updated_at': 1, 'layout': 1})
+        if not schedule:
             return jsonify({'error': 'Schedule not found'}), 404
 
-        # Prepare data for new schedule creation
-        adjustment_data = {
-            'userId': str(old_schedule['userId']),
-            'playlistUrl': old_schedule['playlist_url'],
-            'scheduleType': 'daily',
-            'dailyHours': float(data['newDailyHours']),
-            'title': old_schedule['title'],
-            'isAdjustment': True,
-            'oldScheduleId': schedule_id
-        }
+        # Repack only what is left to watch, using the stored videos instead of refetching
+        old_days = schedule['schedule_data']
+        with metrics.stage('reschedule'):
+            kept_days, new_days, summary = reschedule_days(old_days, daily_minutes)
+        rescheduled = [
+            {
+                'day': f"Day {kept_days + index + 1}",
+                'date': (datetime.now() + timedelta(days=index)).strftime('%Y-%m-%d'),
+                'videos': videos
+            }
+            for index, videos in enumerate(new_days)
+        ]
 
-        # Get completed videos information
-        completed_videos = []
-        completed_video_details = []
-        for day in old_schedule['schedule_data']:
-            for video in day['videos']:
-                if video.get('completed'):
-                    completed_videos.append(video['link'])
-                    completed_video_details.append(video)
+        # Leading repacked days that came out identical don't need to be written
+        first_changed = kept_days
+        while (first_changed < len(old_days)
+               and first_changed - kept_days < len(rescheduled)
+               and old_days[first_changed] == rescheduled[first_changed - kept_days]):
+            first_changed += 1
+        changed_days = rescheduled[first_changed - kept_days:]
+        days = old_days[:first_changed] + changed_days
 
-        adjustment_data['completedVideos'] = completed_videos
-        adjustment_data['completedVideoDetails'] = completed_video_details
+        # Only the changed tail is written; the updated_at guard makes a
+        # concurrent progress write fail this update instead of being overwritten
+        with metrics.stage('store'):
+            updated = get_schedule_store().replace_days(
+                schedule_id,
+                first_changed,
+                changed_days,
+                {
+                    'schedule_type': 'daily',
+                    'settings': {'daily_hours': daily_hours},
+                    'summary': summary,
+                    'rollup': days_rollup(days)
+                },
+                schedule['updated_at']
+            )
+        invalidate_schedule(schedule_id)
+        if not updated:
+            return jsonify({'error': 'Schedule was modified during adjustment, please retry'}), 409
+        rollup_users_changed([schedule['userId']])
 
-        # Create new schedule
-        return create_schedule()
+        return jsonify({
+            'message': 'Schedule adjusted successfully',
+            'scheduleId': schedule_id,
+            'schedule': {day['day']: day['videos'] for day in days},
+            'summary': summary,
+            'changedDays': len(changed_days)
+        })
 
     except Exception as e:
         print(f"Error adjusting schedule: {str(e)}")
         return jsonify({'error': 'Failed to adjust schedule'}), 500
 
+PREVIEW_MAX_BUDGETS = int(os.getenv('PREVIEW_MAX_BUDGETS', 200))
+
+def expand_budgets(spec, name, cast):
+    """Budgets given as a list or a ``{from, to, step}`` range. Raises ScheduleError."""
+    if spec is None:
+        return []
+    try:
+        if isinstance(spec, list):
+            values = [cast(value) for value in spec]
+        elif isinstance(spec, dict):
+            start, stop, step = cast(spec['from']), cast(spec['to']), cast(spec.get('step', 1))
+            if step <= 0:
+                raise ScheduleError(f'{name} step must be positive')
+            count = int((stop - start) / step + 1e-9) + 1
+            if count > PREVIEW_MAX_BUDGETS:
+                raise ScheduleError(f'At most {PREVIEW_MAX_BUDGETS} budgets per preview')
+            values = [round(start + index * step, 6) for index in range(max(count, 0))]
+        else:
+            raise ScheduleError(f'{name} must be a list or a range')
+    except (KeyError, TypeError, ValueError):
+        raise ScheduleError(f'{name} must be numbers, or a range with numeric from, to and step')
+    return values
+
+@app.route('/api/schedules/<schedule_id>/adjust/preview', methods=['POST', 'OPTIONS'])
+def preview_schedule_budgets(schedule_id):
+    """What /adjust would produce for each daily budget (or target-day count); writes nothing."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        data = request.json or {}
+        daily_hours = expand_budgets(data.get('dailyHours'), 'dailyHours', float)
+        target_days = expand_budgets(data.get('targetDays'), 'targetDays', int)
+        if not daily_hours and not target_days:
+            return jsonify({'error': 'dailyHours or targetDays required'}), 400
+        if len(daily_hours) + len(target_days) > PREVIEW_MAX_BUDGETS:
+            return jsonify({'error': f'At most {PREVIEW_MAX_BUDGETS} budgets per preview'}), 400
+        if any(int(hours * 60) <= 10 for hours in daily_hours):
+            return jsonify({'error': 'Daily study time must be greater than 10 minutes'}), 400
+        if any(days <= 0 for days in target_days):
+            return jsonify({'error': 'Target days must be greater than 0'}), 400
+
+        found = cached_schedule_view(
+            schedule_id,
+            preview_cache,
+            lambda schedule: BudgetPreview(schedule['schedule_data']),
+            'budget_preview',
+            projection={'schedule_data': 1, 'layout': 1, 'updated_at': 1}
+        )
+        if found is None:
+            return jsonify({'error': 'Schedule not found'}), 404
+        preview = found[1]
+
+        # Repacked days start today, as /adjust dates them
+        start_date = datetime.now()
+        balanced = bool(data.get('balanced'))
+        with metrics.stage('preview'):
+            previews = [
+                dict(preview.daily(int(hours * 60), start_date), dailyHours=hours)
+                for hours in daily_hours
+            ] + [
+                dict(preview.target_days(days, start_date, balanced=balanced), targetDays=days)
+                for days in target_days
+            ]
+
+        return jsonify({'scheduleId': schedule_id, 'keptDays': preview.kept_days, 'previews': previews})
+
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error previewing schedule budgets: {str(e)}")
+        return jsonify({'error': 'Failed to preview schedule'}), 500
+
+@app.route('/api/schedules/<schedule_id>/stats', methods=['GET', 'OPTIONS'])
+def get_schedule_stats(schedule_id):
+    """Progress counters, pace and projected finish of a schedule, read from its rollup."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        stats = get_progress_rollups().schedule_stats(schedule_id)
+        if stats is None:
+            return jsonify({'error': 'Schedule not found'}), 404
+        return jsonify({'scheduleId': schedule_id, 'stats': stats})
+    except Exception as e:
+        print(f"Error fetching schedule stats: {str(e)}")
+        return jsonify({'error': 'Failed to fetch schedule stats'}), 500
+
+@app.route('/api/users/<user_id>/stats', methods=['GET', 'OPTIONS'])
+def get_user_stats(user_id):
+    """Progress across all of a user's schedules, read from their rollup."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        if not validate_object_id(user_id):
+            return jsonify({'error': 'Invalid user ID format'}), 400
+
+        return jsonify({'userId': user_id, 'stats': get_progress_rollups().user_stats(user_id)})
+    except Exception as e:
+        print(f"Error fetching user stats: {str(e)}")
+        return jsonify({'error': 'Failed to fetch user stats'}), 500
+
 @app.route('/api/schedules/<schedule_id>/progress', methods=['PUT', 'OPTIONS'])
 def update_video_progress(schedule_id):
     if request.method == 'OPTIONS':
@@ -305,21 +1250,9 @@ def update_video_progress(schedule_id):
         video_id = data['videoId']
         completed = data.get('completed', True)
         
-        result = schedules_collection.update_one(
-            {
-                '_id': ObjectId(schedule_id),
-                'schedule_data.videos.link': video_id
-            },
-            {
-                '$set': {
-                    'schedule_data.$[].videos.$[video].completed': completed,
-                    'updated_at': datetime.now()
-                }
-            },
-            array_filters=[{'video.link': video_id}]
-        )
-        
-        if result.matched_count == 0:
+        found = get_progress_writer().submit(schedule_id, {video_id: completed})
+        invalidate_schedule(schedule_id)
+        if not found:
             return jsonify({'error': 'Schedule or video not found'}), 404
             
         return jsonify({'message': 'Progress updated successfully'})
@@ -327,6 +1260,126 @@ def update_video_progress(schedule_id):
         print(f"Error updating progress: {str(e)}")
         return jsonify({'error': 'Failed to update progress'}), 500
 
+@app.route('/api/schedules/<schedule_id>/progress/batch', methods=['PUT', 'OPTIONS'])
+def update_video_progress_batch(schedule_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        data = request.json
+        if not data or not isinstance(data.get('updates'), list) or not data['updates']:
+            return jsonify({'error': 'Updates required'}), 400
+
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        # Later entries for the same video win
+        updates = {}
+        for update in data['updates']:
+            if not isinstance(update, dict) or 'videoId' not in update:
+                return jsonify({'error': 'Each update needs a videoId'}), 400
+            updates[update['videoId']] = bool(update.get('completed', True))
+
+        found = get_progress_writer().submit(schedule_id, updates)
+        invalidate_schedule(schedule_id)
+        if not found:
+            return jsonify({'error': 'Schedule or videos not found'}), 404
+
+        return jsonify({'message': 'Progress updated successfully', 'updated': len(updates)})
+    except Exception as e:
+        print(f"Error updating progress: {str(e)}")
+        return jsonify({'error': 'Failed to update progress'}), 500
+
+@lazy
+def get_chat_client():
+    # 'gemini' in production, 'stub' for offline development and benchmarks
+    return create_chat_client(
+        os.getenv('CHAT_BACKEND', 'gemini'),
+        first_token_seconds=float(os.getenv('CHAT_STUB_FIRST_TOKEN_MS', 300)) / 1000,
+        tokens_per_second=float(os.getenv('CHAT_STUB_TOKENS_PER_SECOND', 50))
+    )
+
+CHAT_MAX_MESSAGE_CHARS = int(os.getenv('CHAT_MAX_MESSAGE_CHARS', 2000))
+CHAT_CONTEXT_MAX_CHARS = int(os.getenv('CHAT_CONTEXT_MAX_CHARS', 12000))
+
+# Prompt contexts, keyed by schedule ID and only served for a matching updated_at
+chat_context_cache = ResponseCache(
+    max_entries=int(os.getenv('CHAT_CONTEXT_CACHE_ENTRIES', 256)),
+    max_bytes=int(os.getenv('CHAT_CONTEXT_CACHE_MB', 16)) * 1024 * 1024
+)
+# Answers to repeated questions about the same schedule version
+chat_response_cache = ExpiringCache(
+    max_entries=int(os.getenv('CHAT_RESPONSE_CACHE_ENTRIES', 1024)),
+    ttl_seconds=int(os.getenv('CHAT_RESPONSE_CACHE_TTL', 3600))
+)
+
+def schedule_chat_context(schedule_id):
+    """``(version, context)`` of a schedule, rebuilt only after it changed; None if it does not exist."""
+    return cached_schedule_view(
+        schedule_id,
+        chat_context_cache,
+        lambda schedule: build_schedule_context(schedule, max_chars=CHAT_CONTEXT_MAX_CHARS),
+        'context'
+    )
+
+@app.route('/api/chat', methods=['POST', 'OPTIONS'])
+def chat():
+    """Answer a study question, streamed as server-sent events when the client accepts them."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        data = request.json
+        message = (data or {}).get('message')
+        if not isinstance(message, str) or not message.strip():
+            return jsonify({'error': 'Message required'}), 400
+        message = message.strip()
+        if len(message) > CHAT_MAX_MESSAGE_CHARS:
+            return jsonify({'error': f'Message must be at most {CHAT_MAX_MESSAGE_CHARS} characters'}), 400
+
+        version = context = None
+        schedule_id = data.get('scheduleId')
+        if schedule_id:
+            if not validate_object_id(schedule_id):
+                return jsonify({'error': 'Invalid schedule ID format'}), 400
+            found = schedule_chat_context(schedule_id)
+            if found is None:
+                return jsonify({'error': 'Schedule not found'}), 404
+            version, context = found
+
+        video_title = data.get('videoTitle')
+        client = get_chat_client()
+        cached, chunks = stream_answer(
+            client,
+            build_prompt(message, context, video_title),
+            cache=chat_response_cache,
+            key=response_key(client, message, version, video_title, data.get('mode'))
+        )
+
+        if not (data.get('stream') or request.accept_mimetypes.best == 'text/event-stream'):
+            return jsonify({'response': ''.join(chunks), 'cached': cached})
+
+        def generate():
+            answer = []
+            try:
+                for chunk in chunks:
+                    answer.append(chunk)
+                    yield format_sse('token', {'text': chunk})
+                yield format_sse('done', {'response': ''.join(answer), 'cached': cached})
+            except Exception as e:
+                print(f"Error streaming chat response: {str(e)}")
+                yield format_sse('error', {'error': 'Failed to generate response'})
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        print(f"Error generating chat response: {str(e)}")
+        return jsonify({'error': 'Failed to generate response'}), 500
+
 @app.route('/api/schedules/<schedule_id>/verify-video', methods=['POST', 'OPTIONS'])
 def verify_video(schedule_id):
     if request.method == 'OPTIONS':
@@ -340,15 +1393,26 @@ def verify_video(schedule_id):
         if not validate_object_id(schedule_id):
             return jsonify({'error': 'Invalid schedule ID format'}), 400
 
-        schedule = schedules_collection.find_one({
-            '_id': ObjectId(schedule_id),
-            'schedule_data.videos.title': data['videoTitle']
-        })
-        
-        return jsonify({
-            'exists': bool(schedule),
-            'message': 'Video found in schedule' if schedule else 'Video not found in schedule'
-        })
+        index = schedule_title_index(schedule_id)
+        if index is None:
+            return jsonify({'exists': False, 'message': 'Video not found in schedule'})
+        # Verification stays an exact title check (ignoring case, accents and
+        # punctuation); the closest title, or a link, only with fuzzy=true
+        match = index.lookup(data['videoTitle']) if data.get('fuzzy') else index.exact(data['videoTitle'])
+
+        result = {
+            'exists': bool(match),
+            'message': 'Video found in schedule' if match else 'Video not found in schedule'
+        }
+        if match:
+            result.update(
+                title=match['video']['title'],
+                day=match['day'],
+                position=match['position'],
+                matchType=match['matchType'],
+                score=match['score']
+            )
+        return jsonify(result)
 
     except Exception as e:
         print(f"Error verifying video: {str(e)}")
@@ -363,44 +1427,72 @@ def get_video_context(schedule_id, video_title):
         if not validate_object_id(schedule_id):
             return jsonify({'error': 'Invalid schedule ID format'}), 400
 
-        schedule = schedules_collection.find_one({
-            '_id': ObjectId(schedule_id),
-            'schedule_data.videos.title': video_title
-        })
-        
-        if not schedule:
+        index = schedule_title_index(schedule_id)
+        match = index.lookup(video_title) if index is not None else None
+        if not match:
             return jsonify({'error': 'Video not found'}), 404
 
-        video_info = None
-        for day in schedule['schedule_data']:
-            for video in day['videos']:
-                if video['title'] == video_title:
-                    video_info = video
-                    break
-            if video_info:
-                break
-
-        if not video_info:
-            return jsonify({'error': 'Video details not found'}), 404
-
+        video_info = match['video']
         return jsonify({
             'video': {
                 'title': video_info['title'],
                 'duration': video_info['duration'],
                 'thumbnail': video_info['thumbnail'],
-                'completed': video_info['completed']
-            }
+                'completed': video_info.get('completed', False)
+            },
+            'day': match['day'],
+            'position': match['position'],
+            'matchType': match['matchType']
         })
 
     except Exception as e:
         print(f"Error fetching video context: {str(e)}")
         return jsonify({'error': 'Failed to fetch video context'}), 500
 
+@app.route('/api/schedules/<schedule_id>/videos/search', methods=['GET', 'OPTIONS'])
+def search_schedule_videos(schedule_id):
+    """Videos whose titles start with or resemble ``?q=``, best matches first."""
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Search query required'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+
+        index = schedule_title_index(schedule_id)
+        if index is None:
+            return jsonify({'error': 'Schedule not found'}), 404
+
+        return jsonify({'results': [
+            {
+                'title': match['video']['title'],
+                'link': match['video'].get('link'),
+                'completed': match['video'].get('completed', False),
+                'day': match['day'],
+                'position': match['position'],
+                'matchType': match['matchType'],
+                'score': match['score']
+            }
+            for match in index.search(query, limit)
+        ]})
+
+    except Exception as e:
+        print(f"Error searching videos: {str(e)}")
+        return jsonify({'error': 'Failed to search videos'}), 500
+
 @app.route('/api/debug/schedule/<schedule_id>', methods=['GET'])
 def debug_schedule(schedule_id):
     try:
         # Test MongoDB connection
-        client.admin.command('ping')
+        get_mongo_client().admin.command('ping')
         print(f"MongoDB connection successful")
         
         # Validate ID format
@@ -408,7 +1500,7 @@ def debug_schedule(schedule_id):
             return jsonify({'error': 'Invalid schedule ID format'}), 400
         
         # Check if schedule exists
-        schedule = schedules_collection.find_one({'_id': ObjectId(schedule_id)})
+        schedule = get_schedules_collection().find_one({'_id': ObjectId(schedule_id)})
         
         if not schedule:
             print(f"Schedule not found: {schedule_id}")
@@ -436,31 +1528,87 @@ def debug_schedule(schedule_id):
             'database': DB_NAME
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def check_database():
+    get_mongo_client().admin.command('ping')
+
+def check_gemini():
+    # Model metadata lookup: proves the key and API are reachable without a paid generation
+    get_genai().get_model('models/gemini-pro')
+
+# Readiness pings MongoDB at most once per interval; Gemini is only checked in the background
+database_check = CachedCheck(check_database, ttl=float(os.getenv('HEALTH_DB_CACHE_SECONDS', 10)))
+
+@lazy
+def get_dependency_monitor():
+    # Started by the first health probe rather than at import
+    return DependencyMonitor(
+        {'gemini': check_gemini},
+        interval=float(os.getenv('HEALTH_DEPENDENCY_INTERVAL', 300))
+    ).start()
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    return jsonify(liveness())
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    database = database_check()
+    ready = database['status'] == 'ok'
+    return jsonify({
+        'status': 'ready' if ready else 'unavailable',
+        'database': database,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    try:
-        # Check MongoDB connection
-        client.admin.command('ping')
-        
-        # Check Gemini API
-        test_response = model.generate_content("Test connection")
-        gemini_status = "connected"
+    database = database_check()
+    dependencies = get_dependency_monitor().status()
+    gemini = dependencies['gemini']
 
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected',
-            'database_name': DB_NAME,
-            'gemini_api': gemini_status,
-            'timestamp': datetime.now().isoformat()
-        })
-    except Exception as e:
-        print(f"Health check error: {str(e)}")
+    if database['status'] != 'ok':
         return jsonify({
             'status': 'unhealthy',
-            'error': str(e),
+            'error': database.get('error'),
+            'database': database,
+            'dependencies': dependencies,
             'timestamp': datetime.now().isoformat()
         }), 500
 
+    return jsonify({
+        'status': 'degraded' if gemini['status'] == 'error' else 'healthy',
+        'database': 'connected',
+        'database_name': DB_NAME,
+        'gemini_api': {'ok': 'connected', 'error': 'error'}.get(gemini['status'], 'unknown'),
+        'dependencies': dependencies,
+        'timestamp': datetime.now().isoformat()
+    })
+
+def create_app(warm=None):
+    """Return the configured app once the schedule indexes exist. With ``warm``
+    (default: WARM_START env) the other MongoDB-backed services are built
+    before the first request instead of by it.
+
+    Index creation is idempotent and runs once per process at startup, so a
+    missing index, an unreachable database or a fetch lock without the
+    shared playlist cache fails the start rather than the first request
+    that needs them.
+    """
+    ensure_indexes(get_schedule_store())
+    # Checks the fetch coalescing backend against the playlist cache's
+    get_fetch_lock()
+    if warm is None:
+        warm = os.getenv('WARM_START', '').lower() in ('1', 'true', 'yes')
+    if warm:
+        get_progress_writer()
+        get_playlist_cache()
+    return app
+
 if __name__ == '__main__':
     # Verify environment variables
     required_vars = ['MONGODB_URI', 'GOOGLE_API_KEY']
@@ -482,6 +1630,10 @@ if __name__ == '__main__':
         if rule.endpoint != 'static':
             print(f"{rule.rule} [{', '.join(rule.methods - {'OPTIONS', 'HEAD'})}]")
     print("\nServer is running in development mode")
+    print("For production use: gunicorn -c gunicorn.conf.py app:app")
     print("=====================================\n")
     
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app().run(
+        debug=os.getenv('FLASK_DEBUG', 'true').lower() in ('1', 'true', 'yes'),
+        port=int(os.getenv('PORT', 5000))
+    )
\ No newline at end of file
@@ -0,0 +1,460 @@
+# asgi.py
+#
+# Async serving path. The I/O-bound hot routes (schedule detail and lists,
+# progress writes and schedule creation) run as Quart coroutines on the async
+# MongoDB driver, so a waiting request holds no thread. Every other route
+# falls through to the Flask app, and both share its helpers, response cache
+# and metrics, so the JSON contract is the same either way.
+#
+#     JOB_QUEUE_BACKEND=mongo uvicorn asgi:app --workers 4 --port 5000
+#
+# As under gunicorn, several workers need the shared 'mongo' job queue so a
+# job can be polled from any of them.
+
+import asyncio
+import os
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from bson import ObjectId
+from quart import Quart, Response, g, jsonify, request
+from quart.wrappers.response import DataBody
+from werkzeug.exceptions import HTTPException
+
+import app as flask_app
+import metrics
+from app import (
+    CORS_ORIGINS,
+    SERVER_TIMING_ALWAYS,
+    SERVER_TIMING_HEADER,
+    ScheduleError,
+    add_rollup,
+    apply_progress_rollup,
+    build_schedule_document,
+    cache_schedule_body,
+    cache_variant,
+    cached_variant,
+    compress_body,
+    compress_variant,
+    copy_completion,
+    encode_schedule_body,
+    invalidate_schedule,
+    is_plain_variant,
+    fetch_request_videos,
+    finished_response_coding,
+    join_schedule_bodies,
+    listing_page,
+    listing_pipeline,
+    parse_schedule_settings,
+    plan_request_schedule,
+    playlist_flight_key,
+    request_playlist_urls,
+    response_cache,
+    response_coding,
+    rollup_users_changed,
+    schedule_variant,
+    schedule_variant_etag,
+    schedule_version,
+    schedules_etag,
+    validate_object_id
+)
+from codec import FULL, JSON, compress
+from fetcher import FetchTimeout
+from model import fetch_playlist_details_async
+from progress import AsyncProgressCoalescer
+from providers import get_async_database, lazy
+from singleflight import AsyncSingleFlight
+from storage import AsyncScheduleStore
+
+async_app = Quart(__name__)
+
+
+@lazy
+def get_async_store():
+    database = get_async_database()
+    return AsyncScheduleStore(
+        database.schedules,
+        database.schedule_videos,
+        layout=os.getenv('SCHEDULE_STORAGE_LAYOUT', 'embedded'),
+        encoding=os.getenv('SCHEDULE_VIDEO_ENCODING', 'compact')
+    )
+
+
+async def write_progress(schedule_id, updates):
+    store = get_async_store()
+    # The rollup deltas need each video's flag from before the write
+    videos = await store.locate_videos(schedule_id, list(updates))
+    if not videos:
+        return False
+    found = await store.set_videos_completed(schedule_id, updates)
+    if found:
+        # Rollups are maintained through the sync driver, like the Flask routes
+        await asyncio.to_thread(apply_progress_rollup, schedule_id, videos, updates)
+    return found
+
+
+@lazy
+def get_async_progress_writer():
+    return AsyncProgressCoalescer(
+        write_progress,
+        locate=get_async_store().present_links,
+        coalesce=os.getenv('PROGRESS_COALESCE', 'true').lower() in ('1', 'true', 'yes')
+    )
+
+
+@lazy
+def get_async_playlist_flights():
+    # Coalesces fetches among this loop's requests; shares the Flask app's cross-worker lock
+    return AsyncSingleFlight(lock=flask_app.get_fetch_lock())
+
+
+@async_app.before_serving
+async def ensure_indexes():
+    # Index creation is rare and idempotent, so it goes through the sync store once per worker
+    await asyncio.to_thread(flask_app.create_app)
+
+
+@async_app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+    # Same preflight answer as the Flask app
+    if request.method == 'OPTIONS':
+        response = Response('')
+        response.headers['Access-Control-Allow-Origin'] = CORS_ORIGINS[0]
+        response.headers['Access-Control-Allow-Headers'] = f"Content-Type,Authorization,{SERVER_TIMING_HEADER}"
+        response.headers['Access-Control-Allow-Methods'] = "GET,PUT,POST,DELETE,OPTIONS"
+        response.headers['Access-Control-Allow-Credentials'] = "true"
+        return response
+
+
+@async_app.after_request
+async def record_request_metrics(response):
+    origin = request.headers.get('Origin')
+    if origin in CORS_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Access-Control-Expose-Headers'] = 'Content-Type, Authorization, Server-Timing'
+        response.vary.add('Origin')
+
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.inc('learnfast_http_requests_total', route=route, method=request.method, status=str(response.status_code))
+    metrics.registry.observe('learnfast_http_request_duration_seconds', elapsed, route=route, method=request.method)
+
+    timings = metrics.current_timings()
+    if timings is not None and (SERVER_TIMING_ALWAYS or request.headers.get(SERVER_TIMING_HEADER)):
+        response.headers['Server-Timing'] = timings.server_timing(total=elapsed)
+    return response
+
+
+@async_app.after_request
+async def compress_response(response):
+    """Same compression step as the Flask app's compress_response."""
+    streamed = not isinstance(response.response, DataBody)
+    coding = finished_response_coding(response, request, streamed)
+    if coding:
+        response.set_data(compress_body(await response.get_data(), coding))
+        response.headers['Content-Encoding'] = coding
+    return response
+
+
+@async_app.teardown_request
+async def end_request_timer(exc):
+    metrics.end_request()
+
+
+async def cached_schedule_bodies(heads):
+    """Async counterpart of app.cached_schedule_bodies."""
+    bodies = {}
+    missing = []
+    for head in heads:
+        body = response_cache.get(str(head['_id']), schedule_version(head))
+        if body is None:
+            missing.append(head['_id'])
+        else:
+            bodies[str(head['_id'])] = body
+    metrics.inc('learnfast_response_cache_total', len(bodies), result='hit')
+    metrics.inc('learnfast_response_cache_total', len(missing), result='miss')
+
+    if missing:
+        store = get_async_store()
+        schedules = await store.schedules.find({'_id': {'$in': missing}}).to_list(length=None)
+        for schedule in await store.hydrate(schedules):
+            bodies.update(cache_schedule_body(schedule))
+    return bodies
+
+
+async def schedule_variant_body(head, variant):
+    """Async counterpart of app.schedule_variant_body."""
+    schedule_id = str(head['_id'])
+    version = schedule_version(head)
+    if is_plain_variant(variant):
+        body = (await cached_schedule_bodies([head])).get(schedule_id)
+        if body is None:
+            raise LookupError(schedule_id)
+        return b'{"schedule":' + body + b'}\n'
+
+    body = cached_variant(schedule_id, version, variant)
+    if body is not None:
+        return body
+    if variant[3]:
+        body = compress_variant(await schedule_variant_body(head, variant[:3] + (None,)), variant)
+    else:
+        schedule = await get_async_store().get(schedule_id, expand=variant[0] == FULL)
+        if not schedule:
+            raise LookupError(schedule_id)
+        current = schedule_version(schedule) == version
+        body = encode_schedule_body(schedule, variant)
+        if not current:
+            return body
+    cache_variant(schedule_id, version, variant, body)
+    return body
+
+
+async def conditional_json(etag, build_body, mimetype=JSON, coding=None):
+    """Async counterpart of app.conditional_json; ``build_body`` is a coroutine function."""
+    if coding:
+        etag = f"{etag}-{coding}"
+    if request.if_none_match.contains(etag):
+        metrics.inc('learnfast_response_cache_total', result='not_modified')
+        response = Response('', status=304)
+    else:
+        response = Response(await build_body(), mimetype=mimetype)
+        if coding:
+            response.headers['Content-Encoding'] = coding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@async_app.route('/api/schedules/detail/<schedule_id>', methods=['GET', 'OPTIONS'])
+async def get_schedule_detail(schedule_id):
+    try:
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        head = await get_async_store().schedules.find_one({'_id': ObjectId(schedule_id)}, {'updated_at': 1})
+        if not head:
+            return jsonify({'error': 'Schedule not found'}), 404
+
+        variant = schedule_variant(request)
+
+        async def build_body():
+            return await schedule_variant_body(head, variant)
+
+        response = await conditional_json(
+            schedule_variant_etag(head, variant), build_body, mimetype=variant[2], coding=variant[3]
+        )
+        response.vary.add('Accept')
+        return response
+
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+
+    except LookupError:
+        return jsonify({'error': 'Schedule not found'}), 404
+
+    except Exception as e:
+        print(f"Error fetching schedule: {str(e)}")
+        return jsonify({'error': 'Failed to fetch schedule'}), 500
+
+
+@async_app.route('/api/schedules/<user_id>', methods=['GET', 'OPTIONS'])
+async def get_user_schedules(user_id):
+    try:
+        if not validate_object_id(user_id):
+            return jsonify({'error': 'Invalid user ID format'}), 400
+
+        schedules_collection = get_async_store().schedules
+        fields = request.args.get('fields')
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+
+        if not (fields or limit or cursor):
+            heads = await schedules_collection.find({'userId': ObjectId(user_id)}, {'updated_at': 1}).to_list(length=None)
+
+            coding = response_coding(request)
+
+            async def build_body():
+                return compress(join_schedule_bodies(heads, await cached_schedule_bodies(heads)), coding)
+
+            return await conditional_json(schedules_etag(heads), build_body, coding=coding)
+
+        limit, pipeline = listing_pipeline(user_id, fields, limit, cursor)
+        # Motor's aggregate returns the cursor directly, PyMongo's async API a coroutine
+        cursor = schedules_collection.aggregate(pipeline)
+        if asyncio.iscoroutine(cursor):
+            cursor = await cursor
+        schedules = await cursor.to_list(length=None)
+        return jsonify(listing_page(schedules, limit))
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error fetching user schedules: {str(e)}")
+        return jsonify({'error': 'Failed to fetch schedules'}), 500
+
+
+async def submit_progress(schedule_id, updates):
+    found = await get_async_progress_writer().submit(schedule_id, updates)
+    invalidate_schedule(schedule_id)
+    return found
+
+
+@async_app.route('/api/schedules/<schedule_id>/progress', methods=['PUT', 'OPTIONS'])
+async def update_video_progress(schedule_id):
+    try:
+        data = await request.get_json(silent=True)
+        if not data or 'videoId' not in data:
+            return jsonify({'error': 'Video ID required'}), 400
+
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        if not await submit_progress(schedule_id, {data['videoId']: data.get('completed', True)}):
+            return jsonify({'error': 'Schedule or video not found'}), 404
+
+        return jsonify({'message': 'Progress updated successfully'})
+    except Exception as e:
+        print(f"Error updating progress: {str(e)}")
+        return jsonify({'error': 'Failed to update progress'}), 500
+
+
+@async_app.route('/api/schedules/<schedule_id>/progress/batch', methods=['PUT', 'OPTIONS'])
+async def update_video_progress_batch(schedule_id):
+    try:
+        data = await request.get_json(silent=True)
+        if not data or not isinstance(data.get('updates'), list) or not data['updates']:
+            return jsonify({'error': 'Updates required'}), 400
+
+        if not validate_object_id(schedule_id):
+            return jsonify({'error': 'Invalid schedule ID format'}), 400
+
+        # Later entries for the same video win
+        updates = {}
+        for update in data['updates']:
+            if not isinstance(update, dict) or 'videoId' not in update:
+                return jsonify({'error': 'Each update needs a videoId'}), 400
+            updates[update['videoId']] = bool(update.get('completed', True))
+
+        if not await submit_progress(schedule_id, updates):
+            return jsonify({'error': 'Schedule or videos not found'}), 404
+
+        return jsonify({'message': 'Progress updated successfully', 'updated': len(updates)})
+    except Exception as e:
+        print(f"Error updating progress: {str(e)}")
+        return jsonify({'error': 'Failed to update progress'}), 500
+
+
+async def run_schedule_pipeline(data):
+    """Async counterpart of app.run_schedule_pipeline. Raises ScheduleError."""
+    settings = parse_schedule_settings(data)
+    playlist_urls = request_playlist_urls(data)
+
+    if len(playlist_urls) > 1:
+        # Course listing and merging block; the videos still fetch on the shared engine
+        video_details = await asyncio.to_thread(fetch_request_videos, data)
+    else:
+        try:
+            video_details = await get_async_playlist_flights().do(
+                playlist_flight_key(playlist_urls),
+                lambda: fetch_playlist_details_async(playlist_urls[0], cache=flask_app.get_playlist_cache())
+            )
+        except FetchTimeout as e:
+            raise ScheduleError(f'Error fetching playlist: {str(e)}', 504)
+        except Exception as e:
+            raise ScheduleError(f'Error fetching playlist: {str(e)}')
+        if not video_details:
+            raise ScheduleError('No videos found in playlist')
+        video_details = [dict(video) for video in video_details]
+
+    # Packing is CPU-bound, keep large playlists off the event loop
+    schedule, summary = await asyncio.to_thread(plan_request_schedule, data, settings, video_details)
+    schedule_doc = build_schedule_document(
+        data.get('userId'),
+        data.get('title', 'Untitled Schedule'),
+        playlist_urls[0],
+        data.get('scheduleType'),
+        settings,
+        schedule,
+        summary,
+        playlist_urls=playlist_urls
+    )
+
+    store = get_async_store()
+    old_schedule_id = data.get('oldScheduleId')
+    if data.get('isAdjustment', False) and old_schedule_id:
+        try:
+            old_schedule = await store.get(old_schedule_id)
+            if old_schedule:
+                copy_completion(old_schedule, schedule_doc)
+                await store.delete(old_schedule_id)
+                invalidate_schedule(old_schedule_id)
+        except Exception as e:
+            raise ScheduleError(f'Error handling schedule adjustment: {str(e)}', 500)
+
+    start = time.perf_counter()
+    schedule_id = await store.insert(add_rollup(schedule_doc))
+    metrics.record_stage('store', time.perf_counter() - start)
+    rollup_users_changed([schedule_doc['userId']])
+
+    return {
+        'message': 'Schedule created successfully',
+        'scheduleId': str(schedule_id),
+        'schedule': schedule,
+        'summary': schedule_doc['summary']
+    }
+
+
+@async_app.route('/api/schedule', methods=['POST', 'OPTIONS'])
+async def create_schedule():
+    try:
+        data = await request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        # Validate before queuing or fetching anything
+        parse_schedule_settings(data)
+
+        if data.get('async'):
+            payload = {key: value for key, value in data.items() if key != 'async'}
+            job_id = await asyncio.to_thread(flask_app.get_job_queue().submit, payload)
+            return jsonify({
+                'message': 'Schedule job queued',
+                'jobId': job_id,
+                'statusUrl': f'/api/jobs/{job_id}'
+            }), 202
+
+        return jsonify(await run_schedule_pipeline(data))
+
+    except ScheduleError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error creating schedule: {str(e)}")
+        return jsonify({'error': 'Failed to create schedule'}), 500
+
+
+class RouteDispatcher:
+    """ASGI app sending requests for the async routes to Quart and the rest to the Flask app."""
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.wsgi_app = WsgiToAsgi(wsgi_app)
+
+    def handles(self, scope):
+        adapter = self.async_app.url_map.bind('localhost')
+        try:
+            adapter.match(scope['path'], method=scope['method'])
+            return True
+        except HTTPException:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        # Lifespan events (before_serving) and async routes go to Quart
+        if scope['type'] == 'http' and not self.handles(scope):
+            return await self.wsgi_app(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+app = RouteDispatcher(async_app, flask_app.app)
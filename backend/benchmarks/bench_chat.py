@@ -0,0 +1,84 @@
+# bench_chat.py
+#
+# Times /api/chat against the stub chat model (mongomock and the fake
+# playlist source): context building on its own, then time to first token
+# and to the full answer for a cold schedule context, a warm context with a
+# new question, and a repeated question served from the response cache.
+# Run from backend/:
+#
+#     python -m benchmarks.bench_chat [--videos 1000] [--first-token-ms 300] [--tokens-per-second 50]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from chat import build_schedule_context
+from benchmarks.fixtures import load_app, register_playlist
+
+
+def timed_chat(client, body):
+    """POST a streaming chat request; return ``(first_token_ms, total_ms)``."""
+    start = time.perf_counter()
+    response = client.post('/api/chat', json=dict(body, stream=True), buffered=False)
+    first = None
+    for chunk in response.response:
+        if first is None and b'event: token' in chunk:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    response.close()
+    assert response.status_code == 200, response.status_code
+    return first * 1000, total * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--tokens-per-second', type=float, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['CHAT_BACKEND'] = 'stub'
+    os.environ['CHAT_STUB_FIRST_TOKEN_MS'] = str(args.first_token_ms)
+    os.environ['CHAT_STUB_TOKENS_PER_SECOND'] = str(args.tokens_per_second)
+    app = load_app()
+    if app is None:
+        print("flask/mongomock not installed: nothing to benchmark")
+        return 1
+
+    client = app.app.test_client()
+    created = client.post('/api/schedule', json={
+        'userId': '0' * 24,
+        'playlistUrl': register_playlist('PLchat', args.videos),
+        'scheduleType': 'daily',
+        'dailyHours': 2
+    }).get_json()
+    schedule_id = created['scheduleId']
+
+    schedule = app.get_schedule_store().get(schedule_id)
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        context = build_schedule_context(schedule, max_chars=app.CHAT_CONTEXT_MAX_CHARS)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"build context ({args.videos} videos, {len(context)} chars) {statistics.median(samples):>8.2f} ms\n")
+
+    print(f"{'case':<22}{'first token ms':>16}{'total ms':>12}")
+    cases = {'cold_context': [], 'warm_context': [], 'cached_answer': []}
+    for run in range(args.repeat):
+        app.chat_context_cache.invalidate(schedule_id)
+        question = {'scheduleId': schedule_id, 'message': f'What should I watch next? ({run})'}
+        cases['cold_context'].append(timed_chat(client, question))
+        cases['warm_context'].append(timed_chat(client, dict(question, message=f'How far along am I? ({run})')))
+        cases['cached_answer'].append(timed_chat(client, question))
+    for name, results in cases.items():
+        first = statistics.median(result[0] for result in results)
+        total = statistics.median(result[1] for result in results)
+        print(f"{name:<22}{first:>16.1f}{total:>12.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
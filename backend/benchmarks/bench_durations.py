@@ -0,0 +1,77 @@
+# bench_durations.py
+#
+# Compare the compact duration array path against re-parsing "H:MM:SS"
+# strings in every scheduling pass. Run from backend/:
+#
+#     python -m benchmarks.bench_durations [video_count]
+
+import sys
+import timeit
+
+from model import get_schedule_summary, parse_duration, plan_schedule
+from benchmarks.synthetic import synthetic_playlist
+
+
+def string_day_based(video_details, num_days):
+    """Day-based scheduling as it worked before CompactPlaylist: parse twice, then again for the summary."""
+    total_duration = sum(parse_duration(video["duration"]) for video in video_details)
+    avg_daily_duration = total_duration / num_days
+    schedule = {}
+    current_day, current_day_videos, current_day_duration = 1, [], 0
+    for video in video_details:
+        video_duration = parse_duration(video["duration"])
+        if current_day < num_days and current_day_duration + video_duration > avg_daily_duration:
+            if current_day_videos:
+                schedule[f"Day {current_day}"] = current_day_videos
+                current_day += 1
+            current_day_videos, current_day_duration = [], 0
+        current_day_videos.append(video)
+        current_day_duration += video_duration
+    schedule[f"Day {current_day}"] = current_day_videos
+    return schedule, get_schedule_summary(schedule)
+
+
+def string_time_based(video_details, daily_time_minutes):
+    """Time-based scheduling parsing each duration, then again for the summary."""
+    daily_time_seconds = (daily_time_minutes - 10) * 60
+    schedule = {}
+    current_day, current_day_videos, current_day_duration = 1, [], 0
+    for video in video_details:
+        video_duration = parse_duration(video["duration"])
+        if current_day_duration + video_duration <= daily_time_seconds:
+            current_day_videos.append(video)
+            current_day_duration += video_duration
+        else:
+            if current_day_videos:
+                schedule[f"Day {current_day}"] = current_day_videos
+                current_day += 1
+            current_day_videos, current_day_duration = [video], video_duration
+    schedule[f"Day {current_day}"] = current_day_videos
+    return schedule, get_schedule_summary(schedule)
+
+
+def best_of(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(count=10_000):
+    videos = synthetic_playlist(count)
+    cases = [
+        ('time-based (2h/day)',
+         lambda: string_time_based(videos, 120),
+         lambda: plan_schedule(videos, daily_time_minutes=120)),
+        ('day-based (30 days)',
+         lambda: string_day_based(videos, 30),
+         lambda: plan_schedule(videos, num_days=30)),
+    ]
+
+    print(f"{count} videos, best of 5 (ms)")
+    print(f"{'case':<22}{'strings':>10}{'compact':>10}{'speedup':>10}")
+    for name, strings, compact in cases:
+        assert strings()[0] == compact()[0]
+        strings_ms, compact_ms = best_of(strings), best_of(compact)
+        print(f"{name:<22}{strings_ms:>10.2f}{compact_ms:>10.2f}{strings_ms / compact_ms:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
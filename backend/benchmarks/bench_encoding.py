@@ -0,0 +1,97 @@
+# bench_encoding.py
+#
+# Size and serialisation time of a schedule in each encoding: the stored
+# document with full versus compact video records (BSON), and the detail
+# response as format_schedule_response JSON versus the compact and columnar
+# forms, MessagePack when installed, each also gzip/brotli compressed.
+# Run from backend/:
+#
+#     python -m benchmarks.bench_encoding [--videos 5000]
+
+import argparse
+import copy
+import sys
+import timeit
+
+from bson import BSON
+
+from codec import (
+    COLUMNAR, COMPACT, FULL, JSON, MSGPACK,
+    body_types, compress, content_codings, dumps, encode_schedule, expand_days
+)
+from model import plan_schedule
+from storage import COMPACT as COMPACT_VIDEOS, stored_document
+from benchmarks.fixtures import load_app
+from benchmarks.synthetic import synthetic_playlist
+
+
+def best_of(func, setup=None, repeat=5):
+    """Best wall time in ms of ``func(setup())``, with ``setup`` outside the timing."""
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = timeit.default_timer()
+        func(argument)
+        times.append(timeit.default_timer() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--videos', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = load_app()
+    if app is None:
+        print("flask/mongomock not installed: nothing to benchmark")
+        return 1
+
+    schedule, summary = plan_schedule(synthetic_playlist(args.videos), daily_time_minutes=120)
+    document = app.build_schedule_document('0' * 24, 'Benchmark', 'https://www.youtube.com/playlist?list=PLbench', 'daily', {'dailyHours': 2}, schedule, summary)
+    document['_id'] = app.ObjectId()
+
+    stored = stored_document(document, COMPACT_VIDEOS)
+    full_bson = BSON.encode(document)
+    compact_bson = BSON.encode(stored)
+    full_read = best_of(lambda _: full_bson.decode())
+    compact_read = best_of(lambda _: expand_days(compact_bson.decode()['schedule_data']))
+    print(f"{args.videos} videos, best of 5\n")
+    print(f"{'stored document':<28}{'bytes':>12}{'read ms':>10}")
+    print(f"{'full videos':<28}{len(full_bson):>12}{full_read:>10.2f}")
+    print(f"{'compact videos':<28}{len(compact_bson):>12}{compact_read:>10.2f}"
+          f"   ({len(compact_bson) / len(full_bson):.0%} of full)\n")
+
+    def baseline(schedule_copy):
+        return app.app.json.dumps(app.format_schedule_response(schedule_copy), separators=(',', ':')).encode()
+
+    # Like the detail endpoint, the compact forms start from the stored records and the full one from expanded ones
+    def encoder(form, mimetype):
+        return lambda schedule_copy: dumps({'schedule': encode_schedule(app.format_schedule_response(schedule_copy), form, False)}, mimetype)
+
+    with app.app.app_context():
+        cases = [('format_schedule_response', baseline)]
+        cases += [(f"{form} {mimetype.rsplit('/', 1)[-1]}", encoder(form, mimetype))
+                  for mimetype in body_types() for form in (FULL, COMPACT, COLUMNAR)
+                  if (form, mimetype) != (FULL, JSON)]
+
+        codings = content_codings()
+        header = f"{'response':<28}{'bytes':>12}{'encode ms':>11}"
+        for coding in codings:
+            header += f"{coding + ' bytes':>12}{coding + ' ms':>9}"
+        print(header)
+        base_size = None
+        for name, encode in cases:
+            source = document if name.startswith(('format', FULL)) else stored
+            body = encode(copy.deepcopy(source))
+            base_size = base_size or len(body)
+            line = f"{name:<28}{len(body):>12}{best_of(encode, lambda: copy.deepcopy(source)):>11.2f}"
+            for coding in codings:
+                line += f"{len(compress(body, coding)):>12}{best_of(lambda _: compress(body, coding)):>9.2f}"
+            print(line + f"   ({len(body) / base_size:.0%})")
+    if MSGPACK not in body_types():
+        print("\nmsgpack not installed: MessagePack rows skipped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# bench_scheduling.py
+#
+# Times the schedulers, the summary, response formatting, progress toggles
+# and bulk import on synthetic playlists, tracks peak memory, and compares against a stored
+# baseline.
+# Run from backend/:
+#
+#     python -m benchmarks.bench_scheduling                  # compare with baseline.json
+#     python -m benchmarks.bench_scheduling --update-baseline
+#     python -m benchmarks.bench_scheduling --sizes 10,1000 --tolerance 0.3
+#
+# The scheduler cases call the create_schedule_* entry points app.py has
+# always used, so they also run against an older model.py. before.json holds
+# their timings on the tree before the scheduler rewrite, recorded with
+#
+#     git worktree add /tmp/before bcc521b
+#     python -m benchmarks.bench_scheduling --model-path /tmp/before/backend --update-baseline
+#
+# and every run prints its results next to them.
+#
+# Exits with status 1 when any case is slower (or uses more memory) than its
+# baseline by more than the tolerance, or has no baseline to compare with.
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import model
+from model import plan_schedule
+from benchmarks.fixtures import load_app, load_model, register_playlist
+from benchmarks.synthetic import synthetic_playlist
+from storage import NORMALIZED, ScheduleStore
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+BEFORE_PATH = os.path.join(os.path.dirname(__file__), 'before.json')
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+# The full request path fetches every video through the engine, keep it smaller
+END_TO_END_MAX_SIZE = 10_000
+# Cohort written by the bulk import case, for playlists up to BULK_IMPORT_MAX_SIZE videos
+BULK_IMPORT_USERS = 1000
+BULK_IMPORT_MAX_SIZE = 100
+
+
+def measure(func, repeat):
+    """Median wall time in ms over ``repeat`` runs, and peak traced memory in KiB of one run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024
+
+
+def stored_schedule(schedule, summary):
+    """A schedule document shaped like the ones create_schedule stores."""
+    return {
+        '_id': 'bench',
+        'userId': 'bench',
+        'schedule_data': [
+            {'day': day, 'date': datetime(2024, 1, 1), 'videos': videos}
+            for day, videos in schedule.items()
+        ],
+        'summary': summary,
+        'created_at': datetime(2024, 1, 1),
+        'updated_at': datetime(2024, 1, 1)
+    }
+
+
+def scheduling_cases(size, model=model):
+    """Scheduler cases through ``model``'s public entry points, as the create route calls them."""
+    videos = synthetic_playlist(size)
+    schedule = model.create_schedule_time_based(videos, 120)
+    days = max(1, size // 20)
+    yield 'time_based', lambda: model.create_schedule_time_based(videos, 120)
+    yield 'day_based', lambda: model.create_schedule_day_based(videos, days)
+    # Balanced packing has no older entry point to compare with
+    if hasattr(model, 'plan_schedule'):
+        yield 'balanced', lambda: model.plan_schedule(videos, num_days=days, balanced=True)
+    yield 'summary', lambda: model.get_schedule_summary(schedule)
+
+
+def app_cases(app, size):
+    schedule, summary = plan_schedule(synthetic_playlist(size), daily_time_minutes=120)
+    document = stored_schedule(schedule, summary)
+    # format_schedule_response mutates its argument, so each run gets a fresh copy
+    yield 'format_response', lambda: app.format_schedule_response(copy.deepcopy(document))
+
+    if size > END_TO_END_MAX_SIZE:
+        return
+    # Start each size from empty collections: mongomock scans every stored
+    # document, so schedules left by the previous size's cases would skew these
+    database = app.get_database()
+    database.schedules.delete_many({})
+    database.schedule_videos.delete_many({})
+    playlist_id = f"PLbench{size}"
+    body = {
+        'userId': '0' * 24,
+        'playlistUrl': register_playlist(playlist_id, size),
+        'scheduleType': 'daily',
+        'dailyHours': 2
+    }
+    client = app.app.test_client()
+
+    def create_schedule(cold):
+        if cold:
+            app.get_playlist_cache().invalidate(playlist_id)
+        response = client.post('/api/schedule', json=body)
+        assert response.status_code == 200, response.get_json()
+
+    yield 'create_schedule_cold', lambda: create_schedule(cold=True)
+    yield 'create_schedule_cached', lambda: create_schedule(cold=False)
+
+    # Progress writes through the normalized layout (mongomock cannot run the
+    # embedded update pipeline); the rollup follows each toggle
+    schedule_id = ScheduleStore(database.schedules, database.schedule_videos, layout=NORMALIZED).insert(
+        app.add_rollup(app.build_schedule_document(body['userId'], 'bench', body['playlistUrl'], 'daily', {}, schedule, summary))
+    )
+    link = schedule['Day 1'][0]['link']
+    flags = itertools.cycle([True, False])
+
+    def toggle_progress():
+        response = client.put(f'/api/schedules/{schedule_id}/progress', json={'videoId': link, 'completed': next(flags)})
+        assert response.status_code == 200, response.get_json()
+
+    yield 'progress_toggle', toggle_progress
+
+    if size > BULK_IMPORT_MAX_SIZE:
+        return
+    bulk_body = dict(body, userIds=[f'{index:024x}' for index in range(BULK_IMPORT_USERS)])
+    del bulk_body['userId']
+
+    def bulk_import():
+        response = client.post('/api/schedule/bulk', json=bulk_body)
+        assert response.get_json()['created'] == BULK_IMPORT_USERS, response.get_json()
+
+    yield f'bulk_import_{BULK_IMPORT_USERS}_users', bulk_import
+
+
+def run(sizes, repeat, model_path=None):
+    """Time every case; with ``model_path`` only the scheduler cases, against that model.py."""
+    if model_path:
+        scheduler_model, app = load_model(model_path), None
+    else:
+        # User rollups are re-summed between cases below, not on the
+        # background thread while the next case is being timed
+        os.environ.setdefault('ROLLUP_USER_DELAY', '3600')
+        scheduler_model, app = model, load_app()
+        if app is None:
+            print("mongomock/flask not installed: skipping format_response and create_schedule cases\n")
+
+    results = {}
+    print(f"{'case':<34}{'median ms':>12}{'peak KiB':>12}")
+    for size in sizes:
+        cases = list(scheduling_cases(size, scheduler_model))
+        if app is not None:
+            cases.extend(app_cases(app, size))
+        for name, func in cases:
+            key = f"{name}[{size}]"
+            elapsed, peak = measure(func, repeat)
+            if app is not None:
+                app.get_progress_rollups().user_queue.flush()
+            results[key] = {'ms': round(elapsed, 3), 'peak_kib': round(peak, 1)}
+            print(f"{key:<34}{elapsed:>12.3f}{peak:>12.1f}")
+    return results
+
+
+def case_size(key):
+    return int(key[key.index('[') + 1:-1])
+
+
+def compare(results, baseline, tolerance, sizes):
+    """Return the cases that regressed past the tolerance, have no baseline, or did not run."""
+    regressions = [
+        f"{key}: in the baseline but not run"
+        for key in sorted(baseline)
+        if key not in results and case_size(key) in sizes
+    ]
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if not expected:
+            regressions.append(f"{key}: no baseline, run with --update-baseline")
+            continue
+        for metric in ('ms', 'peak_kib'):
+            # Ignore sub-millisecond noise on the tiny cases
+            limit = expected[metric] * (1 + tolerance) + (1 if metric == 'ms' else 0)
+            if result[metric] > limit:
+                regressions.append(f"{key} {metric}: {result[metric]} > {expected[metric]} (+{tolerance:.0%})")
+    return regressions
+
+
+def print_before(results, before):
+    """Print the cases timed before the scheduler rewrite next to this run."""
+    print(f"\n{'case':<34}{'before ms':>12}{'now ms':>12}{'speedup':>10}")
+    for key, result in results.items():
+        if key in before:
+            print(f"{key:<34}{before[key]['ms']:>12.3f}{result['ms']:>12.3f}{before[key]['ms'] / max(result['ms'], 0.001):>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--baseline', help=f"defaults to {BASELINE_PATH}, or {BEFORE_PATH} with --model-path")
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--model-path', help="backend/ directory of another checkout whose schedulers to time")
+    args = parser.parse_args()
+    baseline_path = args.baseline or (BEFORE_PATH if args.model_path else BASELINE_PATH)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run(sizes, args.repeat, args.model_path)
+
+    if args.update_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+
+    if not args.model_path and os.path.exists(BEFORE_PATH):
+        with open(BEFORE_PATH) as f:
+            print_before(results, json.load(f))
+
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}; run with --update-baseline first")
+        return 1
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance, sizes)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# bench_startup.py
+#
+# Measures cold-start cost in fresh interpreters: importing the scheduling
+# code, importing the app, and the latency of the first requests served
+# (against mongomock and the fake playlist source). Run from backend/:
+#
+#     python -m benchmarks.bench_startup [runs]
+#
+# Exits with status 1 if importing model.py pulls in pytubefix or a Google
+# SDK, which would put them back on every worker's boot path.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pytubefix', 'google.generativeai', 'google.genai')
+
+IMPORT_MODEL = """
+import json, sys, time
+start = time.perf_counter()
+import model
+elapsed = time.perf_counter() - start
+heavy = [name for name in HEAVY if name in sys.modules]
+print(json.dumps({'import_ms': elapsed * 1000, 'heavy': heavy}))
+"""
+
+IMPORT_APP = """
+import json, sys, time
+start = time.perf_counter()
+from benchmarks.fixtures import load_app, register_playlist
+app = load_app()
+elapsed = time.perf_counter() - start
+if app is None:
+    print(json.dumps(None))
+    sys.exit()
+heavy = [name for name in HEAVY if name in sys.modules]
+
+client = app.app.test_client()
+start = time.perf_counter()
+client.get('/api/health/live')
+live_ms = (time.perf_counter() - start) * 1000
+
+body = {
+    'userId': '0' * 24,
+    'playlistUrl': register_playlist('PLstartup', 50),
+    'scheduleType': 'daily',
+    'dailyHours': 2
+}
+start = time.perf_counter()
+status = client.post('/api/schedule', json=body).status_code
+first_schedule_ms = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+client.post('/api/schedule', json=body)
+second_schedule_ms = (time.perf_counter() - start) * 1000
+
+print(json.dumps({
+    'import_ms': elapsed * 1000,
+    'heavy': heavy,
+    'first_live_ms': live_ms,
+    'first_schedule_ms': first_schedule_ms,
+    'second_schedule_ms': second_schedule_ms,
+    'status': status
+}))
+"""
+
+
+def run_fresh(code):
+    """Run ``code`` in a new interpreter from backend/ and return its JSON output."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', f"HEAVY = {HEAVY_MODULES!r}\n{code}"],
+        cwd=backend_dir,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [backend_dir, os.getenv('PYTHONPATH')]))),
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_of(samples, key):
+    return statistics.median(sample[key] for sample in samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    model_runs = [run_fresh(IMPORT_MODEL) for _ in range(runs)]
+    print(f"import model          {median_of(model_runs, 'import_ms'):>10.1f} ms")
+    heavy = model_runs[0]['heavy']
+
+    app_runs = [run_fresh(IMPORT_APP) for _ in range(runs)]
+    if app_runs[0] is None:
+        print("flask/mongomock not installed: skipping app import and first-request timings")
+    else:
+        print(f"import app            {median_of(app_runs, 'import_ms'):>10.1f} ms")
+        print(f"first /health/live    {median_of(app_runs, 'first_live_ms'):>10.1f} ms")
+        print(f"first /api/schedule   {median_of(app_runs, 'first_schedule_ms'):>10.1f} ms")
+        print(f"second /api/schedule  {median_of(app_runs, 'second_schedule_ms'):>10.1f} ms")
+        if app_runs[0]['heavy']:
+            print(f"note: app import loaded {', '.join(app_runs[0]['heavy'])}")
+
+    if heavy:
+        print(f"\nFAIL: importing model loaded {', '.join(heavy)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
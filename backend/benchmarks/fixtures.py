@@ -0,0 +1,104 @@
+# fixtures.py
+#
+# Offline stand-ins for the benchmark suite: a fake pytubefix playlist source
+# backed by synthetic durations, a loader that imports app.py against
+# mongomock so the full request path runs without network or MongoDB, and one
+# that imports model.py from another checkout to time its schedulers.
+
+import importlib.util
+import os
+import sys
+import types
+
+from benchmarks.synthetic import synthetic_durations
+
+_playlists = {}
+
+# Synthetic playlists served by benchmarks.offline_app, keyed by playlist ID
+LOAD_TEST_PLAYLISTS = {'PLloadtest100': 100, 'PLloadtest1000': 1000}
+
+
+class FakeYouTube:
+    """Minimal pytubefix.YouTube replacement serving synthetic metadata."""
+
+    def __init__(self, url):
+        self.video_id = url.split('v=')[1]
+        # pytubefix reports watch URLs in this form whatever URL it was given
+        self.watch_url = f"https://youtube.com/watch?v={self.video_id}"
+
+    @property
+    def title(self):
+        return f"Synthetic video {self.video_id}"
+
+    @property
+    def length(self):
+        return _playlists['lengths'][self.video_id]
+
+
+class FakePlaylist:
+    """Minimal pytubefix.Playlist replacement listing a registered synthetic playlist."""
+
+    def __init__(self, url):
+        self.video_urls = _playlists[url.split('list=')[1]]
+
+    @property
+    def videos(self):
+        return [FakeYouTube(url) for url in self.video_urls]
+
+
+def register_playlist(playlist_id, count, seed=0):
+    """Register a synthetic playlist for the fakes and return its URL."""
+    lengths = _playlists.setdefault('lengths', {})
+    urls = []
+    for index, seconds in enumerate(synthetic_durations(count, seed)):
+        video_id = f"{playlist_id[-4:]}{index:07d}"
+        lengths[video_id] = seconds
+        urls.append(f"https://www.youtube.com/watch?v={video_id}")
+    _playlists[playlist_id] = urls
+    return f"https://www.youtube.com/playlist?list={playlist_id}"
+
+
+def use_fake_youtube():
+    """Route model.py's pytubefix calls to the synthetic playlists."""
+    import model
+    model.open_playlist = FakePlaylist
+    model.open_video = FakeYouTube
+
+
+def load_app():
+    """Import app.py with mongomock and the fake playlist source; None if unavailable."""
+    try:
+        import mongomock
+        import pymongo
+    except ImportError:
+        return None
+
+    os.environ.setdefault('MONGODB_URI', 'mongodb://localhost')
+    pymongo.MongoClient = mongomock.MongoClient
+
+    use_fake_youtube()
+
+    try:
+        import app
+    except ImportError as e:
+        print(f"Skipping app benchmarks: {e}", file=sys.stderr)
+        return None
+    # Startup, as under gunicorn: the schedule indexes exist before the first request
+    app.create_app()
+    return app
+
+
+def load_model(backend_dir):
+    """Import ``model.py`` from another checkout's backend/ (e.g. the tree before a change) under its own name.
+
+    Its scheduler entry points are timed, never its fetching, so the fakes
+    stand in for pytubefix when it is not installed.
+    """
+    if importlib.util.find_spec('pytubefix') is None:
+        sys.modules['pytubefix'] = types.ModuleType('pytubefix')
+        sys.modules['pytubefix'].Playlist = FakePlaylist
+        sys.modules['pytubefix'].YouTube = FakeYouTube
+    spec = importlib.util.spec_from_file_location('model_under_test', os.path.join(backend_dir, 'model.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
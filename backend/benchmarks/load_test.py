@@ -0,0 +1,265 @@
+# load_test.py
+#
+# Local load test for the schedule endpoints. For each worker count it starts
+# gunicorn on benchmarks.offline_app (real MongoDB from MONGODB_URI,
+# synthetic playlists instead of YouTube), seeds a few schedules, then drives
+# a mix of detail reads, conditional reads, list reads, progress writes and
+# schedule creation from concurrent keep-alive clients. Run from backend/:
+#
+#     python -m benchmarks.load_test --workers 1,2,4 --threads 4 --clients 32 --duration 15
+#     python -m benchmarks.load_test --server both --clients 256
+#
+# --server picks the sync gunicorn/Flask app, the async uvicorn/Quart app
+# (asgi.py) or both, to compare how each handles many concurrent clients.
+#
+# Pass --url to drive an already running server instead (workers are then
+# whatever that server was started with).
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from benchmarks.fixtures import LOAD_TEST_PLAYLISTS
+
+USER_ID = '5f0000000000000000000001'
+
+# Relative weights of each operation in the request mix
+MIX = (
+    ('detail', 40),
+    ('detail_if_none_match', 20),
+    ('list', 20),
+    ('progress', 15),
+    ('create', 5),
+)
+
+
+class Client:
+    """One keep-alive HTTP connection issuing JSON requests."""
+
+    def __init__(self, base_url):
+        parsed = urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                return response.status, response.headers, data
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, workers, threads, port):
+    if server == 'async':
+        return [
+            sys.executable, '-m', 'uvicorn',
+            '--workers', str(workers),
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--no-access-log',
+            '--log-level', 'warning',
+            'benchmarks.offline_app:asgi_app'
+        ]
+    return [
+        sys.executable, '-m', 'gunicorn',
+        '-c', 'gunicorn.conf.py',
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--bind', f'127.0.0.1:{port}',
+        '--access-logfile', '',
+        'benchmarks.offline_app:app'
+    ]
+
+
+def start_server(server, workers, threads):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = free_port()
+    process = subprocess.Popen(
+        server_command(server, workers, threads, port),
+        cwd=backend_dir,
+        start_new_session=True
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    client = Client(base_url)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if client.request('GET', '/api/health/live')[0] == 200:
+                return process, base_url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{server} server did not come up within 30s")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def create_body(playlist_id):
+    return {
+        'userId': USER_ID,
+        'title': 'Load test',
+        'playlistUrl': f'https://www.youtube.com/playlist?list={playlist_id}',
+        'scheduleType': 'daily',
+        'dailyHours': 2
+    }
+
+
+def seed(base_url):
+    """Create one schedule per synthetic playlist; returns [(schedule_id, video_links)]."""
+    client = Client(base_url)
+    seeded = []
+    for playlist_id in LOAD_TEST_PLAYLISTS:
+        status, _, data = client.request('POST', '/api/schedule', create_body(playlist_id))
+        if status != 200:
+            raise RuntimeError(f"Seeding failed ({status}): {data[:200]}")
+        result = json.loads(data)
+        links = [video['link'] for videos in result['schedule'].values() for video in videos if 'link' in video]
+        seeded.append((result['scheduleId'], links))
+    return seeded
+
+
+def drive(base_url, seeded, clients, duration):
+    """Run the request mix from ``clients`` threads for ``duration`` seconds."""
+    operations = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    latencies = {name: [] for name in operations}
+    errors = {name: 0 for name in operations}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        client = Client(base_url)
+        etags = {}
+        local = {name: [] for name in operations}
+        failed = {name: 0 for name in operations}
+        while time.monotonic() < stop_at:
+            operation = rng.choices(operations, weights)[0]
+            schedule_id, links = rng.choice(seeded)
+            headers = None
+            if operation == 'detail_if_none_match' and schedule_id in etags:
+                headers = {'If-None-Match': etags[schedule_id]}
+            start = time.perf_counter()
+            try:
+                if operation in ('detail', 'detail_if_none_match'):
+                    status, response_headers, _ = client.request('GET', f'/api/schedules/detail/{schedule_id}', headers=headers)
+                    if status == 200 and response_headers.get('ETag'):
+                        etags[schedule_id] = response_headers['ETag']
+                    ok = status in (200, 304)
+                elif operation == 'list':
+                    status, _, _ = client.request('GET', f'/api/schedules/{USER_ID}?fields=title,summary,progress&limit=20')
+                    ok = status == 200
+                elif operation == 'progress':
+                    status, _, _ = client.request('PUT', f'/api/schedules/{schedule_id}/progress', {
+                        'videoId': rng.choice(links),
+                        'completed': rng.random() < 0.5
+                    })
+                    ok = status == 200
+                else:
+                    status, _, _ = client.request('POST', '/api/schedule', create_body(rng.choice(list(LOAD_TEST_PLAYLISTS))))
+                    ok = status == 200
+            except OSError:
+                ok = False
+            local[operation].append(time.perf_counter() - start)
+            if not ok:
+                failed[operation] += 1
+        with lock:
+            for name in operations:
+                latencies[name].extend(local[name])
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(label, latencies, errors, duration):
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"\n{label}: {total / duration:.1f} req/s, {sum(errors.values())} errors")
+    print(f"  {'operation':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for name, samples in latencies.items():
+        if samples:
+            print(f"  {name:<24}{len(samples):>8}{statistics.median(samples) * 1000:>10.1f}"
+                  f"{percentile(samples, 0.95) * 1000:>10.1f}{errors[name]:>8}")
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--server', choices=('sync', 'async', 'both'), default='sync')
+    parser.add_argument('--url', help='drive an already running server instead of starting one')
+    args = parser.parse_args()
+
+    if args.url:
+        seeded = seed(args.url)
+        report(args.url, *drive(args.url, seeded, args.clients, args.duration), args.duration)
+        return 0
+
+    servers = ('sync', 'async') if args.server == 'both' else (args.server,)
+    summary = []
+    for server in servers:
+        for workers in [int(value) for value in args.workers.split(',')]:
+            process, base_url = start_server(server, workers, args.threads)
+            label = f"{server}: {workers} worker(s)" + (f" x {args.threads} thread(s)" if server == 'sync' else '')
+            try:
+                seeded = seed(base_url)
+                throughput = report(label, *drive(base_url, seeded, args.clients, args.duration), args.duration)
+                summary.append((server, workers, throughput))
+            finally:
+                stop_server(process)
+
+    print(f"\n{args.clients} concurrent clients")
+    print("server  workers  req/s")
+    for server, workers, throughput in summary:
+        print(f"{server:<6}  {workers:>7}  {throughput:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
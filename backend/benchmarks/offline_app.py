@@ -0,0 +1,27 @@
+# offline_app.py
+#
+# WSGI entry point for load tests: the real app and MongoDB (MONGODB_URI),
+# with YouTube replaced by synthetic playlists and Gemini by the stub chat
+# model so runs do not depend on the network. Every worker registers the
+# same playlists at import.
+#
+#     gunicorn -c gunicorn.conf.py benchmarks.offline_app:app
+#     uvicorn benchmarks.offline_app:asgi_app
+
+import os
+
+os.environ.setdefault('CHAT_BACKEND', 'stub')
+
+from benchmarks.fixtures import LOAD_TEST_PLAYLISTS, register_playlist, use_fake_youtube
+
+use_fake_youtube()
+for playlist_id, count in LOAD_TEST_PLAYLISTS.items():
+    register_playlist(playlist_id, count)
+
+from app import app
+
+try:
+    from asgi import app as asgi_app
+except ImportError:
+    # quart/asgiref not installed: only the WSGI app can be load tested
+    asgi_app = None
@@ -0,0 +1,35 @@
+# synthetic.py
+
+import random
+
+from model import format_duration
+
+
+def synthetic_durations(count, seed=0):
+    """Video lengths in seconds drawn from a course-like mix of short, lecture and long videos."""
+    rng = random.Random(seed)
+    durations = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.25:
+            seconds = rng.randint(60, 5 * 60)
+        elif kind < 0.9:
+            seconds = int(rng.lognormvariate(7.0, 0.5))
+        else:
+            seconds = rng.randint(45 * 60, 3 * 3600)
+        durations.append(max(1, seconds))
+    return durations
+
+
+def synthetic_playlist(count, seed=0):
+    """Video records shaped like fetch_single_video output, with no network access."""
+    return [
+        {
+            "title": f"Lecture {index + 1}",
+            "duration": format_duration(seconds),
+            "seconds": seconds,
+            "link": f"https://youtube.com/watch?v={index:011d}",
+            "thumbnail": f"https://img.youtube.com/vi/{index:011d}/mqdefault.jpg"
+        }
+        for index, seconds in enumerate(synthetic_durations(count, seed))
+    ]
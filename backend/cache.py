@@ -0,0 +1,179 @@
+# cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCacheBackend:
+    """In-process LRU store for playlist cache entries."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, playlist_id):
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+            if entry is not None:
+                self._entries.move_to_end(playlist_id)
+            return entry
+
+    def set(self, playlist_id, entry):
+        with self._lock:
+            self._entries[playlist_id] = entry
+            self._entries.move_to_end(playlist_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, playlist_id):
+        with self._lock:
+            self._entries.pop(playlist_id, None)
+
+
+class MongoCacheBackend:
+    """MongoDB-backed store so every worker shares the same playlist cache."""
+
+    def __init__(self, collection, max_entries=1000):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.collection.create_index('last_accessed')
+
+    def get(self, playlist_id):
+        return self.collection.find_one_and_update(
+            {'_id': playlist_id},
+            {'$set': {'last_accessed': time.time()}},
+            projection={'_id': 0}
+        )
+
+    def set(self, playlist_id, entry):
+        doc = dict(entry, last_accessed=time.time())
+        self.collection.replace_one({'_id': playlist_id}, doc, upsert=True)
+        overflow = self.collection.estimated_document_count() - self.max_entries
+        if overflow > 0:
+            stale = self.collection.find({}, {'_id': 1}).sort('last_accessed', 1).limit(overflow)
+            self.collection.delete_many({'_id': {'$in': [stale_doc['_id'] for stale_doc in stale]}})
+
+    def delete(self, playlist_id):
+        self.collection.delete_one({'_id': playlist_id})
+
+
+class PlaylistCache:
+    """Cache of fetched video records keyed by playlist ID.
+
+    An entry stays fresh for ``ttl_seconds``. Expired entries are kept so that
+    a refresh only has to fetch videos whose IDs were not seen before.
+    """
+
+    def __init__(self, backend, ttl_seconds=6 * 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, playlist_id):
+        """Return cached video records if the entry is still fresh, else None."""
+        entry = self.backend.get(playlist_id)
+        if entry is None or time.time() - entry['fetched_at'] > self.ttl_seconds:
+            return None
+        # Callers decorate records (e.g. completion flags), so hand out copies
+        return [dict(video) for video in entry['videos']]
+
+    def get_known(self, playlist_id):
+        """Return every cached record for a playlist keyed by video ID, fresh or not."""
+        entry = self.backend.get(playlist_id)
+        if entry is None:
+            return {}
+        return {video_id: dict(video) for video_id, video in zip(entry['video_ids'], entry['videos'])}
+
+    def put(self, playlist_id, video_ids, records, complete=True):
+        """Store the ordered records of a playlist alongside their video IDs.
+
+        Incomplete results (some videos were dropped) are stored already
+        expired, so the next request retries only the missing videos.
+        """
+        self.backend.set(playlist_id, {
+            'video_ids': list(video_ids),
+            'videos': records,
+            'fetched_at': time.time() if complete else 0
+        })
+
+    def invalidate(self, playlist_id):
+        self.backend.delete(playlist_id)
+
+
+class ExpiringCache:
+    """In-process LRU whose entries also expire ``ttl_seconds`` after they were stored."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.backend = MemoryCacheBackend(max_entries=max_entries)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None or time.time() - entry['stored_at'] > self.ttl_seconds:
+            return None
+        return entry['value']
+
+    def put(self, key, value):
+        self.backend.set(key, {'value': value, 'stored_at': time.time()})
+
+
+class ResponseCache:
+    """In-process LRU of serialised responses, each tagged with the version it was built from.
+
+    ``get`` only returns a body for the exact version asked for, so callers
+    look the current version up first (e.g. a schedule's ``updated_at``) and
+    a write from any worker makes the old body unreachable. Entries are
+    evicted least recently used first once either ``max_entries`` or
+    ``max_bytes`` is exceeded. Values other than bytes or strings need a
+    ``sizeof`` that estimates their footprint.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, body):
+        size = self.sizeof(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (version, body, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+
+def create_playlist_cache(backend_name, collection=None, ttl_seconds=6 * 3600, max_entries=256):
+    """Build a playlist cache for the configured backend ('memory' or 'mongo')."""
+    if backend_name == 'mongo':
+        if collection is None:
+            raise ValueError("A MongoDB collection is required for the mongo cache backend")
+        backend = MongoCacheBackend(collection, max_entries=max_entries)
+    elif backend_name == 'memory':
+        backend = MemoryCacheBackend(max_entries=max_entries)
+    else:
+        raise ValueError(f"Unknown playlist cache backend: {backend_name}")
+    return PlaylistCache(backend, ttl_seconds=ttl_seconds)
@@ -0,0 +1,136 @@
+# chat.py
+#
+# Study assistant behind /api/chat: a compact text context per schedule, the
+# prompt around it, and pluggable model clients that stream the answer in
+# chunks. 'gemini' talks to Gemini; 'stub' answers locally at a configurable
+# speed, for development without an API key and for benchmarks.
+
+import hashlib
+import time
+
+import metrics
+
+CHAT_INSTRUCTIONS = (
+    "You are LearnFast's study assistant. Answer the learner's question briefly. "
+    "Use their schedule below when it is relevant; videos marked [x] are completed."
+)
+
+# Longest video title kept in a context line
+CONTEXT_TITLE_CHARS = 80
+
+
+def build_schedule_context(schedule, max_chars=12000):
+    """Compact text view of a schedule: one line per day with each video's state, title and duration.
+
+    Days past ``max_chars`` are summarised by count, so the prompt stays
+    bounded for very long courses.
+    """
+    videos = [video for day in schedule['schedule_data'] for video in day['videos']]
+    completed = sum(1 for video in videos if video.get('completed'))
+    lines = [
+        f"Schedule: {schedule.get('title', 'Untitled Schedule')} "
+        f"({len(schedule['schedule_data'])} days, {completed}/{len(videos)} videos completed)"
+    ]
+    size = len(lines[0])
+    for index, day in enumerate(schedule['schedule_data']):
+        entries = '; '.join(
+            f"{'[x]' if video.get('completed') else '[ ]'} {video['title'][:CONTEXT_TITLE_CHARS]} ({video['duration']})"
+            for video in day['videos']
+        )
+        line = f"{day['day']} {day.get('date', '')}: {entries}"
+        if size + len(line) > max_chars:
+            lines.append(f"... {len(schedule['schedule_data']) - index} more days")
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return '\n'.join(lines)
+
+
+def build_prompt(message, context=None, video_title=None):
+    parts = [CHAT_INSTRUCTIONS]
+    if context:
+        parts.append(context)
+    if video_title:
+        parts.append(f"The question is about the video: {video_title}")
+    parts.append(f"Question: {message}")
+    return '\n\n'.join(parts)
+
+
+def response_key(client, message, schedule_version=None, video_title=None, mode=None):
+    """Response cache key: the same normalised question about the same schedule version."""
+    question = ' '.join(message.lower().split())
+    raw = '\0'.join(str(part) for part in (client.name, schedule_version, video_title, mode, question))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def stream_answer(client, prompt, cache=None, key=None):
+    """Return ``(cached, chunks)``: a cached answer as one chunk, or the model's stream.
+
+    A streamed answer is cached only once the client has consumed it to the end.
+    """
+    if cache is not None:
+        answer = cache.get(key)
+        if answer is not None:
+            metrics.inc('learnfast_chat_responses_total', result='cached')
+            return True, iter([answer])
+
+    def generate():
+        start = time.perf_counter()
+        chunks = []
+        for chunk in client.stream(prompt):
+            if not chunks:
+                metrics.record_stage('llm_first_token', time.perf_counter() - start)
+            chunks.append(chunk)
+            yield chunk
+        metrics.record_stage('llm', time.perf_counter() - start)
+        metrics.inc('learnfast_chat_responses_total', result='generated')
+        if cache is not None and chunks:
+            cache.put(key, ''.join(chunks))
+
+    return False, generate()
+
+
+class GeminiChatClient:
+    """Streams answers from the shared Gemini model."""
+
+    name = 'gemini-pro'
+
+    def stream(self, prompt):
+        from providers import get_gemini_model
+
+        for chunk in get_gemini_model().generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a safety stop) carry nothing to show
+                continue
+            if text:
+                yield text
+
+
+class StubChatClient:
+    """Local stand-in model: waits ``first_token_seconds``, then emits words at ``tokens_per_second``."""
+
+    name = 'stub'
+
+    def __init__(self, first_token_seconds=0.3, tokens_per_second=50.0):
+        self.first_token_seconds = first_token_seconds
+        self.tokens_per_second = tokens_per_second
+
+    def stream(self, prompt):
+        question = prompt.rsplit('Question: ', 1)[-1]
+        words = f"This is a stub answer to: {question}".split()
+        time.sleep(self.first_token_seconds)
+        for index, word in enumerate(words):
+            if index and self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield word if index == 0 else ' ' + word
+
+
+def create_chat_client(backend_name, first_token_seconds=0.3, tokens_per_second=50.0):
+    """Build the chat model client for the configured backend ('gemini' or 'stub')."""
+    if backend_name == 'gemini':
+        return GeminiChatClient()
+    if backend_name == 'stub':
+        return StubChatClient(first_token_seconds=first_token_seconds, tokens_per_second=tokens_per_second)
+    raise ValueError(f"Unknown chat backend: {backend_name}")
@@ -0,0 +1,182 @@
+# codec.py
+#
+# Compact schedule encodings. Stored videos keep the video ID, integer
+# seconds and title; the watch URL, thumbnail URL and formatted duration are
+# derived again on read. The API can send schedules in a compact or columnar
+# form, as JSON or MessagePack, compressed with gzip or brotli.
+
+import gzip
+import json
+
+from model import extract_video_id, format_duration, get_video_thumbnail, video_seconds, watch_url
+
+# Optional: MessagePack bodies and brotli compression are only offered when installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+FULL = 'full'
+COMPACT = 'compact'
+COLUMNAR = 'columnar'
+SCHEDULE_FORMS = (FULL, COMPACT, COLUMNAR)
+
+# Video fields a compact record derives from videoId and seconds
+DERIVED_KEYS = ('link', 'thumbnail', 'duration')
+STORED_ONLY_KEYS = frozenset(('videoId', 'seconds'))
+
+
+def compact_video(video):
+    """Stored form of a full video record, or the record itself if it would not expand back unchanged.
+
+    A watch URL in another form than pytubefix's is kept as ``link``;
+    records without a video ID (revision days) stay as they are.
+    """
+    if 'videoId' in video:
+        return video
+    video_id = extract_video_id(video.get('link') or '')
+    if not video_id or video.get('thumbnail') != get_video_thumbnail(video_id):
+        return video
+    try:
+        seconds = video_seconds(video)
+    except (KeyError, ValueError):
+        return video
+    if format_duration(seconds) != video['duration']:
+        return video
+
+    compact = {'videoId': video_id, 'seconds': seconds}
+    compact.update((key, value) for key, value in video.items() if key not in DERIVED_KEYS)
+    if video['link'] != watch_url(video_id):
+        compact['link'] = video['link']
+    return compact
+
+
+def expand_video(video):
+    """Full API form of a stored video record."""
+    if 'videoId' not in video:
+        return video
+    video_id = video['videoId']
+    expanded = {
+        'title': video.get('title'),
+        'duration': format_duration(video['seconds']),
+        'link': watch_url(video_id),
+        'thumbnail': get_video_thumbnail(video_id)
+    }
+    for key, value in video.items():
+        if key not in STORED_ONLY_KEYS:
+            expanded[key] = value
+    return expanded
+
+
+def compact_days(schedule_data):
+    """Copy of schedule days with compact video records."""
+    return [dict(day, videos=[compact_video(video) for video in day['videos']]) for day in schedule_data]
+
+
+def expand_days(schedule_data):
+    """Expand the video records of loaded schedule days in place."""
+    for day in schedule_data:
+        if 'videos' in day:
+            day['videos'] = [expand_video(video) for video in day['videos']]
+
+
+def wire_video(video, expand_urls=False):
+    """Compact API form of a stored or full video record; ``expand_urls`` adds its watch and thumbnail URLs."""
+    if 'videoId' in video:
+        if not expand_urls and 'link' not in video:
+            return video
+        record = dict(video)
+        if expand_urls:
+            record['link'] = video.get('link') or watch_url(video['videoId'])
+            record['thumbnail'] = get_video_thumbnail(video['videoId'])
+        else:
+            del record['link']
+        return record
+
+    record = {'videoId': extract_video_id(video.get('link') or '')}
+    derived = DERIVED_KEYS
+    try:
+        record['seconds'] = video_seconds(video) if video.get('duration') else 0
+    except ValueError:
+        # Durations parse_duration cannot read (a day or longer) are passed on as given
+        derived = ('link', 'thumbnail')
+    record.update((key, value) for key, value in video.items() if key not in derived)
+    if expand_urls:
+        record['link'] = video.get('link')
+        record['thumbnail'] = video.get('thumbnail')
+    return record
+
+
+def compact_schedule(schedule, expand_urls=False):
+    """Formatted schedule with compact video records."""
+    return dict(schedule, schedule_data=[
+        dict(day, videos=[wire_video(video, expand_urls) for video in day['videos']])
+        for day in schedule['schedule_data']
+    ])
+
+
+def columnar_schedule(schedule, expand_urls=False):
+    """Formatted schedule with its videos as parallel columns instead of one object each.
+
+    ``schedule_data`` becomes ``{'days': [...], 'videos': {field: [...]}}``.
+    Days keep their fields, with ``videoCount`` in place of ``videos``, and
+    the columns list every video in schedule order; fields a video lacks
+    are null.
+    """
+    days = []
+    records = []
+    for day in schedule['schedule_data']:
+        header = {key: value for key, value in day.items() if key != 'videos'}
+        header['videoCount'] = len(day['videos'])
+        days.append(header)
+        records.extend(wire_video(video, expand_urls) for video in day['videos'])
+
+    fields = {}
+    for record in records:
+        fields.update(dict.fromkeys(record))
+    videos = {field: [record.get(field) for record in records] for field in fields}
+    return dict(schedule, schedule_data={'days': days, 'videos': videos})
+
+
+def encode_schedule(schedule, form=FULL, expand_urls=False):
+    """A formatted schedule in one of SCHEDULE_FORMS."""
+    if form == COMPACT:
+        return compact_schedule(schedule, expand_urls)
+    if form == COLUMNAR:
+        return columnar_schedule(schedule, expand_urls)
+    return schedule
+
+
+def body_types():
+    """Response media types this process can produce, preferred first."""
+    return [JSON, MSGPACK] if msgpack else [JSON]
+
+
+def dumps(value, mimetype=JSON):
+    """Serialise a JSON-compatible value as JSON or MessagePack bytes."""
+    if mimetype == MSGPACK:
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def content_codings():
+    """Content codings this process can produce, preferred first."""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def compress(body, coding):
+    """``body`` compressed with 'br' or 'gzip'; unchanged without a coding."""
+    if not coding:
+        return body
+    if coding == 'br':
+        return brotli.compress(body, quality=5)
+    # A fixed mtime keeps the output, and so any cache of it, deterministic
+    return gzip.compress(body, compresslevel=6, mtime=0)
@@ -0,0 +1,214 @@
+# fetcher.py
+
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class FetchTimeout(Exception):
+    """Raised when a request deadline passed before every video was fetched."""
+
+    def __init__(self, report):
+        super().__init__(f"Timed out after fetching {report.fetched} of {report.total} videos")
+        self.report = report
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests per second go to each host."""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = rate_per_second
+        self.burst = burst or max(1, int(rate_per_second))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host, deadline=None):
+        """Block until a token for ``host`` is available. Returns False if the deadline passes first."""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return True
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class FetchReport:
+    """Outcome counters for one batch of fetches."""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.fetched = 0
+        self.retried = 0
+        self.dropped = 0
+        # Dropped because the deadline passed, not because the video failed
+        self.expired = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, fetched=0, retried=0, dropped=0, expired=0):
+        """Count outcomes; ``expired`` items are also counted in ``dropped``."""
+        with self._lock:
+            if self.closed:
+                return
+            self.fetched += fetched
+            self.retried += retried
+            self.dropped += dropped + expired
+            self.expired += expired
+
+    def close(self):
+        """Stop counting late results once the caller has moved on."""
+        with self._lock:
+            self.closed = True
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'fetched': self.fetched,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'expired': self.expired
+        }
+
+
+class FetchEngine:
+    """Process-wide bounded fetch pool shared by every request.
+
+    ``fetch_one`` is any callable that takes an item (usually a video URL) and
+    returns a record, or raises / returns None on failure. Failed items are
+    retried with jittered exponential backoff until ``max_retries`` or the
+    request deadline is exhausted, and are then counted as dropped. Neither
+    a per-host rate limit nor a deadline applies unless one is given.
+    """
+
+    def __init__(self, max_workers=8, rate_per_host=0.0, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, default_timeout=None):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(rate_per_host)
+        self.totals = FetchReport()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='fetch'
+        )
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def _run(self, item, fetch_one, report, deadline):
+        host = urlparse(item).netloc if isinstance(item, str) else None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                if attempt == 1:
+                    report.add(retried=1)
+                    self.totals.add(retried=1)
+                delay = self._backoff(attempt - 1)
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    return self._expire(report)
+                time.sleep(delay)
+            if not self.rate_limiter.acquire(host, deadline):
+                return self._expire(report)
+            try:
+                result = fetch_one(item)
+            except Exception as e:
+                print(f"Error fetching {item}: {str(e)}")
+                result = None
+            if result is not None:
+                report.add(fetched=1)
+                self.totals.add(fetched=1)
+                return result
+        report.add(dropped=1)
+        self.totals.add(dropped=1)
+        return None
+
+    def _expire(self, report):
+        report.add(expired=1)
+        self.totals.add(expired=1)
+        return None
+
+    def submit(self, item, fetch_one, report, deadline=None):
+        """Schedule a single fetch on the shared pool and return its future."""
+        return self._executor.submit(self._run, item, fetch_one, report, deadline)
+
+    def iter_results(self, items, fetch_one, report, timeout=None):
+        """Yield results in input order as soon as each one (and all before it) resolves.
+
+        Items still pending when ``timeout`` seconds (default: the engine's
+        ``default_timeout``) have elapsed are cancelled and yielded as None.
+        Outstanding fetches are cancelled if the consumer stops early.
+        """
+        timeout = timeout if timeout is not None else self.default_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        futures = [self.submit(item, fetch_one, report, deadline) for item in items]
+        try:
+            for index, future in enumerate(futures):
+                remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+                try:
+                    yield future.result(timeout=remaining)
+                except concurrent.futures.TimeoutError:
+                    pending = futures[index:]
+                    for pending_future in pending:
+                        # Fetches already running finish on their own and count themselves in the totals
+                        if pending_future.cancel():
+                            self.totals.add(expired=1)
+                    report.add(expired=len(pending))
+                    report.close()
+                    for _ in pending:
+                        yield None
+                    return
+        finally:
+            for future in futures:
+                future.cancel()
+            report.close()
+
+    def fetch_all(self, items, fetch_one, timeout=None):
+        """Fetch every item and return ``(results, report)`` with results in input order."""
+        items = list(items)
+        report = FetchReport(total=len(items))
+        results = list(self.iter_results(items, fetch_one, report, timeout))
+        return results, report
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_engine = None
+_default_engine_pid = None
+_default_engine_lock = threading.Lock()
+
+
+def get_fetch_engine():
+    """Return the shared fetch engine, creating it from the environment on first use.
+
+    The engine is per process: pool threads do not survive a fork, so a
+    forked worker builds its own.
+    """
+    global _default_engine, _default_engine_pid
+    if _default_engine_pid != os.getpid():
+        with _default_engine_lock:
+            if _default_engine_pid != os.getpid():
+                _default_engine = FetchEngine(
+                    max_workers=int(os.getenv('FETCH_MAX_WORKERS', 8)),
+                    # Every video comes from youtube.com, so a per-host limit caps the whole process
+                    rate_per_host=float(os.getenv('FETCH_RATE_PER_HOST', 0)),
+                    max_retries=int(os.getenv('FETCH_MAX_RETRIES', 2)),
+                    backoff_base=float(os.getenv('FETCH_BACKOFF_BASE', 0.5)),
+                    default_timeout=float(os.getenv('FETCH_DEADLINE_SECONDS', 0)) or None
+                )
+                _default_engine_pid = os.getpid()
+    return _default_engine
@@ -0,0 +1,62 @@
+# gunicorn.conf.py
+#
+# Production entry point for the Flask API:
+#
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# Every setting can be overridden from the environment. Each worker process
+# builds its own MongoClient, fetch pool, caches and job workers on first
+# use (see providers.lazy), so nothing opened before the fork is shared.
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+
+# Threads let a worker keep serving while other requests wait on YouTube or
+# MongoDB; keep MONGO_MAX_POOL_SIZE at or above threads + JOB_WORKERS.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Each worker is a separate process with its own in-process state:
+# - A job polled at /api/jobs/<id> can land on any worker, so with more than
+#   one worker the job queue must be the shared 'mongo' backend; it is the
+#   default here, and an explicit JOB_QUEUE_BACKEND=local refuses to start.
+# - FETCH_COALESCE_BACKEND=mongo makes workers read each other's fetches from
+#   the playlist cache, so it needs PLAYLIST_CACHE_BACKEND=mongo; create_app
+#   refuses to start each worker otherwise.
+# - /api/metrics reports only the worker that serves the scrape. Scrape every
+#   worker (or run one worker per container) to see the whole service.
+if workers > 1:
+    os.environ.setdefault('JOB_QUEUE_BACKEND', 'mongo')
+    if os.environ['JOB_QUEUE_BACKEND'] == 'local':
+        raise RuntimeError(
+            f"JOB_QUEUE_BACKEND=local keeps jobs in one process; use 'mongo' with {workers} workers"
+        )
+
+# A synchronous POST /api/schedule fetches its whole playlist, with no
+# deadline unless FETCH_DEADLINE_SECONDS is set; keep that below this timeout
+# and send very large playlists through the job queue (async=true)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 180))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound growth of the in-process caches
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+# Importing once in the master speeds up worker boot; clients are still
+# created per worker after the fork
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_worker_init(worker):
+    # Ensure indexes in each worker (never in the preloading master) before it
+    # takes traffic; WARM_START=1 also builds the other MongoDB-backed services
+    import app
+    app.create_app()
@@ -0,0 +1,95 @@
+# health.py
+
+import os
+import threading
+import time
+
+
+class CachedCheck:
+    """Runs ``check`` at most once per ``ttl`` seconds and replays the last result in between.
+
+    ``check`` returns nothing on success and raises on failure. Concurrent
+    callers with a stale result wait for a single refresh instead of each
+    running the check.
+    """
+
+    def __init__(self, check, ttl=10.0):
+        self.check = check
+        self.ttl = ttl
+        self._result = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        result = self._result
+        if result is not None and time.monotonic() - result['_at'] < self.ttl:
+            return status_view(result)
+        with self._lock:
+            result = self._result
+            if result is None or time.monotonic() - result['_at'] >= self.ttl:
+                result = self._result = run_check(self.check)
+        return status_view(result)
+
+
+class DependencyMonitor:
+    """Background thread refreshing slow or paid dependency checks every ``interval`` seconds.
+
+    Probes only read the last-known status, so they never wait on (or pay
+    for) the dependency itself.
+    """
+
+    def __init__(self, checks, interval=300.0):
+        self.checks = checks
+        self.interval = interval
+        self._results = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='health', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        for name, check in self.checks.items():
+            self._results[name] = run_check(check)
+
+    def status(self):
+        """Last-known status of every dependency, 'unknown' until its first check finishes."""
+        return {
+            name: status_view(self._results[name]) if name in self._results else {'status': 'unknown'}
+            for name in self.checks
+        }
+
+    def stop(self):
+        self._stop.set()
+
+
+def run_check(check):
+    start = time.perf_counter()
+    try:
+        check()
+        result = {'status': 'ok'}
+    except Exception as e:
+        print(f"Health check error: {str(e)}")
+        result = {'status': 'error', 'error': str(e)}
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    result['_at'] = time.monotonic()
+    return result
+
+
+def status_view(result):
+    """Public copy of a stored check result with its age instead of the raw timestamp."""
+    view = {key: value for key, value in result.items() if key != '_at'}
+    view['age_seconds'] = round(time.monotonic() - result['_at'], 1)
+    return view
+
+
+def liveness():
+    """In-process liveness: answering at all means the worker is alive."""
+    return {'status': 'alive', 'pid': os.getpid()}
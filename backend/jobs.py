@@ -0,0 +1,239 @@
+# jobs.py
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def job_key(payload):
+    """Stable key for a job payload so identical requests can be merged."""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def format_job(job):
+    """Shape a stored job for the API."""
+    return {
+        'jobId': str(job['_id']),
+        'status': job['status'],
+        'progress': job.get('progress', {'fetched': 0, 'total': None}),
+        'result': job.get('result'),
+        'error': job.get('error'),
+        'created_at': job['created_at'].isoformat(),
+        'updated_at': job['updated_at'].isoformat()
+    }
+
+
+class ProgressReporter:
+    """Progress callback that forwards at most one update per ``interval`` seconds."""
+
+    def __init__(self, publish, interval=1.0):
+        self.publish = publish
+        self.interval = interval
+        self._last = 0
+
+    def __call__(self, fetched, total):
+        now = time.monotonic()
+        if fetched == total or now - self._last >= self.interval:
+            self._last = now
+            self.publish({'fetched': fetched, 'total': total})
+
+
+class LocalJobQueue:
+    """In-process job queue running handlers on a local worker pool."""
+
+    def __init__(self, handler, workers=4, retention_seconds=3600):
+        self.handler = handler
+        self.retention_seconds = retention_seconds
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, payload):
+        """Queue a job, or return the ID of an identical job still in flight."""
+        key = job_key(payload)
+        with self._lock:
+            self._prune()
+            if key in self._active:
+                return self._active[key]
+            job_id = uuid.uuid4().hex
+            now = datetime.now()
+            self._jobs[job_id] = {
+                '_id': job_id,
+                'key': key,
+                'status': 'queued',
+                'progress': {'fetched': 0, 'total': None},
+                'created_at': now,
+                'updated_at': now
+            }
+            self._active[key] = job_id
+        self._executor.submit(self._run, job_id, payload)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields, updated_at=datetime.now())
+            if job['status'] not in ACTIVE_STATUSES:
+                self._active.pop(job['key'], None)
+
+    def _run(self, job_id, payload):
+        self._update(job_id, status='running')
+        progress = ProgressReporter(lambda value: self._update(job_id, progress=value), interval=0)
+        try:
+            result = self.handler(payload, progress)
+            self._update(job_id, status='done', result=result)
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e))
+
+    def _prune(self):
+        cutoff = datetime.now().timestamp() - self.retention_seconds
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job['status'] not in ACTIVE_STATUSES and job['updated_at'].timestamp() < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MongoJobQueue:
+    """Job queue stored in a MongoDB collection and drained by every worker process.
+
+    Each process polls for queued jobs and claims them atomically. Jobs whose
+    lease expires (the worker died mid-run) are picked up again.
+    """
+
+    def __init__(self, collection, handler, workers=4, poll_interval=1.0, lease_seconds=300,
+                 retention_seconds=3600):
+        self.collection = collection
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+        self.collection.create_index(
+            'key',
+            unique=True,
+            partialFilterExpression={'active': True}
+        )
+        self.collection.create_index([('status', 1), ('created_at', 1)])
+        self.collection.create_index('finished_at', expireAfterSeconds=retention_seconds)
+
+        self._threads = [
+            threading.Thread(target=self._poll, name=f'job-{index}', daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, payload):
+        """Queue a job, or return the ID of an identical job still in flight."""
+        key = job_key(payload)
+        now = datetime.now()
+        try:
+            result = self.collection.insert_one({
+                'key': key,
+                'active': True,
+                'status': 'queued',
+                'payload': payload,
+                'progress': {'fetched': 0, 'total': None},
+                'created_at': now,
+                'updated_at': now
+            })
+            return str(result.inserted_id)
+        except DuplicateKeyError:
+            existing = self.collection.find_one({'key': key, 'active': True}, {'_id': 1})
+            if existing:
+                return str(existing['_id'])
+            # The identical job finished between the insert and the lookup
+            return self.submit(payload)
+
+    def get(self, job_id):
+        if not ObjectId.is_valid(job_id):
+            return None
+        return self.collection.find_one({'_id': ObjectId(job_id)}, {'payload': 0})
+
+    def _claim(self):
+        now = time.time()
+        return self.collection.find_one_and_update(
+            {
+                '$or': [
+                    {'status': 'queued'},
+                    {'status': 'running', 'lease_expires': {'$lt': now}}
+                ]
+            },
+            {
+                '$set': {
+                    'status': 'running',
+                    'worker': self.worker_id,
+                    'lease_expires': now + self.lease_seconds,
+                    'updated_at': datetime.now()
+                }
+            },
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _update(self, job_id, fields, finished=False):
+        update = {'$set': dict(fields, updated_at=datetime.now())}
+        if finished:
+            update['$set']['finished_at'] = datetime.now()
+            update['$unset'] = {'active': '', 'lease_expires': ''}
+        else:
+            update['$set']['lease_expires'] = time.time() + self.lease_seconds
+        self.collection.update_one({'_id': job_id}, update)
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Job queue poll error: {str(e)}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            job_id = job['_id']
+            progress = ProgressReporter(lambda value: self._update(job_id, {'progress': value}))
+            try:
+                result = self.handler(job['payload'], progress)
+                self._update(job_id, {'status': 'done', 'result': result}, finished=True)
+            except Exception as e:
+                print(f"Job {job_id} failed: {str(e)}")
+                self._update(job_id, {'status': 'failed', 'error': str(e)}, finished=True)
+
+    def shutdown(self):
+        self._stop.set()
+
+
+def create_job_queue(backend_name, handler, collection=None, workers=4):
+    """Build a job queue for the configured backend ('local' or 'mongo')."""
+    if backend_name == 'mongo':
+        if collection is None:
+            raise ValueError("A MongoDB collection is required for the mongo job queue")
+        return MongoJobQueue(collection, handler, workers=workers)
+    if backend_name == 'local':
+        return LocalJobQueue(handler, workers=workers)
+    raise ValueError(f"Unknown job queue backend: {backend_name}")
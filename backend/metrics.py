@@ -0,0 +1,204 @@
+# metrics.py
+#
+# In-process request instrumentation: stage timers collected per request,
+# process-wide counters and latency histograms, rendered in the Prometheus
+# text format by /api/metrics. No dependencies, so model.py can use it too.
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_HELP = {
+    'learnfast_http_requests_total': ('counter', 'HTTP requests by route, method and status.'),
+    'learnfast_http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method.'),
+    'learnfast_stage_duration_seconds': ('histogram', 'Time spent in each request stage.'),
+    'learnfast_videos_fetched_total': ('counter', 'Videos fetched from YouTube.'),
+    'learnfast_videos_failed_total': ('counter', 'Videos dropped after exhausting fetch retries.'),
+    'learnfast_playlist_cache_total': ('counter', 'Playlist cache lookups by result (hit, partial, miss).'),
+    'learnfast_playlist_cache_videos_reused_total': ('counter', 'Videos served from the playlist cache.'),
+    'learnfast_db_commands_total': ('counter', 'MongoDB round trips by command.'),
+    'learnfast_db_command_failures_total': ('counter', 'Failed MongoDB commands by command.'),
+    'learnfast_response_cache_total': ('counter', 'Schedule response cache lookups by result (hit, miss, not_modified).'),
+    'learnfast_progress_writes_total': ('counter', 'Progress writes issued to MongoDB.'),
+    'learnfast_progress_coalesced_total': ('counter', 'Progress toggles merged into another write.'),
+    'learnfast_playlist_fetches_total': ('counter', 'Playlist fetch requests by result (leader, coalesced, waited).'),
+    'learnfast_course_duplicate_videos_total': ('counter', 'Videos skipped as repeats when merging course playlists.'),
+    'learnfast_chat_responses_total': ('counter', 'Chat answers by result (generated, cached).'),
+    'learnfast_schedule_view_cache_total': ('counter', 'Per-version schedule view lookups (chat context, title index, budget preview, encoded body) by result.'),
+    'learnfast_bulk_import_users_total': ('counter', 'Users processed by bulk schedule imports by result.'),
+}
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        if not value:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(histogram.counts), histogram.sum, histogram.count, histogram.buckets)
+                for key, histogram in self._histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in METRIC_HELP:
+                kind, text = METRIC_HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for (name, labels), counts, total, count, buckets in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class RequestTimings:
+    """Stage durations and counts collected while serving one request."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+
+    def add(self, stage, seconds, count=1):
+        self.stages[stage] = self.stages.get(stage, 0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def server_timing(self, total=None):
+        """Format the stages as a Server-Timing header value (durations in ms)."""
+        entries = [
+            f'{stage};desc="{self.counts[stage]}x";dur={seconds * 1000:.1f}'
+            if self.counts[stage] > 1 else f'{stage};dur={seconds * 1000:.1f}'
+            for stage, seconds in self.stages.items()
+        ]
+        if total is not None:
+            entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Begin collecting stage timings for the current request."""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def end_request():
+    # Worker threads are reused across requests, so never leave timings behind
+    _current_timings.set(None)
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+def record_stage(stage, seconds, count=1):
+    """Record time spent in a stage on the current request and the stage histogram."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds, count)
+    registry.observe('learnfast_stage_duration_seconds', seconds, stage=stage)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as a named request stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def command_listener():
+    """PyMongo command listener counting round trips and timing them as the 'db' stage."""
+    from pymongo import monitoring
+
+    class CommandMetrics(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            registry.inc('learnfast_db_commands_total', command=event.command_name)
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.add('db', event.duration_micros / 1e6)
+
+        def failed(self, event):
+            registry.inc('learnfast_db_commands_total', command=event.command_name)
+            registry.inc('learnfast_db_command_failures_total', command=event.command_name)
+
+    return CommandMetrics()
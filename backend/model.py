@@ -1,9 +1,14 @@
 # model.py
 
-from pytubefix import Playlist
+import asyncio
+from array import array
+from bisect import bisect_right
 from datetime import timedelta
+from functools import lru_cache
 import re
-import concurrent.futures
+import time
+from fetcher import FetchReport, FetchTimeout, get_fetch_engine
+import metrics
 
 def validate_playlist_url(url):
     """Validate YouTube playlist URL."""
@@ -13,6 +18,8 @@ def validate_playlist_url(url):
         raise ValueError("Invalid YouTube playlist URL")
     return True
 
+# Video lengths repeat a lot across schedules, and every read of a compact schedule formats them
+@lru_cache(maxsize=65536)
 def format_duration(seconds):
     """Format duration in seconds to HH:MM:SS."""
     return str(timedelta(seconds=seconds))
@@ -21,12 +28,21 @@ def get_video_thumbnail(video_id):
     """Get video thumbnail URL."""
     return f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg"
 
+def watch_url(video_id):
+    """Watch URL in the form pytubefix reports it."""
+    return f"https://youtube.com/watch?v={video_id}"
+
 def extract_video_id(url):
     """Extract video ID from YouTube URL."""
     pattern = r'(?:v=|\/)([0-9A-Za-z_-]{11}).*'
     match = re.search(pattern, url)
     return match.group(1) if match else None
 
+def extract_playlist_id(url):
+    """Extract playlist ID from YouTube URL."""
+    match = re.search(r'[?&]list=([0-9A-Za-z_-]+)', url)
+    return match.group(1) if match else None
+
 def parse_duration(duration_str):
     """Convert duration string to seconds."""
     parts = duration_str.split(':')
@@ -38,6 +54,21 @@ def parse_duration(duration_str):
         return minutes * 60 + seconds
     return int(parts[0])
 
+def video_seconds(video):
+    """Length of a video record in seconds; records from before ``seconds`` was stored are parsed."""
+    seconds = video.get("seconds")
+    return seconds if seconds is not None else parse_duration(video["duration"])
+
+def open_playlist(url):
+    """pytubefix Playlist for ``url``; pytubefix is only imported once videos are fetched."""
+    from pytubefix import Playlist
+    return Playlist(url)
+
+def open_video(url):
+    """pytubefix YouTube object for a watch URL."""
+    from pytubefix import YouTube
+    return YouTube(url)
+
 def fetch_single_video(video):
     """Fetch details for a single video."""
     try:
@@ -45,6 +76,7 @@ def fetch_single_video(video):
         return {
             "title": video.title,
             "duration": format_duration(video.length),
+            "seconds": video.length,
             "link": video.watch_url,
             "thumbnail": get_video_thumbnail(video_id)
         }
@@ -52,157 +84,687 @@ def fetch_single_video(video):
         print(f"Error processing video: {str(e)}")
         return None
 
-def fetch_playlist_details(playlist_url):
-    """Fetch details of all videos in a playlist using concurrent processing."""
+def fetch_video_by_url(url):
+    """Fetch details for a single video from its watch URL."""
+    try:
+        video = open_video(url)
+    except Exception as e:
+        print(f"Error processing video: {str(e)}")
+        return None
+    return fetch_single_video(video)
+
+def iter_playlist_details(playlist_url, cache=None, engine=None, timeout=None, progress=None):
+    """Yield video details in playlist order as soon as each video resolves.
+
+    When a ``PlaylistCache`` is given, a fresh entry is replayed without
+    touching YouTube, and an expired entry only triggers fetches for video IDs
+    that were not seen before. ``timeout`` is the per-request deadline in
+    seconds; if it passes with videos unresolved, FetchTimeout is raised
+    once the stream has been consumed instead of returning a shortened
+    playlist. ``progress`` is called with ``(resolved, total)`` as videos
+    resolve. The cache is only updated once the stream has been consumed to
+    the end.
+    """
+    playlist_id = extract_playlist_id(playlist_url)
+    if cache is not None and playlist_id:
+        cached_videos = cache.get(playlist_id)
+        if cached_videos:
+            metrics.inc('learnfast_playlist_cache_total', result='hit')
+            metrics.inc('learnfast_playlist_cache_videos_reused_total', len(cached_videos))
+            if progress:
+                progress(len(cached_videos), len(cached_videos))
+            yield from cached_videos
+            return
+
+    with metrics.stage('playlist'):
+        playlist = open_playlist(playlist_url)
+        video_urls = list(playlist.video_urls)
+    if not video_urls:
+        raise ValueError("The playlist is empty or inaccessible.")
+
+    known = cache.get_known(playlist_id) if cache is not None and playlist_id else {}
+    if cache is not None and playlist_id:
+        metrics.inc('learnfast_playlist_cache_total', result='partial' if known else 'miss')
+        metrics.inc('learnfast_playlist_cache_videos_reused_total', len(known))
+    video_ids = [extract_video_id(url) for url in video_urls]
+    new_urls = [url for url, video_id in zip(video_urls, video_ids) if video_id not in known]
+
+    # Process only videos that are not cached yet on the bounded shared pool
+    engine = engine or get_fetch_engine()
+    report = FetchReport(total=len(new_urls))
+    fetched = engine.iter_results(new_urls, fetch_video_by_url, report, timeout=timeout)
+
+    # Keep playlist order and filter out failed videos; time spent waiting on
+    # the pool is the 'fetch' stage, time spent in the consumer is not counted
+    resolved_ids = []
+    resolved = []
+    fetch_wait = 0.0
+    for index, video_id in enumerate(video_ids):
+        if video_id in known:
+            video = known[video_id]
+        else:
+            start = time.perf_counter()
+            video = next(fetched)
+            fetch_wait += time.perf_counter() - start
+        if progress:
+            progress(index + 1, len(video_ids))
+        if video is None:
+            continue
+        resolved_ids.append(video_id)
+        resolved.append(video)
+        yield dict(video) if cache is not None else video
+
+    metrics.record_stage('fetch', fetch_wait)
+    metrics.inc('learnfast_videos_fetched_total', report.fetched)
+    metrics.inc('learnfast_videos_failed_total', report.dropped)
+    if report.retried or report.dropped:
+        print(f"Playlist fetch for {playlist_id}: {report.to_dict()}")
+
+    if not resolved:
+        raise ValueError("No valid videos found in playlist")
+
+    if cache is not None and playlist_id:
+        cache.put(playlist_id, resolved_ids, resolved, complete=not report.dropped)
+    # What did resolve stays cached, so a retry only fetches the rest
+    if report.expired:
+        raise FetchTimeout(report)
+
+def fetch_playlist_details(playlist_url, cache=None, engine=None, timeout=None, progress=None):
+    """Fetch details of all videos in a playlist on the shared fetch engine."""
+    try:
+        return list(iter_playlist_details(
+            playlist_url,
+            cache=cache,
+            engine=engine,
+            timeout=timeout,
+            progress=progress
+        ))
+    except FetchTimeout:
+        raise
+    except Exception as e:
+        raise Exception(f"Error fetching playlist details: {str(e)}")
+
+def list_playlist_urls(playlist_url):
+    """Watch URLs of a playlist; None (so the fetch engine retries) if it lists nothing."""
+    return list(open_playlist(playlist_url).video_urls) or None
+
+def fetch_course_details(playlist_urls, cache=None, engine=None, timeout=None, progress=None):
+    """Fetch several playlists as one course: videos in playlist order, each listed once.
+
+    The playlists are listed concurrently and every uncached video of the
+    whole course is fetched in a single batch on the shared fetch engine, so
+    a course takes about as long as its largest playlist rather than the sum.
+    A video repeated across playlists is fetched once and kept at its first
+    position. Each record carries the URL it came from as ``source_playlist``.
+    Per-playlist cache entries are read and written as for a single playlist,
+    and a passed deadline raises FetchTimeout the same way.
+    """
+    engine = engine or get_fetch_engine()
+    playlist_ids = [extract_playlist_id(url) for url in playlist_urls]
+
+    # Fully cached playlists need no listing
+    cached = {}
+    known = {}
+    for playlist_id in playlist_ids:
+        if cache is not None and playlist_id and playlist_id not in cached:
+            videos = cache.get(playlist_id)
+            if videos:
+                cached[playlist_id] = videos
+                metrics.inc('learnfast_playlist_cache_total', result='hit')
+                metrics.inc('learnfast_playlist_cache_videos_reused_total', len(videos))
+                known.update((extract_video_id(video['link']), video) for video in videos)
+
+    to_list = list(dict.fromkeys(
+        url for url, playlist_id in zip(playlist_urls, playlist_ids) if playlist_id not in cached
+    ))
+    with metrics.stage('playlist'):
+        listings, listing_report = engine.fetch_all(to_list, list_playlist_urls, timeout=timeout)
+    listed = dict(zip(to_list, listings))
+    for url in to_list:
+        if not listed[url]:
+            raise ValueError(f"The playlist {url} is empty or inaccessible.")
+
+    playlists = []
+    for url, playlist_id in zip(playlist_urls, playlist_ids):
+        if playlist_id in cached:
+            video_ids = [extract_video_id(video['link']) for video in cached[playlist_id]]
+        else:
+            video_ids = [extract_video_id(video_url) for video_url in listed[url]]
+            if cache is not None and playlist_id:
+                playlist_known = cache.get_known(playlist_id)
+                metrics.inc('learnfast_playlist_cache_total', result='partial' if playlist_known else 'miss')
+                metrics.inc('learnfast_playlist_cache_videos_reused_total', len(playlist_known))
+                known.update(playlist_known)
+        playlists.append((url, playlist_id, video_ids))
+
+    # One fetch per unique video across the course
+    new_urls = {}
+    for url, _, video_ids in playlists:
+        if url in listed:
+            for video_id, video_url in zip(video_ids, listed[url]):
+                if video_id not in known:
+                    new_urls.setdefault(video_id, video_url)
+    report = FetchReport(total=len(new_urls))
+    fetched = engine.iter_results(list(new_urls.values()), fetch_video_by_url, report, timeout=timeout)
+
+    start = time.perf_counter()
+    for index, video_id in enumerate(new_urls):
+        known[video_id] = next(fetched)
+        if progress:
+            progress(index + 1, len(new_urls))
+    metrics.record_stage('fetch', time.perf_counter() - start)
+    metrics.inc('learnfast_videos_fetched_total', report.fetched)
+    metrics.inc('learnfast_videos_failed_total', report.dropped)
+    if report.retried or report.dropped or listing_report.retried:
+        print(f"Course fetch for {len(playlist_urls)} playlists: {report.to_dict()}")
+
+    course = []
+    seen = set()
+    duplicates = 0
+    for url, playlist_id, video_ids in playlists:
+        resolved_ids = [video_id for video_id in video_ids if known.get(video_id) is not None]
+        if cache is not None and playlist_id and playlist_id not in cached and resolved_ids:
+            cache.put(
+                playlist_id,
+                resolved_ids,
+                [known[video_id] for video_id in resolved_ids],
+                complete=len(resolved_ids) == len(video_ids)
+            )
+        for video_id in resolved_ids:
+            if video_id in seen:
+                duplicates += 1
+                continue
+            seen.add(video_id)
+            course.append(dict(known[video_id], source_playlist=url))
+
+    metrics.inc('learnfast_course_duplicate_videos_total', duplicates)
+    if report.expired:
+        raise FetchTimeout(report)
+    if not course:
+        raise ValueError("No valid videos found in playlists")
+    return course
+
+async def fetch_playlist_details_async(playlist_url, cache=None, engine=None, timeout=None):
+    """Asyncio counterpart of ``fetch_playlist_details`` with the same cache behaviour.
+
+    pytubefix is blocking, so the playlist listing runs in a worker thread and
+    each video is fetched on the shared fetch engine; the event loop only
+    awaits their futures, so a process can have many playlists in flight
+    without a thread per request.
+    """
     try:
-        playlist = Playlist(playlist_url)
-        if not playlist.videos:
+        playlist_id = extract_playlist_id(playlist_url)
+        use_cache = cache is not None and playlist_id
+        if use_cache:
+            cached_videos = await asyncio.to_thread(cache.get, playlist_id)
+            if cached_videos:
+                metrics.inc('learnfast_playlist_cache_total', result='hit')
+                metrics.inc('learnfast_playlist_cache_videos_reused_total', len(cached_videos))
+                return cached_videos
+
+        start = time.perf_counter()
+        video_urls = await asyncio.to_thread(lambda: list(open_playlist(playlist_url).video_urls))
+        metrics.record_stage('playlist', time.perf_counter() - start)
+        if not video_urls:
             raise ValueError("The playlist is empty or inaccessible.")
-        
-        # Use ThreadPoolExecutor for parallel processing
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Process videos concurrently
-            video_details = list(executor.map(fetch_single_video, playlist.videos))
-        
-        # Filter out None values (failed videos)
-        video_details = [video for video in video_details if video is not None]
-        
-        if not video_details:
+
+        known = await asyncio.to_thread(cache.get_known, playlist_id) if use_cache else {}
+        if use_cache:
+            metrics.inc('learnfast_playlist_cache_total', result='partial' if known else 'miss')
+            metrics.inc('learnfast_playlist_cache_videos_reused_total', len(known))
+        video_ids = [extract_video_id(url) for url in video_urls]
+        new_urls = [url for url, video_id in zip(video_urls, video_ids) if video_id not in known]
+
+        engine = engine or get_fetch_engine()
+        timeout = timeout if timeout is not None else engine.default_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        report = FetchReport(total=len(new_urls))
+        futures = [engine.submit(url, fetch_video_by_url, report, deadline) for url in new_urls]
+        waiters = [asyncio.wrap_future(future) for future in futures]
+
+        start = time.perf_counter()
+        done = set()
+        if waiters:
+            done, pending = await asyncio.wait(waiters, timeout=timeout or None)
+            for future, waiter in zip(futures, waiters):
+                if waiter in pending and future.cancel():
+                    engine.totals.add(expired=1)
+            report.add(expired=len(pending))
+            report.close()
+        metrics.record_stage('fetch', time.perf_counter() - start)
+
+        # Keep playlist order and filter out failed videos
+        fetched = iter(waiter.result() if waiter in done else None for waiter in waiters)
+        resolved_ids = []
+        resolved = []
+        for video_id in video_ids:
+            video = known[video_id] if video_id in known else next(fetched)
+            if video is not None:
+                resolved_ids.append(video_id)
+                resolved.append(video)
+
+        metrics.inc('learnfast_videos_fetched_total', report.fetched)
+        metrics.inc('learnfast_videos_failed_total', report.dropped)
+        if report.retried or report.dropped:
+            print(f"Playlist fetch for {playlist_id}: {report.to_dict()}")
+        if not resolved:
             raise ValueError("No valid videos found in playlist")
-        
-        return video_details
+
+        if use_cache:
+            await asyncio.to_thread(cache.put, playlist_id, resolved_ids, resolved, not report.dropped)
+        if report.expired:
+            raise FetchTimeout(report)
+        return [dict(video) for video in resolved] if use_cache else resolved
+    except FetchTimeout:
+        raise
     except Exception as e:
         raise Exception(f"Error fetching playlist details: {str(e)}")
 
-def create_schedule_time_based(video_details, daily_time_minutes, completed_videos=None, last_day_number=0, completed_video_details=None):
-    """Create schedule based on daily time limit."""
-    try:
-        completed_videos = completed_videos or []
-        completed_video_details = completed_video_details or []
-        daily_time_seconds = (daily_time_minutes - 10) * 60
-        schedule = {}
-        
-        # First, preserve completed videos in their original days
-        for video in completed_video_details:
-            day_key = f"Day {last_day_number}"
-            if day_key not in schedule:
-                schedule[day_key] = []
-            schedule[day_key].append(video)
+def iter_schedule_time_based(video_details, daily_time_minutes, completed_videos=None, last_day_number=0, completed_video_details=None):
+    """Yield ``(day_key, videos)`` pairs as each day of a time-based schedule is closed.
 
-        # Start scheduling remaining videos from the next day
-        current_day = last_day_number + 1
-        current_day_videos = []
-        current_day_duration = 0
+    ``video_details`` may be any iterable, including the stream produced by
+    ``iter_playlist_details``, so days are emitted while videos are still
+    being fetched.
+    """
+    completed_videos = set(completed_videos or [])
+    completed_video_details = completed_video_details or []
+    daily_time_seconds = (daily_time_minutes - 10) * 60
+
+    # First, preserve completed videos in their original days
+    if completed_video_details:
+        yield f"Day {last_day_number}", list(completed_video_details)
+
+    # Start scheduling remaining videos from the next day
+    current_day = last_day_number + 1
+    current_day_videos = []
+    current_day_duration = 0
 
+    for video in video_details:
         # Schedule only non-completed videos
-        remaining_videos = [
-            video for video in video_details 
-            if video['link'] not in completed_videos
-        ]
-
-        for video in remaining_videos:
-            video_duration = parse_duration(video["duration"])
-
-            if current_day_duration + video_duration <= daily_time_seconds:
-                current_day_videos.append(video)
-                current_day_duration += video_duration
-            else:
-                if current_day_videos:
-                    schedule[f"Day {current_day}"] = current_day_videos
-                    current_day += 1
-                current_day_videos = [video]
-                current_day_duration = video_duration
-
-        if current_day_videos:
-            schedule[f"Day {current_day}"] = current_day_videos
+        if video['link'] in completed_videos:
+            continue
 
-        return schedule
+        video_duration = video_seconds(video)
 
-    except Exception as e:
-        raise ValueError(f"Error creating time-based schedule: {str(e)}")
+        if current_day_duration + video_duration <= daily_time_seconds:
+            current_day_videos.append(video)
+            current_day_duration += video_duration
+        else:
+            if current_day_videos:
+                yield f"Day {current_day}", current_day_videos
+                current_day += 1
+            current_day_videos = [video]
+            current_day_duration = video_duration
 
-def create_schedule_day_based(video_details, num_days, completed_videos=None, last_day_number=0, completed_video_details=None):
-    """Create schedule based on number of days."""
-    try:
-        completed_videos = completed_videos or []
+    if current_day_videos:
+        yield f"Day {current_day}", current_day_videos
+
+REVISION_DAY = {
+    "title": "Revision Day",
+    "duration": "00:00:00",
+    "link": None,
+    "thumbnail": None
+}
+
+def prefix_sums(seconds):
+    """Array of running totals with a leading 0, so a slice total is ``prefix[end] - prefix[start]``."""
+    prefix = array('q', [0]) * (len(seconds) + 1)
+    total = 0
+    for index, video_seconds in enumerate(seconds, 1):
+        total += video_seconds
+        prefix[index] = total
+    return prefix
+
+class CompactPlaylist:
+    """Videos plus their durations in seconds, parsed once into a typed array.
+
+    The schedulers work on ``seconds`` and on day layouts expressed as arrays
+    of start offsets into ``videos``; records and formatted strings are only
+    produced when the schedule dict is built for the API.
+    """
+
+    def __init__(self, videos, seconds=None):
+        self.videos = videos if isinstance(videos, list) else list(videos)
+        if seconds is None:
+            seconds = array('l', map(video_seconds, self.videos))
+        self.seconds = seconds
+        self._prefix = None
+
+    def __len__(self):
+        return len(self.videos)
+
+    @property
+    def prefix(self):
+        """Prefix sums of ``seconds``; ``prefix[i]`` is the total of the first i videos."""
+        if self._prefix is None:
+            self._prefix = prefix_sums(self.seconds)
+        return self._prefix
+
+    @property
+    def total_seconds(self):
+        return self.prefix[-1]
+
+    def without(self, links):
+        """Return a compact playlist excluding videos whose link is in ``links``."""
+        if not links:
+            return self
+        links = set(links)
+        keep = [index for index, video in enumerate(self.videos) if video['link'] not in links]
+        return CompactPlaylist(
+            [self.videos[index] for index in keep],
+            array('l', (self.seconds[index] for index in keep))
+        )
+
+    def day_loads(self, day_starts):
+        """Total seconds of each day in a layout."""
+        prefix = self.prefix
+        ends = list(day_starts[1:]) + [len(self.videos)]
+        return array('q', (prefix[end] - prefix[start] for start, end in zip(day_starts, ends)))
+
+    def days(self, day_starts):
+        """Slice ``videos`` into one list per day of a layout."""
+        ends = list(day_starts[1:]) + [len(self.videos)]
+        return [self.videos[start:end] for start, end in zip(day_starts, ends)]
+
+def pack_time_based(seconds, capacity_seconds):
+    """Start offsets of each day when videos are packed greedily into a daily capacity."""
+    day_starts = array('l')
+    day_duration = 0
+    for index, video_seconds in enumerate(seconds):
+        if not day_starts or day_duration + video_seconds > capacity_seconds:
+            day_starts.append(index)
+            day_duration = video_seconds
+        else:
+            day_duration += video_seconds
+    return day_starts
+
+def pack_day_based(seconds, num_days, total_seconds=None):
+    """Start offsets of each day for the running-average cut over ``num_days`` days."""
+    if not len(seconds):
+        return array('l')
+    if total_seconds is None:
+        total_seconds = sum(seconds)
+    avg_daily_duration = total_seconds / max(num_days, 1)
+
+    day_starts = array('l', [0])
+    day_duration = 0
+    for index, video_seconds in enumerate(seconds):
+        if len(day_starts) < num_days and day_duration + video_seconds > avg_daily_duration:
+            if index > day_starts[-1]:
+                day_starts.append(index)
+            day_duration = 0
+        day_duration += video_seconds
+    return day_starts
+
+def pack_prefix(prefix, capacity, num_days=None):
+    """Start offsets of a greedy packing, computed from prefix sums with one bisect per day.
+
+    Each day takes the longest run of videos that fits ``capacity`` (at
+    least one video); with ``num_days`` the last day takes whatever is left.
+    This is the layout pack_time_based produces for a daily capacity and
+    pack_day_based for its running-average capacity, in O(days * log n).
+    """
+    count = len(prefix) - 1
+    day_starts = array('l')
+    start = 0
+    while start < count:
+        day_starts.append(start)
+        if num_days is not None and len(day_starts) == num_days:
+            break
+        start = max(start + 1, bisect_right(prefix, prefix[start] + capacity) - 1)
+    return day_starts
+
+def pack_balanced(seconds, num_days, prefix=None):
+    """Start offsets of an order-preserving split into ``num_days`` days minimising the longest day.
+
+    Binary-searches the smallest daily capacity S that fits the playlist
+    into ``num_days`` days. Each feasibility check jumps a whole day at a
+    time with a bisect over the prefix sums, so it costs O(days * log n)
+    instead of O(n), and the search stays within O(n log S).
+    """
+    count = len(seconds)
+    if not count:
+        return array('l')
+    if prefix is None:
+        prefix = prefix_sums(seconds)
+    num_days = max(1, min(num_days, count))
+
+    def day_end(start, capacity, days_left):
+        # Furthest end that fits the capacity, leaving at least one video per remaining day
+        end = bisect_right(prefix, prefix[start] + capacity) - 1
+        return max(start + 1, min(end, count - days_left))
+
+    def fits(capacity):
+        start = 0
+        for day in range(num_days):
+            start = day_end(start, capacity, num_days - day - 1)
+            if start >= count:
+                return True
+        return False
+
+    low, high = max(seconds), prefix[-1]
+    while low < high:
+        middle = (low + high) // 2
+        if fits(middle):
+            high = middle
+        else:
+            low = middle + 1
+
+    day_starts = array('l')
+    start = 0
+    for day in range(num_days):
+        if start >= count:
+            break
+        day_starts.append(start)
+        start = day_end(start, low, num_days - day - 1)
+    return day_starts
+
+def plan_schedule(video_details, daily_time_minutes=None, num_days=None, completed_videos=None, last_day_number=0, completed_video_details=None, balanced=False):
+    """Build a schedule and its summary from one parse of the playlist durations.
+
+    Pass ``daily_time_minutes`` for a time-based schedule or ``num_days`` for
+    a day-based one; ``balanced`` swaps the greedy day-based cut for the
+    partition that minimises the longest day. Returns ``(schedule, summary)``
+    in the shape stored and returned by the API.
+    """
+    with metrics.stage('schedule'):
+        playlist = video_details if isinstance(video_details, CompactPlaylist) else CompactPlaylist(video_details)
+        remaining = playlist.without(completed_videos)
         completed_video_details = completed_video_details or []
-        schedule = {}
 
+        schedule = {}
         # First, preserve completed videos in their original days
-        for video in completed_video_details:
-            day_key = f"Day {last_day_number}"
-            if day_key not in schedule:
-                schedule[day_key] = []
-            schedule[day_key].append(video)
-
-        # Calculate total duration for remaining videos
-        remaining_videos = [
-            video for video in video_details 
-            if video['link'] not in completed_videos
-        ]
-
-        if not remaining_videos:
-            return schedule
-
-        total_duration = sum(
-            parse_duration(video["duration"])
-            for video in remaining_videos
+        if completed_video_details:
+            schedule[f"Day {last_day_number}"] = list(completed_video_details)
+
+        if daily_time_minutes is not None:
+            daily_time_seconds = (daily_time_minutes - 10) * 60
+            day_starts = pack_time_based(remaining.seconds, daily_time_seconds)
+        elif balanced:
+            day_starts = pack_balanced(remaining.seconds, num_days - last_day_number, remaining.prefix)
+        else:
+            day_starts = pack_day_based(remaining.seconds, num_days - last_day_number, remaining.total_seconds)
+
+        # Add revision days if needed (only when there was something to schedule)
+        revision_days = 0
+        if daily_time_minutes is None and len(day_starts):
+            revision_days = max(0, num_days - last_day_number - len(day_starts))
+
+        # Start scheduling remaining videos from the next day
+        day_number = last_day_number
+        for videos in remaining.days(day_starts):
+            day_number += 1
+            schedule[f"Day {day_number}"] = videos
+        for _ in range(revision_days):
+            day_number += 1
+            schedule[f"Day {day_number}"] = [dict(REVISION_DAY)]
+
+    with metrics.stage('summary'):
+        day_loads = list(remaining.day_loads(day_starts))
+        if completed_video_details:
+            day_loads.append(sum(CompactPlaylist(completed_video_details).seconds))
+        summary = summarize_schedule(
+            total_videos=sum(len(videos) for videos in schedule.values()),
+            total_days=len(schedule),
+            total_seconds=sum(day_loads),
+            day_loads=day_loads
         )
+    return schedule, summary
 
-        # Calculate average daily duration for remaining days
-        remaining_days = num_days - last_day_number
-        if remaining_days <= 0:
-            remaining_days = 1
-        avg_daily_duration = total_duration / remaining_days
+def split_completed_days(schedule_data):
+    """Split stored days for repacking: ``(kept_days, suffix, budget)``.
 
-        # Start scheduling from the next day
-        current_day = last_day_number + 1
-        current_day_videos = []
-        current_day_duration = 0
+    ``kept_days`` counts the leading days whose videos are all completed,
+    ``suffix`` holds the videos after them (revision placeholders dropped)
+    and ``budget`` their seconds with completed videos counted as zero.
+    """
+    kept_days = 0
+    for day in schedule_data:
+        if any(video.get('link') and not video.get('completed') for video in day['videos']):
+            break
+        kept_days += 1
 
-        for video in remaining_videos:
-            video_duration = parse_duration(video["duration"])
+    suffix = CompactPlaylist([
+        video
+        for day in schedule_data[kept_days:]
+        for video in day['videos']
+        if video.get('link')
+    ])
+    budget = array('l', (0 if video.get('completed') else seconds for video, seconds in zip(suffix.videos, suffix.seconds)))
+    return kept_days, suffix, budget
 
-            if current_day < num_days and current_day_duration + video_duration > avg_daily_duration:
-                if current_day_videos:
-                    schedule[f"Day {current_day}"] = current_day_videos
-                    current_day += 1
-                current_day_videos = []
-                current_day_duration = 0
+def kept_day_loads(days):
+    return [sum(CompactPlaylist(day['videos']).seconds) for day in days]
 
-            current_day_videos.append(video)
-            current_day_duration += video_duration
+def reschedule_days(schedule_data, daily_time_minutes):
+    """Repack the uncompleted suffix of stored schedule days with a new daily budget.
 
-        if current_day_videos:
-            schedule[f"Day {current_day}"] = current_day_videos
+    Leading days whose videos are all completed are kept as they are. The
+    remaining videos keep their order and completion flags; completed ones
+    ride along with their neighbours without using up the budget, and
+    revision placeholders are dropped. Returns ``(kept_days, new_days,
+    summary)`` where ``new_days`` lists the videos of each repacked day.
+    """
+    kept_days, suffix, budget = split_completed_days(schedule_data)
+    day_starts = pack_time_based(budget, (daily_time_minutes - 10) * 60)
+    new_days = suffix.days(day_starts)
 
-        # Add revision days if needed
-        while current_day < num_days:
-            current_day += 1
-            schedule[f"Day {current_day}"] = [{
-                "title": "Revision Day",
-                "duration": "00:00:00",
-                "link": None,
-                "thumbnail": None
-            }]
+    day_loads = kept_day_loads(schedule_data[:kept_days])
+    day_loads.extend(suffix.day_loads(day_starts))
+    summary = summarize_schedule(
+        total_videos=sum(len(day['videos']) for day in schedule_data[:kept_days]) + len(suffix),
+        total_days=kept_days + len(new_days),
+        total_seconds=sum(day_loads),
+        day_loads=day_loads
+    )
+    return kept_days, new_days, summary
+
+class BudgetPreview:
+    """What-if repacking of a stored schedule under many budgets, without writing anything.
+
+    The schedule is parsed once into prefix sums of what is left to watch;
+    every budget then costs one bisect per day. Daily budgets reproduce what
+    /adjust would store, target-day counts what a day-based (or balanced)
+    schedule of the remaining videos would look like.
+    """
+
+    def __init__(self, schedule_data):
+        self.kept_days, suffix, self.budget = split_completed_days(schedule_data)
+        self.kept_loads = kept_day_loads(schedule_data[:self.kept_days])
+        self.total_videos = sum(len(day['videos']) for day in schedule_data[:self.kept_days]) + len(suffix)
+        self.prefix = suffix.prefix
+        self.budget_prefix = prefix_sums(self.budget)
+        # Rough footprint for cache accounting
+        self.size = 24 * (len(self.prefix) + len(self.budget_prefix) + len(self.budget))
+
+    def daily(self, daily_time_minutes, start_date):
+        """Preview of repacking the remaining videos into ``daily_time_minutes`` a day."""
+        day_starts = pack_prefix(self.budget_prefix, (daily_time_minutes - 10) * 60)
+        return self.evaluate(day_starts, 0, start_date)
+
+    def target_days(self, num_days, start_date, balanced=False):
+        """Preview of spreading the remaining videos over the days left of ``num_days``."""
+        days_left = max(1, num_days - self.kept_days)
+        if balanced:
+            day_starts = pack_balanced(self.budget, days_left, self.budget_prefix)
+        else:
+            day_starts = pack_prefix(self.budget_prefix, self.budget_prefix[-1] / days_left, days_left)
+        revision_days = days_left - len(day_starts) if len(day_starts) else 0
+        return self.evaluate(day_starts, revision_days, start_date)
+
+    def evaluate(self, day_starts, revision_days, start_date):
+        ends = list(day_starts[1:]) + [len(self.prefix) - 1]
+        loads = [self.prefix[end] - self.prefix[start] for start, end in zip(day_starts, ends)]
+        loads.extend([0] * revision_days)
+        day_loads = self.kept_loads + loads
+        return {
+            'totalDays': len(day_loads),
+            'finishDate': (start_date + timedelta(days=len(loads) - 1)).strftime('%Y-%m-%d') if loads else None,
+            'dayLoads': loads,
+            'summary': summarize_schedule(
+                total_videos=self.total_videos,
+                total_days=len(day_loads),
+                total_seconds=sum(day_loads),
+                day_loads=day_loads
+            )
+        }
+
+def create_schedule_time_based(video_details, daily_time_minutes, completed_videos=None, last_day_number=0, completed_video_details=None):
+    """Create schedule based on daily time limit."""
+    try:
+        schedule, _ = plan_schedule(
+            video_details,
+            daily_time_minutes=daily_time_minutes,
+            completed_videos=completed_videos,
+            last_day_number=last_day_number,
+            completed_video_details=completed_video_details
+        )
+        return schedule
 
+    except Exception as e:
+        raise ValueError(f"Error creating time-based schedule: {str(e)}")
+
+def create_schedule_day_based(video_details, num_days, completed_videos=None, last_day_number=0, completed_video_details=None):
+    """Create schedule based on number of days."""
+    try:
+        schedule, _ = plan_schedule(
+            video_details,
+            num_days=num_days,
+            completed_videos=completed_videos,
+            last_day_number=last_day_number,
+            completed_video_details=completed_video_details
+        )
         return schedule
 
     except Exception as e:
         raise ValueError(f"Error creating day-based schedule: {str(e)}")
 
-def get_schedule_summary(schedule):
-    """Get summary of the schedule."""
-    total_videos = sum(len(videos) for videos in schedule.values())
-    total_days = len(schedule)
-    total_duration = sum(
-        sum(parse_duration(video["duration"]) for video in videos if video["duration"] != "00:00:00")
-        for videos in schedule.values()
-    )
-    
+def summarize_schedule(total_videos, total_days, total_seconds, day_loads=()):
+    """Build the summary dict from precomputed totals.
+
+    ``day_loads`` are the seconds of each day; days without study time
+    (revision days) are left out of the max/min spread.
+    """
+    study_loads = [load for load in day_loads if load > 0]
+    max_daily = max(study_loads, default=0)
+    min_daily = min(study_loads, default=0)
     return {
         "totalVideos": total_videos,
         "totalDays": total_days,
-        "totalDuration": format_duration(total_duration),
-        "averageDailyDuration": format_duration(total_duration // total_days) if total_days > 0 else "00:00:00"
-    }
\ No newline at end of file
+        "totalDuration": format_duration(total_seconds),
+        "averageDailyDuration": format_duration(total_seconds // total_days) if total_days > 0 else "00:00:00",
+        "maxDailyDuration": format_duration(max_daily),
+        "minDailyDuration": format_duration(min_daily),
+        "dailySpread": format_duration(max_daily - min_daily)
+    }
+
+def get_schedule_summary(schedule):
+    """Get summary of the schedule."""
+    day_loads = [sum(CompactPlaylist(videos).seconds) for videos in schedule.values()]
+    return summarize_schedule(
+        total_videos=sum(len(videos) for videos in schedule.values()),
+        total_days=len(schedule),
+        total_seconds=sum(day_loads),
+        day_loads=day_loads
+    )
@@ -0,0 +1,156 @@
+# progress.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import metrics
+
+
+def new_batch(future):
+    return {'updates': {}, 'callers': 0, 'future': future}
+
+
+def caller_found(result, updates):
+    """Whether one caller's toggles were found, from a batch's ``(found, present)`` result."""
+    found, present = result
+    if present is None:
+        return found
+    return any(link in present for link in updates)
+
+
+class ProgressCoalescer:
+    """Merges progress toggles for a schedule that arrive while a write for it is in flight.
+
+    A toggle for a schedule with no write in flight is written at once.
+    Toggles arriving during that write are folded into one ``{link:
+    completed}`` batch (the latest flag for a video wins), written with a
+    single ``write(schedule_id, updates)`` call as soon as the running one
+    finishes. Every caller in a batch blocks until its write is done, so
+    responses still confirm a durable write.
+
+    ``write`` returns whether any of the links was found. Callers of a
+    merged batch each learn whether their own links were found, from
+    ``locate(schedule_id, links)`` (the subset of ``links`` in the
+    schedule), which only runs for batches with more than one caller. With
+    ``coalesce`` off each call writes directly.
+    """
+
+    def __init__(self, write, locate=None, coalesce=True):
+        self.write = write
+        self.locate = locate
+        self.coalesce = coalesce
+        self.writes = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._writing = set()
+        self._idle = threading.Condition()
+
+    def submit(self, schedule_id, updates):
+        if not self.coalesce:
+            with self._idle:
+                self.writes += 1
+            metrics.inc('learnfast_progress_writes_total')
+            return self.write(schedule_id, updates)
+
+        with self._idle:
+            batch = self._pending.get(schedule_id)
+            leader = batch is None
+            if leader:
+                batch = new_batch(Future())
+            else:
+                self.coalesced += 1
+                metrics.inc('learnfast_progress_coalesced_total')
+            batch['updates'].update(updates)
+            batch['callers'] += 1
+            if leader:
+                if schedule_id in self._writing:
+                    # Collect the toggles that arrive until the running write is done
+                    self._pending[schedule_id] = batch
+                    while schedule_id in self._writing:
+                        self._idle.wait()
+                    del self._pending[schedule_id]
+                self._writing.add(schedule_id)
+                self.writes += 1
+
+        if leader:
+            try:
+                self._flush(schedule_id, batch)
+            finally:
+                with self._idle:
+                    self._writing.discard(schedule_id)
+                    self._idle.notify_all()
+        return caller_found(batch['future'].result(), updates)
+
+    def _flush(self, schedule_id, batch):
+        metrics.inc('learnfast_progress_writes_total')
+        try:
+            found = self.write(schedule_id, batch['updates'])
+            present = None
+            if found and batch['callers'] > 1 and self.locate:
+                present = self.locate(schedule_id, list(batch['updates']))
+            batch['future'].set_result((found, present))
+        except Exception as e:
+            batch['future'].set_exception(e)
+
+
+class AsyncProgressCoalescer:
+    """ProgressCoalescer for an event loop: ``write`` and ``locate`` are coroutine
+    functions and waiting callers are suspended instead of holding a thread.
+
+    Writes run as tasks, and each one starts the write of the batch that
+    collected during it, so a caller going away never strands the others.
+    """
+
+    def __init__(self, write, locate=None, coalesce=True):
+        self.write = write
+        self.locate = locate
+        self.coalesce = coalesce
+        self.writes = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._writing = set()
+        self._tasks = set()
+
+    async def submit(self, schedule_id, updates):
+        if not self.coalesce:
+            self.writes += 1
+            metrics.inc('learnfast_progress_writes_total')
+            return await self.write(schedule_id, updates)
+
+        batch = self._pending.get(schedule_id)
+        if batch is None:
+            batch = self._pending[schedule_id] = new_batch(asyncio.get_running_loop().create_future())
+        else:
+            self.coalesced += 1
+            metrics.inc('learnfast_progress_coalesced_total')
+        batch['updates'].update(updates)
+        batch['callers'] += 1
+        if schedule_id not in self._writing:
+            self._start_flush(schedule_id)
+        # Shielded so one caller going away does not cancel the write for the rest
+        return caller_found(await asyncio.shield(batch['future']), updates)
+
+    def _start_flush(self, schedule_id):
+        batch = self._pending.pop(schedule_id)
+        self._writing.add(schedule_id)
+        self.writes += 1
+        # Keep a reference so the running flush is not garbage collected
+        task = asyncio.get_running_loop().create_task(self._flush(schedule_id, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, schedule_id, batch):
+        metrics.inc('learnfast_progress_writes_total')
+        try:
+            found = await self.write(schedule_id, batch['updates'])
+            present = None
+            if found and batch['callers'] > 1 and self.locate:
+                present = await self.locate(schedule_id, list(batch['updates']))
+            batch['future'].set_result((found, present))
+        except Exception as e:
+            batch['future'].set_exception(e)
+        finally:
+            self._writing.discard(schedule_id)
+            if schedule_id in self._pending:
+                self._start_flush(schedule_id)
@@ -0,0 +1,96 @@
+# providers.py
+#
+# Lazily created process-wide clients. Nothing here connects or imports a
+# heavy SDK until the first call, so importing the app (or the scheduling
+# code) stays cheap and workers boot fast.
+
+import functools
+import os
+import threading
+
+
+def lazy(factory):
+    """Decorator: build the value on the first call and return the same object afterwards.
+
+    Creation is thread-safe and per process: after a fork (e.g. gunicorn with
+    preload_app) the first call in the child builds its own instance instead
+    of sharing the parent's sockets and threads. ``get.reset()`` drops the
+    instance, and ``get.created()`` tells whether this process has built one.
+    """
+    lock = threading.Lock()
+    state = {}
+
+    @functools.wraps(factory)
+    def get():
+        if state.get('pid') != os.getpid():
+            with lock:
+                if state.get('pid') != os.getpid():
+                    state['instance'] = factory()
+                    state['pid'] = os.getpid()
+        return state['instance']
+
+    get.reset = state.clear
+    get.created = lambda: state.get('pid') == os.getpid()
+    return get
+
+
+def mongo_client_options():
+    """Pool and timeout settings shared by the sync and async clients.
+
+    The pool is per worker process, so it is sized to the worker's threads
+    rather than the driver's default of 100 connections each.
+    """
+    import metrics
+
+    return {
+        # The command listener counts round trips and times them per request
+        'event_listeners': [metrics.command_listener()],
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 30000))
+    }
+
+
+@lazy
+def get_mongo_client():
+    """Shared MongoClient; the driver only opens connections on the first operation."""
+    from pymongo import MongoClient
+
+    return MongoClient(os.getenv('MONGODB_URI'), **mongo_client_options())
+
+
+@lazy
+def get_async_mongo_client():
+    """Async client for the ASGI app: PyMongo's async API, or Motor on older PyMongo."""
+    try:
+        from pymongo import AsyncMongoClient
+    except ImportError:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+
+    return AsyncMongoClient(os.getenv('MONGODB_URI'), **mongo_client_options())
+
+
+def get_database():
+    return get_mongo_client()[os.getenv('DB_NAME', 'your_database_name')]
+
+
+def get_async_database():
+    return get_async_mongo_client()[os.getenv('DB_NAME', 'your_database_name')]
+
+
+@lazy
+def get_genai():
+    """The configured google.generativeai module (a slow import, so done on first use)."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return genai
+
+
+@lazy
+def get_gemini_model():
+    return get_genai().GenerativeModel('gemini-pro')
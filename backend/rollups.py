@@ -0,0 +1,471 @@
+# rollups.py
+#
+# Materialised progress per schedule and per user, so dashboards read a few
+# counters instead of whole schedules. A schedule's ``rollup`` (video and
+# second totals, what is completed, and how many videos each day still has
+# to watch) is counted from its videos when it is written, then kept up to
+# date by ``$inc`` deltas worked out from each progress toggle. One
+# ``user_progress`` document per user sums its schedules' rollups; users are
+# re-summed on a background thread, off the request path. Rollups store
+# date anchors, and days behind and the projected finish are worked out
+# against today when they are read.
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+
+from model import extract_video_id, parse_duration
+from storage import NORMALIZED, is_normalized
+
+# Counters summed from schedule rollups into user rollups
+COUNTERS = ('totalVideos', 'completedVideos', 'totalSeconds', 'completedSeconds')
+
+# What a recount needs from a schedule document: no videos
+HEAD_PROJECTION = {'userId': 1, 'layout': 1, 'schedule_data.day': 1, 'schedule_data.date': 1}
+
+
+def video_seconds(video):
+    """Length of a stored video record: ``seconds`` when compact, else its duration string."""
+    if 'seconds' in video:
+        return video['seconds']
+    try:
+        return parse_duration(video.get('duration') or '0')
+    except ValueError:
+        return 0
+
+
+def is_watchable(video):
+    # Revision days hold a placeholder record with neither ID nor link
+    return bool(video.get('videoId') or video.get('link'))
+
+
+def day_string(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def parse_day(value):
+    return date.fromisoformat(value) if value else None
+
+
+def day_row(day, videos=0, completed=0, seconds=0, completed_seconds=0):
+    """Counters of one schedule day."""
+    return {
+        'day': day.get('day'),
+        'date': day_string(day.get('date')),
+        'videos': videos,
+        'completed': completed,
+        'seconds': seconds,
+        'completedSeconds': completed_seconds
+    }
+
+
+def schedule_rollup(rows):
+    """Stored rollup of a schedule from its ``day_row`` rows, in schedule order.
+
+    ``days`` keeps each day's date and the number of videos it has left,
+    which the progress deltas adjust; the current day is the first with any.
+    """
+    return {
+        'totalVideos': sum(row['videos'] for row in rows),
+        'completedVideos': sum(row['completed'] for row in rows),
+        'totalSeconds': sum(row['seconds'] for row in rows),
+        'completedSeconds': sum(row['completedSeconds'] for row in rows),
+        'finishDate': rows[-1]['date'] if rows else None,
+        'days': [
+            {'day': row['day'], 'date': row['date'], 'remaining': row['videos'] - row['completed']}
+            for row in rows
+        ]
+    }
+
+
+def days_rollup(schedule_data):
+    """Rollup of schedule days held in memory (embedded shape, full or compact videos)."""
+    rows = []
+    for day in schedule_data:
+        videos = [video for video in day['videos'] if is_watchable(video)]
+        completed = [video for video in videos if video.get('completed')]
+        rows.append(day_row(
+            day,
+            len(videos),
+            len(completed),
+            sum(map(video_seconds, videos)),
+            sum(map(video_seconds, completed))
+        ))
+    return schedule_rollup(rows)
+
+
+def progress_deltas(videos, updates):
+    """``$inc`` document moving a rollup past a ``{link: completed}`` write.
+
+    ``videos`` are the matched videos as they were before the write (see
+    ScheduleStore.locate_videos); only those whose flag changes count.
+    """
+    by_id = {extract_video_id(link): completed for link, completed in updates.items()}
+    by_id.pop(None, None)
+    deltas = {}
+
+    def add(key, value):
+        deltas[key] = deltas.get(key, 0) + value
+
+    for video in videos:
+        if video.get('link') in updates:
+            completed = updates[video['link']]
+        else:
+            completed = by_id.get(video.get('videoId'))
+        if completed is None or bool(video.get('completed')) == bool(completed):
+            continue
+        sign = 1 if completed else -1
+        add('rollup.completedVideos', sign)
+        add('rollup.completedSeconds', sign * video_seconds(video))
+        add(f"rollup.days.{video['day']}.remaining", -sign)
+    return {key: value for key, value in deltas.items() if value}
+
+
+def current_day(rollup):
+    """The first day of a rollup with videos left, or None once everything is watched."""
+    return next((day for day in rollup.get('days', ()) if day['remaining'] > 0), None)
+
+
+def user_rollup(schedules):
+    """Per-user totals from ``[{'scheduleId', 'rollup'}]``, keeping the dates of unfinished schedules."""
+    totals = dict.fromkeys(COUNTERS, 0)
+    finished = 0
+    pending = []
+    for entry in schedules:
+        rollup = entry.get('rollup')
+        if not rollup:
+            continue
+        for key in COUNTERS:
+            totals[key] += rollup[key]
+        current = current_day(rollup)
+        if current is None:
+            finished += 1
+        else:
+            pending.append({
+                'scheduleId': entry['scheduleId'],
+                'currentDayDate': current['date'],
+                'finishDate': rollup['finishDate']
+            })
+    return dict(totals, schedules=len(schedules), finishedSchedules=finished, pending=pending)
+
+
+def pace(current_day_date, finish_date, today):
+    """``(days_behind, projected_finish)``: how long the current day is overdue, and the plan shifted by that."""
+    current = parse_day(current_day_date)
+    finish = parse_day(finish_date)
+    if current is None:
+        return 0, None
+    behind = max(0, (today - current).days)
+    return behind, (finish + timedelta(days=behind)).isoformat() if finish else None
+
+
+def percent(done, total):
+    return round(100 * done / total, 1) if total else 0.0
+
+
+def schedule_status(rollup, today):
+    """A schedule rollup as served, with the current day, pace and percentages as of ``today``."""
+    current = current_day(rollup)
+    current_date = current['date'] if current else None
+    behind, projected = pace(current_date, rollup.get('finishDate'), today)
+    status = {key: rollup[key] for key in COUNTERS}
+    status.update(
+        currentDay=current['day'] if current else None,
+        currentDayDate=current_date,
+        finishDate=rollup.get('finishDate'),
+        finished=current is None,
+        daysBehind=behind,
+        projectedFinishDate=projected,
+        percentComplete=percent(rollup['completedVideos'], rollup['totalVideos']),
+        percentTimeComplete=percent(rollup['completedSeconds'], rollup['totalSeconds'])
+    )
+    return status
+
+
+def user_status(rollup, today):
+    """A user rollup as served: the most overdue schedule sets days behind, the last projected finish the finish."""
+    pending = []
+    for entry in rollup['pending']:
+        behind, projected = pace(entry['currentDayDate'], entry['finishDate'], today)
+        pending.append({'scheduleId': str(entry['scheduleId']), 'daysBehind': behind, 'projectedFinishDate': projected})
+    status = {key: rollup[key] for key in COUNTERS + ('schedules', 'finishedSchedules')}
+    status.update(
+        daysBehind=max((entry['daysBehind'] for entry in pending), default=0),
+        projectedFinishDate=max((entry['projectedFinishDate'] for entry in pending if entry['projectedFinishDate']), default=None),
+        percentComplete=percent(rollup['completedVideos'], rollup['totalVideos']),
+        percentTimeComplete=percent(rollup['completedSeconds'], rollup['totalSeconds']),
+        pending=pending
+    )
+    return status
+
+
+def day_counters(prefix=''):
+    """$group accumulators for one day: watchable and completed videos and their seconds.
+
+    Records carry ``seconds``; full ones stored before it was only have a
+    duration string, so those are pushed as they are and parsed by
+    ``counted_row``.
+    """
+    def field(name):
+        return f'${prefix}{name}'
+
+    done = {'$eq': [field('completed'), True]}
+    seconds = {'$ifNull': [field('seconds'), 0]}
+    duration = {'$cond': [{'$ifNull': [field('seconds'), False]}, None, field('duration')]}
+    return {
+        'videos': {'$sum': {'$cond': [{'$ifNull': [field('videoId'), field('link')]}, 1, 0]}},
+        'completed': {'$sum': {'$cond': [done, 1, 0]}},
+        'seconds': {'$sum': seconds},
+        'completedSeconds': {'$sum': {'$cond': [done, seconds, 0]}},
+        'durations': {'$push': duration},
+        'completedDurations': {'$push': {'$cond': [done, duration, None]}}
+    }
+
+
+def embedded_counters_pipeline(schedule_ids=None):
+    """Per-day counters of embedded schedules, as ``{_id: {schedule, day}, ...day_counters}``."""
+    match = {'layout': {'$ne': NORMALIZED}}
+    if schedule_ids is not None:
+        match['_id'] = {'$in': list(schedule_ids)}
+    return [
+        {'$match': match},
+        {'$project': {f'schedule_data.videos.{key}': 1 for key in ('videoId', 'link', 'seconds', 'duration', 'completed')}},
+        {'$unwind': {'path': '$schedule_data', 'includeArrayIndex': 'day'}},
+        {'$unwind': '$schedule_data.videos'},
+        {'$group': dict({'_id': {'schedule': '$_id', 'day': '$day'}}, **day_counters('schedule_data.videos.'))}
+    ]
+
+
+def normalized_counters_pipeline(schedule_ids=None):
+    """Per-day counters from the normalized videos collection, shaped like embedded_counters_pipeline."""
+    stages = [{'$group': dict({'_id': {'schedule': '$schedule_id', 'day': '$day'}}, **day_counters())}]
+    if schedule_ids is not None:
+        stages.insert(0, {'$match': {'schedule_id': {'$in': list(schedule_ids)}}})
+    return stages
+
+
+def duration_total(durations):
+    return sum(video_seconds({'duration': duration}) for duration in durations if duration)
+
+
+def counted_row(day, counters=None):
+    """``day_row`` from a day's $group counters; days without videos have no counters."""
+    counters = counters or {}
+    return day_row(
+        day,
+        counters.get('videos', 0),
+        counters.get('completed', 0),
+        counters.get('seconds', 0) + duration_total(counters.get('durations', ())),
+        counters.get('completedSeconds', 0) + duration_total(counters.get('completedDurations', ()))
+    )
+
+
+class UserRefreshQueue:
+    """Re-sums users marked as changed on a background thread.
+
+    Marks collect for ``delay`` seconds, so a burst of writes (a cohort
+    import, a run of toggles) costs one re-sum per user.
+    """
+
+    def __init__(self, refresh_users, delay=1.0):
+        self.refresh_users = refresh_users
+        self.delay = delay
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def mark(self, user_ids):
+        with self._lock:
+            self._dirty.update(user_ids)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rollups', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def is_pending(self, user_id):
+        with self._lock:
+            return user_id in self._dirty
+
+    def flush(self, user_ids=None):
+        """Re-sum marked users now (only ``user_ids`` among them, if given)."""
+        with self._lock:
+            users = set(self._dirty) if user_ids is None else self._dirty & set(user_ids)
+            self._dirty -= users
+        if users:
+            self.refresh_users(users)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error refreshing user rollups: {str(e)}")
+
+
+class ProgressRollups:
+    """Maintains ``rollup`` on schedules and per-user documents in ``users``.
+
+    New and adjusted schedules carry a rollup counted in memory (see
+    ``days_rollup``); progress writes apply ``progress_deltas``. Every write
+    also recounts ``summary.completedVideos`` server-side, so a rollup that
+    drifted (a concurrent toggle from another process) or that was never
+    counted is recounted from the videos. ``rebuild`` recomputes everything
+    in batches.
+    """
+
+    def __init__(self, schedules, videos, users, user_delay=1.0):
+        self.schedules = schedules
+        self.videos = videos
+        self.users = users
+        self.user_queue = UserRefreshQueue(self.refresh_users, delay=user_delay)
+
+    def apply_progress(self, schedule_id, videos, updates):
+        """Apply a progress write's deltas; ``videos`` are the matched videos from before the write."""
+        deltas = progress_deltas(videos, updates)
+        if not deltas:
+            return
+        schedule = self.schedules.find_one_and_update(
+            {'_id': ObjectId(schedule_id), 'rollup': {'$exists': True}},
+            {'$inc': deltas},
+            projection={'userId': 1, 'rollup.completedVideos': 1, 'summary.completedVideos': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if schedule is None or schedule['rollup']['completedVideos'] != schedule.get('summary', {}).get('completedVideos'):
+            self.refresh([schedule_id])
+            return
+        self.users_changed([schedule['userId']])
+
+    def users_changed(self, user_ids):
+        """Queue users for a background re-sum."""
+        self.user_queue.mark(user_ids)
+
+    def refresh(self, schedule_ids):
+        """Recount schedules from their videos and queue their owners; returns ``{schedule_id: rollup}``."""
+        heads = list(self.schedules.find({'_id': {'$in': [ObjectId(i) for i in schedule_ids]}}, HEAD_PROJECTION))
+        rollups = self._count(heads)
+        for schedule_id, rollup in rollups.items():
+            self.schedules.update_one({'_id': schedule_id}, {'$set': {'rollup': rollup}})
+        self.users_changed({head['userId'] for head in heads})
+        return rollups
+
+    def refresh_users(self, user_ids):
+        """Re-sum users from their schedules' rollups, counting schedules that have none yet first."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        uncounted = [schedule['_id'] for schedule in self.schedules.find(
+            {'userId': {'$in': user_ids}, 'rollup': {'$exists': False}}, {'_id': 1}
+        )]
+        if uncounted:
+            self.refresh(uncounted)
+        rollups = {
+            group['_id']: user_rollup(group['schedules'])
+            for group in self.schedules.aggregate(self._users_pipeline({'userId': {'$in': user_ids}}))
+        }
+        now = datetime.now()
+        for user_id in user_ids:
+            self.users.replace_one({'_id': user_id}, dict(rollups.get(user_id) or user_rollup([]), updated_at=now), upsert=True)
+
+    def rebuild(self, batch_size=500):
+        """Recompute every schedule and user rollup; returns ``(schedules, users)``."""
+        started = datetime.now()
+        schedules = 0
+        batch = []
+        for head in self.schedules.find({}, HEAD_PROJECTION):
+            batch.append(head)
+            if len(batch) == batch_size:
+                schedules += self._save(self._count(batch))
+                batch = []
+        schedules += self._save(self._count(batch))
+
+        users = 0
+        operations = []
+        for group in self.schedules.aggregate(self._users_pipeline(), allowDiskUse=True):
+            operations.append(ReplaceOne(
+                {'_id': group['_id']}, dict(user_rollup(group['schedules']), updated_at=datetime.now()), upsert=True
+            ))
+            if len(operations) == batch_size:
+                users += len(operations)
+                self.users.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            users += len(operations)
+            self.users.bulk_write(operations, ordered=False)
+        # Users whose schedules are all gone
+        self.users.delete_many({'updated_at': {'$lt': started}})
+        return schedules, users
+
+    def schedule_stats(self, schedule_id, today=None):
+        """Served rollup of a schedule, counted on first use; None if the schedule does not exist."""
+        schedule = self.schedules.find_one({'_id': ObjectId(schedule_id)}, {'rollup': 1})
+        if not schedule:
+            return None
+        rollup = schedule.get('rollup') or self.refresh([schedule_id]).get(schedule['_id'])
+        return schedule_status(rollup, today or datetime.now().date())
+
+    def user_stats(self, user_id, today=None):
+        """Served rollup of a user; a re-sum still queued in this process is done first."""
+        user_id = ObjectId(user_id)
+        self.user_queue.flush([user_id])
+        rollup = self.users.find_one({'_id': user_id})
+        if not rollup:
+            self.refresh_users([user_id])
+            rollup = self.users.find_one({'_id': user_id})
+        return user_status(rollup, today or datetime.now().date())
+
+    def _users_pipeline(self, match=None):
+        return [
+            {'$match': match or {}},
+            {'$group': {'_id': '$userId', 'schedules': {'$push': {'scheduleId': '$_id', 'rollup': '$rollup'}}}}
+        ]
+
+    def _count(self, heads):
+        """Rollups of schedules given by their HEAD_PROJECTION documents, counted server-side."""
+        if not heads:
+            return {}
+        counters = {}
+        embedded = [head['_id'] for head in heads if not is_normalized(head)]
+        normalized = [head['_id'] for head in heads if is_normalized(head)]
+        if embedded:
+            for row in self.schedules.aggregate(embedded_counters_pipeline(embedded)):
+                counters[row['_id']['schedule'], row['_id']['day']] = row
+        if normalized:
+            for row in self.videos.aggregate(normalized_counters_pipeline(normalized)):
+                counters[row['_id']['schedule'], row['_id']['day']] = row
+        return {
+            head['_id']: schedule_rollup([
+                counted_row(day, counters.get((head['_id'], index)))
+                for index, day in enumerate(head.get('schedule_data', []))
+            ])
+            for head in heads
+        }
+
+    def _save(self, rollups):
+        # Derived data: updated_at is left alone so cached views and the adjust guard are unaffected
+        if rollups:
+            self.schedules.bulk_write(
+                [UpdateOne({'_id': schedule_id}, {'$set': {'rollup': rollup}}) for schedule_id, rollup in rollups.items()],
+                ordered=False
+            )
+        return len(rollups)
+
+
+if __name__ == '__main__':
+    # Usage: python rollups.py
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv('MONGODB_URI'))[os.getenv('DB_NAME', 'your_database_name')]
+    schedules, users = ProgressRollups(db.schedules, db.schedule_videos, db.user_progress).rebuild()
+    print(f"Rebuilt progress rollups for {schedules} schedules and {users} users")
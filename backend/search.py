@@ -0,0 +1,130 @@
+# search.py
+#
+# Per-schedule video lookup index. Built once per schedule version, it maps
+# normalised titles and video IDs to (day, position) and answers prefix and
+# fuzzy (trigram) title queries without touching MongoDB again.
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+from model import extract_video_id
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+
+
+def normalize_title(title):
+    """Lowercase, accent-free, punctuation-free title with single spaces."""
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(char for char in title if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.sub(' ', title.lower()).split())
+
+
+def trigrams(text):
+    """Character trigrams of a normalised string, padded so short words still have some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Lookup structures over the videos of one schedule version.
+
+    Exact title and video ID lookups are dict hits, prefix queries bisect a
+    sorted title list, and fuzzy queries only score the titles that share a
+    trigram with the query.
+    """
+
+    def __init__(self, schedule_data):
+        # (day_index, position, video) in schedule order; postings refer to these slots
+        self.entries = []
+        self.days = [day.get('day') for day in schedule_data]
+        self.by_title = {}
+        self.by_id = {}
+        self.postings = {}
+        self.title_trigrams = []
+        for day_index, day in enumerate(schedule_data):
+            for position, video in enumerate(day['videos']):
+                slot = len(self.entries)
+                self.entries.append((day_index, position, video))
+                # Revision-day placeholders store None for their link
+                title = normalize_title(video.get('title') or '')
+                # Repeated titles resolve to their first occurrence
+                self.by_title.setdefault(title, slot)
+                video_id = extract_video_id(video.get('link') or '')
+                if video_id:
+                    self.by_id.setdefault(video_id, slot)
+                grams = trigrams(title)
+                self.title_trigrams.append(len(grams))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(slot)
+        self.sorted_titles = sorted(self.by_title.items())
+        # Rough footprint for cache accounting
+        self.size = sum(len(title) + 64 for title in self.by_title) + 16 * sum(map(len, self.postings.values()))
+
+    def match(self, slot, match_type, score=1.0):
+        day_index, position, video = self.entries[slot]
+        return {
+            'video': video,
+            'day': self.days[day_index],
+            'position': position,
+            'matchType': match_type,
+            'score': round(score, 3)
+        }
+
+    def exact(self, title):
+        slot = self.by_title.get(normalize_title(title))
+        return self.match(slot, 'exact') if slot is not None else None
+
+    def video(self, query):
+        """Match a bare video ID or any YouTube URL of one."""
+        slot = self.by_id.get(query.strip())
+        if slot is None:
+            slot = self.by_id.get(extract_video_id(query) or '')
+        return self.match(slot, 'id') if slot is not None else None
+
+    def prefix(self, prefix, limit=10):
+        """Titles starting with ``prefix``, in title order."""
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        matches = []
+        for title, slot in self.sorted_titles[bisect_left(self.sorted_titles, (prefix,)):]:
+            if not title.startswith(prefix) or len(matches) == limit:
+                break
+            matches.append(self.match(slot, 'prefix'))
+        return matches
+
+    def fuzzy(self, query, limit=5, threshold=0.3):
+        """Titles by trigram similarity (Dice coefficient) to ``query``, best first."""
+        grams = trigrams(normalize_title(query))
+        shared = {}
+        for gram in grams:
+            for slot in self.postings.get(gram, ()):
+                shared[slot] = shared.get(slot, 0) + 1
+        scored = sorted(
+            ((2 * count / (len(grams) + self.title_trigrams[slot]), slot) for slot, count in shared.items()),
+            key=lambda item: (-item[0], item[1])
+        )
+        return [self.match(slot, 'fuzzy', score) for score, slot in scored[:limit] if score >= threshold]
+
+    def lookup(self, query, threshold=0.5):
+        """Best single match: exact title, video ID or link, unique prefix, then closest fuzzy title."""
+        match = self.exact(query) or self.video(query)
+        if match:
+            return match
+        prefixed = self.prefix(query, limit=2)
+        if len(prefixed) == 1:
+            return prefixed[0]
+        fuzzy = self.fuzzy(query, limit=1, threshold=threshold)
+        return fuzzy[0] if fuzzy else None
+
+    def search(self, query, limit=10):
+        """Candidate matches for a partial or misspelt title, prefix matches first."""
+        results = self.prefix(query, limit)
+        seen = {(match['day'], match['position']) for match in results}
+        for match in self.fuzzy(query, limit=limit):
+            if len(results) == limit:
+                break
+            if (match['day'], match['position']) not in seen:
+                results.append(match)
+        return results
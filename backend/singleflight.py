@@ -0,0 +1,163 @@
+# singleflight.py
+#
+# Coalesces concurrent identical work. While a call for a key is in flight,
+# other callers for the same key wait for it and share its result instead of
+# repeating it; the next call after it finishes runs again. Used so that a
+# burst of schedule requests for one playlist scrapes YouTube once.
+
+import asyncio
+import threading
+import time
+import uuid
+
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-level singleflight, optionally extended across workers with a ``lock``.
+
+    With a lock (see MongoFlightLock) the caller leading a key in this process
+    also takes the cross-worker lock. If another worker holds it, the leader
+    waits for its release before running ``func``, which then finds the other
+    worker's result in the shared playlist cache.
+    """
+
+    def __init__(self, lock=None, metric='learnfast_playlist_fetches_total'):
+        self.lock = lock
+        self.metric = metric
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return ``func()``, or the result of the identical call already in flight."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            metrics.inc(self.metric, result='coalesced')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._run(key, func)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _run(self, key, func):
+        if self.lock is None:
+            metrics.inc(self.metric, result='leader')
+            return func()
+
+        token, waited = self.lock.acquire(key)
+        metrics.inc(self.metric, result='waited' if waited else 'leader')
+        try:
+            return func()
+        finally:
+            if token is not None:
+                self.lock.release(key, token)
+
+
+class AsyncSingleFlight:
+    """Singleflight for coroutines on one event loop; same ``lock`` semantics as SingleFlight."""
+
+    def __init__(self, lock=None, metric='learnfast_playlist_fetches_total'):
+        self.lock = lock
+        self.metric = metric
+        self._flights = {}
+
+    async def do(self, key, func):
+        """Await ``func()``, or the result of the identical call already in flight."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            metrics.inc(self.metric, result='coalesced')
+            # Shielded so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.ensure_future(self._run(key, func))
+        flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+    async def _run(self, key, func):
+        if self.lock is None:
+            metrics.inc(self.metric, result='leader')
+            return await func()
+
+        token, waited = await asyncio.to_thread(self.lock.acquire, key)
+        metrics.inc(self.metric, result='waited' if waited else 'leader')
+        try:
+            return await func()
+        finally:
+            if token is not None:
+                await asyncio.to_thread(self.lock.release, key, token)
+
+
+class MongoFlightLock:
+    """Cross-worker lock: one document per key, taken over once its lease expires.
+
+    ``acquire`` blocks until the lock is free (polling every
+    ``poll_interval`` seconds) or ``wait_seconds`` have passed, and returns
+    ``(token, waited)``; the token is None if the wait timed out and the
+    caller went ahead without the lock.
+    """
+
+    def __init__(self, collection, lease_seconds=180, wait_seconds=120, poll_interval=0.25):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+
+    def acquire(self, key):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            now = time.time()
+            try:
+                # Matches only a missing or expired lock; a live one makes the upsert collide on _id
+                self.collection.update_one(
+                    {'_id': key, 'lease_expires': {'$lt': now}},
+                    {'$set': {'owner': token, 'lease_expires': now + self.lease_seconds}},
+                    upsert=True
+                )
+                return token, waited
+            except DuplicateKeyError:
+                pass
+            if time.monotonic() >= deadline:
+                print(f"Gave up waiting for fetch lock {key}")
+                return None, waited
+            waited = True
+            time.sleep(self.poll_interval)
+
+    def release(self, key, token):
+        self.collection.delete_one({'_id': key, 'owner': token})
+
+
+def create_flight_lock(backend_name, collection=None, lease_seconds=180, wait_seconds=120):
+    """Cross-worker lock for the configured backend: None for 'local', MongoFlightLock for 'mongo'."""
+    if backend_name == 'mongo':
+        if collection is None:
+            raise ValueError("A MongoDB collection is required for the mongo fetch lock")
+        return MongoFlightLock(collection, lease_seconds=lease_seconds, wait_seconds=wait_seconds)
+    if backend_name == 'local':
+        return None
+    raise ValueError(f"Unknown fetch coalescing backend: {backend_name}")
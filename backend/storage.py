@@ -0,0 +1,666 @@
+# storage.py
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateMany
+from pymongo.errors import BulkWriteError
+
+from codec import compact_days, expand_days
+from model import extract_video_id
+
+EMBEDDED = 'embedded'
+NORMALIZED = 'normalized'
+
+# How new schedules store their videos: as given, or as compact records (see codec.compact_video)
+FULL = 'full'
+COMPACT = 'compact'
+
+# Bookkeeping fields on documents in the videos collection, stripped on read
+VIDEO_KEYS = ('_id', 'schedule_id', 'day', 'position', 'generation')
+VIDEO_ORDER = [('schedule_id', 1), ('day', 1), ('position', 1)]
+
+# Aggregation expression counting completed videos of an embedded schedule
+COMPLETED_COUNT = {'$sum': {'$map': {
+    'input': '$schedule_data',
+    'as': 'day',
+    'in': {'$size': {'$filter': {
+        'input': '$$day.videos',
+        'as': 'video',
+        'cond': {'$eq': ['$$video.completed', True]}
+    }}}
+}}}
+
+
+def is_normalized(schedule):
+    return schedule.get('layout') == NORMALIZED
+
+
+def day_header(day, videos):
+    """Schedule day entry as stored by the normalized layout."""
+    header = {key: value for key, value in day.items() if key != 'videos'}
+    header['videoCount'] = len(videos)
+    return header
+
+
+def video_documents(schedule_id, schedule_data, first_day=0, generation=None):
+    """Per-video documents for the normalized layout; see ScheduleStore.replace_days for ``generation``."""
+    extra = {'generation': generation} if generation else {}
+    return [
+        dict(video, schedule_id=schedule_id, day=day_index, position=position, **extra)
+        for day_index, day in enumerate(schedule_data, first_day)
+        for position, video in enumerate(day['videos'])
+    ]
+
+
+def count_completed(schedule_doc):
+    """Set ``summary.completedVideos`` on a schedule in the embedded shape."""
+    schedule_doc['summary'] = dict(
+        schedule_doc['summary'],
+        completedVideos=sum(
+            1 for day in schedule_doc['schedule_data'] for video in day['videos'] if video.get('completed')
+        )
+    )
+
+
+def normalized_documents(schedule_doc):
+    """Split an embedded-shape schedule into ``(schedule_id, header, videos)`` for the normalized layout."""
+    schedule_id = ObjectId()
+    schedule_data = schedule_doc['schedule_data']
+    header = dict(
+        schedule_doc,
+        _id=schedule_id,
+        layout=NORMALIZED,
+        schedule_data=[day_header(day, day['videos']) for day in schedule_data]
+    )
+    return schedule_id, header, video_documents(schedule_id, schedule_data)
+
+
+def stored_days(schedule_data, encoding):
+    """Schedule days with their videos in the storage ``encoding``."""
+    return compact_days(schedule_data) if encoding == COMPACT else schedule_data
+
+
+def stored_document(schedule_doc, encoding):
+    """An embedded-shape schedule as written in the storage ``encoding``."""
+    if encoding == COMPACT:
+        return dict(schedule_doc, schedule_data=compact_days(schedule_doc['schedule_data']))
+    return schedule_doc
+
+
+def expand_schedules(schedules):
+    """Expand compact video records of loaded schedules in place."""
+    for schedule in schedules:
+        if 'schedule_data' in schedule:
+            expand_days(schedule['schedule_data'])
+
+
+def attach_videos(normalized, videos):
+    """Fill the day headers of ``{schedule_id: schedule}`` from video documents sorted by VIDEO_ORDER."""
+    days = {}
+    for video in videos:
+        key = (video['schedule_id'], video['day'], video.get('generation'))
+        days.setdefault(key, []).append({k: v for k, v in video.items() if k not in VIDEO_KEYS})
+
+    for schedule_id, schedule in normalized.items():
+        for day_index, day in enumerate(schedule['schedule_data']):
+            day.pop('videoCount', None)
+            # A day rewritten by replace_days only shows the videos written with it
+            day['videos'] = days.get((schedule_id, day_index, day.pop('generation', None)), [])
+
+
+def split_updates(updates):
+    marked = [link for link, completed in updates.items() if completed]
+    cleared = [link for link, completed in updates.items() if not completed]
+    return marked, cleared
+
+
+def video_ids(links):
+    return [video_id for video_id in map(extract_video_id, links) if video_id]
+
+
+def links_filter(links, prefix=''):
+    """Query matching videos by full ``link`` or, for compact records, by the ID in it."""
+    return {'$or': [
+        {f'{prefix}link': {'$in': list(links)}},
+        {f'{prefix}videoId': {'$in': video_ids(links)}}
+    ]}
+
+
+def links_present(links, videos):
+    """The subset of ``links`` matching any of ``videos`` (documents with ``link`` and/or ``videoId``)."""
+    stored_links = set()
+    stored_ids = set()
+    for video in videos:
+        stored_links.add(video.get('link'))
+        stored_ids.add(video.get('videoId') or extract_video_id(video.get('link') or ''))
+    return {link for link in links if link in stored_links or extract_video_id(link) in stored_ids}
+
+
+# What locate_videos returns of each video, besides its day index
+VIDEO_STATE_FIELDS = ('link', 'videoId', 'seconds', 'duration', 'completed')
+
+
+def embedded_videos_pipeline(schedule_id, links):
+    """Aggregation listing an embedded schedule's videos among ``links`` as VIDEO_STATE_FIELDS and ``day``."""
+    prefix = 'schedule_data.videos.'
+    return [
+        {'$match': dict(links_filter(links, prefix=prefix), _id=schedule_id)},
+        {'$unwind': {'path': '$schedule_data', 'includeArrayIndex': 'day'}},
+        {'$unwind': '$schedule_data.videos'},
+        {'$match': links_filter(links, prefix=prefix)},
+        {'$project': dict({field: f'${prefix}{field}' for field in VIDEO_STATE_FIELDS}, _id=0, day=1)}
+    ]
+
+
+def embedded_completed_update(updates):
+    """Pipeline update rewriting ``{link: completed}`` flags and recounting server-side."""
+    marked, cleared = split_updates(updates)
+
+    def flag(value):
+        return {'$mergeObjects': ['$$video', {'completed': value}]}
+
+    def listed(links):
+        return {'$or': [
+            {'$in': ['$$video.link', {'$literal': links}]},
+            {'$in': ['$$video.videoId', {'$literal': video_ids(links)}]}
+        ]}
+
+    return [
+        {'$set': {
+            'schedule_data': {'$map': {
+                'input': '$schedule_data',
+                'as': 'day',
+                'in': {'$mergeObjects': ['$$day', {'videos': {'$map': {
+                    'input': '$$day.videos',
+                    'as': 'video',
+                    'in': {'$switch': {
+                        'branches': [
+                            {'case': listed(marked), 'then': flag(True)},
+                            {'case': listed(cleared), 'then': flag(False)}
+                        ],
+                        'default': '$$video'
+                    }}
+                }}}]}
+            }},
+            'updated_at': datetime.now()
+        }},
+        {'$set': {'summary.completedVideos': COMPLETED_COUNT}}
+    ]
+
+
+def normalized_completed_operations(schedule_id, updates):
+    """Bulk operations applying ``{link: completed}`` flags to normalized video documents."""
+    marked, cleared = split_updates(updates)
+    return [
+        UpdateMany(
+            dict(links_filter(links), schedule_id=schedule_id, completed={'$ne': value}),
+            {'$set': {'completed': value}}
+        )
+        for links, value in ((marked, True), (cleared, False))
+        if links
+    ]
+
+
+class ScheduleStore:
+    """Reads and writes schedules in either storage layout.
+
+    The embedded layout keeps every video under ``schedule_data[].videos[]``.
+    The normalized layout keeps only day headers and summary counters on the
+    schedule document and stores videos in a separate collection indexed by
+    schedule, day and position. New schedules are written in ``layout``, with
+    videos as compact records (ID, seconds and title) under the 'compact'
+    ``encoding``; reads handle every combination and always return the
+    embedded shape with full video records that the API exposes.
+    """
+
+    def __init__(self, schedules, videos, layout=EMBEDDED, encoding=COMPACT):
+        if layout not in (EMBEDDED, NORMALIZED):
+            raise ValueError(f"Unknown schedule storage layout: {layout}")
+        if encoding not in (FULL, COMPACT):
+            raise ValueError(f"Unknown schedule video encoding: {encoding}")
+        self.schedules = schedules
+        self.videos = videos
+        self.layout = layout
+        self.encoding = encoding
+
+    def ensure_indexes(self):
+        # Embedded schedules (the default layout, and any written before a switch) are
+        # looked up by video link or ID; multikey indexes cover the nested videos
+        for field in ('link', 'videoId'):
+            self.schedules.create_index(f'schedule_data.videos.{field}')
+        self.videos.create_index([('schedule_id', 1), ('day', 1), ('generation', 1), ('position', 1)], unique=True)
+        self.videos.create_index([('schedule_id', 1), ('link', 1)])
+        self.videos.create_index([('schedule_id', 1), ('videoId', 1)])
+        # Drop indexes earlier versions created: titles are looked up in the
+        # per-schedule title index, in memory, and the old unique day index
+        # would reject the videos replace_days writes before switching days
+        obsolete = (
+            (self.schedules, 'schedule_data.videos.title_1'),
+            (self.videos, 'schedule_id_1_title_1'),
+            (self.videos, 'schedule_id_1_day_1_position_1')
+        )
+        for collection, name in obsolete:
+            if name in collection.index_information():
+                collection.drop_index(name)
+
+    def insert(self, schedule_doc):
+        """Insert a schedule given in the embedded shape and return its ID."""
+        count_completed(schedule_doc)
+        stored = stored_document(schedule_doc, self.encoding)
+        if self.layout == EMBEDDED:
+            return self.schedules.insert_one(stored).inserted_id
+
+        # Videos go in first so a visible header always has its videos; if
+        # the header does not make it in, they are removed again
+        schedule_id, header, videos = normalized_documents(stored)
+        try:
+            if videos:
+                self.videos.insert_many(videos, ordered=False)
+            self.schedules.insert_one(header)
+        except Exception:
+            self.drop_orphaned_videos([schedule_id])
+            raise
+        return schedule_id
+
+    def drop_orphaned_videos(self, schedule_ids):
+        """Delete normalized videos written for any of ``schedule_ids`` that has no schedule document."""
+        stored = {schedule['_id'] for schedule in self.schedules.find({'_id': {'$in': schedule_ids}}, {'_id': 1})}
+        orphaned = [schedule_id for schedule_id in schedule_ids if schedule_id not in stored]
+        if orphaned:
+            self.videos.delete_many({'schedule_id': {'$in': orphaned}})
+
+    def insert_many(self, schedule_docs):
+        """Insert schedules in one unordered batch; returns ``(ids, errors)``.
+
+        ``ids`` lines up with ``schedule_docs`` and holds None where a
+        document failed; ``errors`` maps those positions to the server error.
+        """
+        # A cohort shares one plan (the same schedule_data list): it is counted
+        # and encoded once, and each schedule only gets its own header fields
+        shared = {}
+        documents = []
+        videos = []
+        for schedule_doc in schedule_docs:
+            key = id(schedule_doc['schedule_data'])
+            if key not in shared:
+                count_completed(schedule_doc)
+                days = stored_days(schedule_doc['schedule_data'], self.encoding)
+                headers = [day_header(day, day['videos']) for day in days] if self.layout == NORMALIZED else days
+                shared[key] = (schedule_doc['summary'], days, headers)
+            summary, days, headers = shared[key]
+            schedule_doc['summary'] = summary
+            document = dict(schedule_doc, _id=schedule_doc.get('_id') or ObjectId(), schedule_data=headers)
+            if self.layout == NORMALIZED:
+                document['layout'] = NORMALIZED
+                videos.extend(video_documents(document['_id'], days))
+            documents.append(document)
+        schedule_ids = [document['_id'] for document in documents]
+        if self.layout == NORMALIZED and videos:
+            try:
+                self.videos.insert_many(videos, ordered=False)
+            except Exception:
+                # No header is in yet, so whatever was written is orphaned
+                self.videos.delete_many({'schedule_id': {'$in': schedule_ids}})
+                raise
+
+        errors = {}
+        try:
+            self.schedules.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = {error['index']: error['errmsg'] for error in e.details.get('writeErrors', [])}
+            if self.layout == NORMALIZED and errors:
+                # Drop the videos of schedules whose header did not make it in
+                self.videos.delete_many({'schedule_id': {'$in': [schedule_ids[i] for i in errors]}})
+        except Exception:
+            # A failure without per-document errors may have stored some headers
+            if self.layout == NORMALIZED:
+                self.drop_orphaned_videos(schedule_ids)
+            raise
+
+        ids = [None if i in errors else document['_id'] for i, document in enumerate(documents)]
+        return ids, errors
+
+    def get(self, schedule_id, projection=None, expand=True):
+        """Load one schedule in the embedded shape; ``expand=False`` leaves compact video records as stored."""
+        schedule = self.schedules.find_one({'_id': ObjectId(schedule_id)}, projection)
+        if schedule:
+            self.hydrate([schedule], expand)
+        return schedule
+
+    def hydrate(self, schedules, expand=True):
+        """Attach videos to normalized schedules, with one query for the batch, and expand compact videos, in place."""
+        normalized = {
+            schedule['_id']: schedule
+            for schedule in schedules
+            if is_normalized(schedule) and 'schedule_data' in schedule
+        }
+        if normalized:
+            attach_videos(normalized, self.videos.find({'schedule_id': {'$in': list(normalized)}}).sort(VIDEO_ORDER))
+        if expand:
+            expand_schedules(schedules)
+        return schedules
+
+    def delete(self, schedule_id):
+        schedule_id = ObjectId(schedule_id)
+        self.schedules.delete_one({'_id': schedule_id})
+        self.videos.delete_many({'schedule_id': schedule_id})
+
+    def set_videos_completed(self, schedule_id, updates):
+        """Apply ``{link: completed}`` flags in one write and refresh ``summary.completedVideos``.
+
+        Returns False if the schedule is missing or contains none of the links.
+        """
+        schedule_id = ObjectId(schedule_id)
+        setters = [self._set_embedded_completed, self._set_normalized_completed]
+        if self.layout == NORMALIZED:
+            setters.reverse()
+        # Try the configured layout first so the common case is a single write
+        return any(setter(schedule_id, updates) for setter in setters)
+
+    def _set_embedded_completed(self, schedule_id, updates):
+        result = self.schedules.update_one(
+            dict(links_filter(updates, prefix='schedule_data.videos.'), _id=schedule_id),
+            embedded_completed_update(updates)
+        )
+        return result.matched_count > 0
+
+    def _set_normalized_completed(self, schedule_id, updates):
+        result = self.videos.bulk_write(normalized_completed_operations(schedule_id, updates), ordered=False)
+        if result.matched_count == 0 and not self.videos.find_one(
+            dict(links_filter(updates), schedule_id=schedule_id), {'_id': 1}
+        ):
+            return False
+        self.schedules.update_one(
+            {'_id': schedule_id},
+            {'$set': {
+                'updated_at': datetime.now(),
+                'summary.completedVideos': self.videos.count_documents(
+                    {'schedule_id': schedule_id, 'completed': True}
+                )
+            }}
+        )
+        return True
+
+    def locate_videos(self, schedule_id, links):
+        """The schedule's videos among ``links``, as VIDEO_STATE_FIELDS plus their ``day`` index."""
+        schedule_id = ObjectId(schedule_id)
+        finders = [self._locate_embedded_videos, self._locate_normalized_videos]
+        if self.layout == NORMALIZED:
+            finders.reverse()
+        for finder in finders:
+            videos = list(finder(schedule_id, links))
+            if videos:
+                return videos
+        return []
+
+    def present_links(self, schedule_id, links):
+        """The subset of ``links`` whose videos are in the schedule."""
+        return links_present(links, self.locate_videos(schedule_id, links))
+
+    def _locate_embedded_videos(self, schedule_id, links):
+        return self.schedules.aggregate(embedded_videos_pipeline(schedule_id, links))
+
+    def _locate_normalized_videos(self, schedule_id, links):
+        return self.videos.find(
+            dict(links_filter(links), schedule_id=schedule_id),
+            dict(dict.fromkeys(VIDEO_STATE_FIELDS + ('day',), 1), _id=0)
+        )
+
+    def replace_days(self, schedule_id, first_changed, changed_days, fields, expected_updated_at):
+        """Replace every day from ``first_changed`` on and ``$set`` ``fields``.
+
+        Only the changed days are sent to MongoDB. A ``summary`` in ``fields``
+        is merged into the stored one so denormalised counters survive. The
+        write is skipped, returning False, if the schedule was modified since
+        ``expected_updated_at``.
+
+        In the normalized layout the new days' videos are written first,
+        tagged with a fresh ``generation`` that the new day headers carry;
+        readers only attach videos of a day's generation, so the switch is
+        atomic and the replaced videos are deleted afterwards.
+        """
+        schedule_id = ObjectId(schedule_id)
+        stored = self.schedules.find_one({'_id': schedule_id}, {'layout': 1})
+        if not stored:
+            return False
+        normalized = is_normalized(stored)
+
+        update = {key: {'$literal': value} for key, value in fields.items() if key != 'summary'}
+        if 'summary' in fields:
+            update['summary'] = {'$mergeObjects': ['$summary', {'$literal': fields['summary']}]}
+        update['updated_at'] = datetime.now()
+
+        changed_days = stored_days(changed_days, self.encoding)
+        new_days = changed_days
+        if normalized:
+            generation = ObjectId()
+            new_days = [dict(day_header(day, day['videos']), generation=generation) for day in changed_days]
+            videos = video_documents(schedule_id, changed_days, first_day=first_changed, generation=generation)
+            if videos:
+                self.videos.insert_many(videos, ordered=False)
+        schedule_data = {'$literal': new_days}
+        if first_changed:
+            schedule_data = {'$concatArrays': [{'$slice': ['$schedule_data', first_changed]}, schedule_data]}
+        update['schedule_data'] = schedule_data
+
+        result = self.schedules.update_one(
+            {'_id': schedule_id, 'updated_at': expected_updated_at},
+            [{'$set': update}]
+        )
+        if result.matched_count == 0:
+            if normalized:
+                self.videos.delete_many({'schedule_id': schedule_id, 'generation': generation})
+            return False
+
+        if normalized:
+            self.videos.delete_many({
+                'schedule_id': schedule_id,
+                'day': {'$gte': first_changed},
+                'generation': {'$ne': generation}
+            })
+        return True
+
+    def normalize(self, schedule_id):
+        """Move an embedded schedule's videos into the videos collection."""
+        schedule = self.schedules.find_one({'_id': ObjectId(schedule_id)})
+        if not schedule or is_normalized(schedule):
+            return False
+
+        schedule_id = schedule['_id']
+        # Clear leftovers from an interrupted run before copying
+        self.videos.delete_many({'schedule_id': schedule_id})
+        videos = video_documents(schedule_id, schedule['schedule_data'])
+        if videos:
+            self.videos.insert_many(videos, ordered=False)
+
+        result = self.schedules.update_one(
+            {'_id': schedule_id, 'updated_at': schedule['updated_at']},
+            {'$set': {
+                'layout': NORMALIZED,
+                'schedule_data': [day_header(day, day['videos']) for day in schedule['schedule_data']],
+                'summary.completedVideos': sum(1 for video in videos if video.get('completed'))
+            }}
+        )
+        if result.matched_count == 0:
+            # Progress was written meanwhile; leave the embedded copy authoritative
+            self.videos.delete_many({'schedule_id': schedule_id})
+            return False
+        return True
+
+    def embed(self, schedule_id):
+        """Move a normalized schedule's videos back into the schedule document."""
+        schedule = self.get(schedule_id)
+        if not schedule or 'layout' not in schedule:
+            return False
+
+        result = self.schedules.update_one(
+            {'_id': schedule['_id'], 'updated_at': schedule['updated_at']},
+            {'$set': {'schedule_data': stored_days(schedule['schedule_data'], self.encoding)}, '$unset': {'layout': ''}}
+        )
+        if result.matched_count == 0:
+            # Progress was written meanwhile; leave the normalized copy authoritative
+            return False
+        self.videos.delete_many({'schedule_id': schedule['_id']})
+        return True
+
+    def migrate(self, to_layout=NORMALIZED):
+        """Convert every schedule to ``to_layout``; returns (converted, skipped)."""
+        if to_layout == NORMALIZED:
+            query, convert = {'layout': {'$ne': NORMALIZED}}, self.normalize
+        else:
+            query, convert = {'layout': NORMALIZED}, self.embed
+
+        converted = skipped = 0
+        for schedule in self.schedules.find(query, {'_id': 1}):
+            if convert(schedule['_id']):
+                converted += 1
+            else:
+                skipped += 1
+        return converted, skipped
+
+
+class AsyncScheduleStore:
+    """ScheduleStore counterpart over an async driver (PyMongo's async API or Motor).
+
+    Covers the reads and progress writes served by the async app, with the
+    same layouts, encodings and update documents as ScheduleStore; indexes,
+    migrations and the adjust path stay on the sync store.
+    """
+
+    def __init__(self, schedules, videos, layout=EMBEDDED, encoding=COMPACT):
+        if layout not in (EMBEDDED, NORMALIZED):
+            raise ValueError(f"Unknown schedule storage layout: {layout}")
+        if encoding not in (FULL, COMPACT):
+            raise ValueError(f"Unknown schedule video encoding: {encoding}")
+        self.schedules = schedules
+        self.videos = videos
+        self.layout = layout
+        self.encoding = encoding
+
+    async def insert(self, schedule_doc):
+        """Insert a schedule given in the embedded shape and return its ID."""
+        count_completed(schedule_doc)
+        stored = stored_document(schedule_doc, self.encoding)
+        if self.layout == EMBEDDED:
+            return (await self.schedules.insert_one(stored)).inserted_id
+
+        schedule_id, header, videos = normalized_documents(stored)
+        try:
+            if videos:
+                await self.videos.insert_many(videos, ordered=False)
+            await self.schedules.insert_one(header)
+        except Exception:
+            await self.drop_orphaned_videos([schedule_id])
+            raise
+        return schedule_id
+
+    async def drop_orphaned_videos(self, schedule_ids):
+        stored = {schedule['_id'] async for schedule in self.schedules.find({'_id': {'$in': schedule_ids}}, {'_id': 1})}
+        orphaned = [schedule_id for schedule_id in schedule_ids if schedule_id not in stored]
+        if orphaned:
+            await self.videos.delete_many({'schedule_id': {'$in': orphaned}})
+
+    async def get(self, schedule_id, projection=None, expand=True):
+        """Load one schedule in the embedded shape; ``expand=False`` leaves compact video records as stored."""
+        schedule = await self.schedules.find_one({'_id': ObjectId(schedule_id)}, projection)
+        if schedule:
+            await self.hydrate([schedule], expand)
+        return schedule
+
+    async def hydrate(self, schedules, expand=True):
+        """Attach videos to normalized schedules, with one query for the batch, and expand compact videos, in place."""
+        normalized = {
+            schedule['_id']: schedule
+            for schedule in schedules
+            if is_normalized(schedule) and 'schedule_data' in schedule
+        }
+        if normalized:
+            cursor = self.videos.find({'schedule_id': {'$in': list(normalized)}}).sort(VIDEO_ORDER)
+            attach_videos(normalized, await cursor.to_list(length=None))
+        if expand:
+            expand_schedules(schedules)
+        return schedules
+
+    async def delete(self, schedule_id):
+        schedule_id = ObjectId(schedule_id)
+        await self.schedules.delete_one({'_id': schedule_id})
+        await self.videos.delete_many({'schedule_id': schedule_id})
+
+    async def set_videos_completed(self, schedule_id, updates):
+        """Apply ``{link: completed}`` flags in one write; see ScheduleStore.set_videos_completed."""
+        schedule_id = ObjectId(schedule_id)
+        setters = [self._set_embedded_completed, self._set_normalized_completed]
+        if self.layout == NORMALIZED:
+            setters.reverse()
+        for setter in setters:
+            if await setter(schedule_id, updates):
+                return True
+        return False
+
+    async def _set_embedded_completed(self, schedule_id, updates):
+        result = await self.schedules.update_one(
+            dict(links_filter(updates, prefix='schedule_data.videos.'), _id=schedule_id),
+            embedded_completed_update(updates)
+        )
+        return result.matched_count > 0
+
+    async def _set_normalized_completed(self, schedule_id, updates):
+        result = await self.videos.bulk_write(normalized_completed_operations(schedule_id, updates), ordered=False)
+        if result.matched_count == 0 and not await self.videos.find_one(
+            dict(links_filter(updates), schedule_id=schedule_id), {'_id': 1}
+        ):
+            return False
+        completed = await self.videos.count_documents({'schedule_id': schedule_id, 'completed': True})
+        await self.schedules.update_one(
+            {'_id': schedule_id},
+            {'$set': {'updated_at': datetime.now(), 'summary.completedVideos': completed}}
+        )
+        return True
+
+    async def locate_videos(self, schedule_id, links):
+        """The schedule's videos among ``links``; see ScheduleStore.locate_videos."""
+        schedule_id = ObjectId(schedule_id)
+        finders = [self._locate_embedded_videos, self._locate_normalized_videos]
+        if self.layout == NORMALIZED:
+            finders.reverse()
+        for finder in finders:
+            videos = await finder(schedule_id, links)
+            if videos:
+                return videos
+        return []
+
+    async def present_links(self, schedule_id, links):
+        """The subset of ``links`` whose videos are in the schedule; see ScheduleStore.present_links."""
+        return links_present(links, await self.locate_videos(schedule_id, links))
+
+    async def _locate_embedded_videos(self, schedule_id, links):
+        # Motor's aggregate returns the cursor directly, PyMongo's async API a coroutine
+        cursor = self.schedules.aggregate(embedded_videos_pipeline(schedule_id, links))
+        if asyncio.iscoroutine(cursor):
+            cursor = await cursor
+        return await cursor.to_list(length=None)
+
+    async def _locate_normalized_videos(self, schedule_id, links):
+        cursor = self.videos.find(
+            dict(links_filter(links), schedule_id=schedule_id),
+            dict(dict.fromkeys(VIDEO_STATE_FIELDS + ('day',), 1), _id=0)
+        )
+        return await cursor.to_list(length=None)
+
+
+if __name__ == '__main__':
+    # Usage: python storage.py [normalized|embedded]
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    target = sys.argv[1] if len(sys.argv) > 1 else NORMALIZED
+    db = MongoClient(os.getenv('MONGODB_URI'))[os.getenv('DB_NAME', 'your_database_name')]
+    store = ScheduleStore(db.schedules, db.schedule_videos, layout=target)
+    store.ensure_indexes()
+    converted, skipped = store.migrate(target)
+    print(f"Migrated {converted} schedules to the {target} layout ({skipped} skipped, rerun to retry)")
@@ -0,0 +1,8 @@
+# conftest.py
+#
+# Tests import the backend modules the way app.py does, from backend/.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,152 @@
+# test_fetcher.py
+#
+# FetchEngine against the fake playlist source: retries, per-host limits,
+# deadlines and the FetchReport counters.
+
+import threading
+import time
+
+import pytest
+
+import fetcher
+import model
+from benchmarks.fixtures import FakePlaylist, FakeYouTube, register_playlist
+from fetcher import FetchEngine, FetchReport, FetchTimeout, RateLimiter
+
+@pytest.fixture(autouse=True)
+def fake_youtube(monkeypatch):
+    """Serve model.py's playlist and video lookups from the synthetic playlists."""
+    monkeypatch.setattr(model, 'open_playlist', FakePlaylist)
+    monkeypatch.setattr(model, 'open_video', FakeYouTube)
+
+
+class FlakySource:
+    """fetch_one over the fake source that fails each URL ``failures`` times first."""
+
+    def __init__(self, failures=0, delay=0.0, error=ConnectionError):
+        self.failures = failures
+        self.delay = delay
+        self.error = error
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            attempt = self.attempts[url] = self.attempts.get(url, 0) + 1
+        if self.delay:
+            time.sleep(self.delay)
+        if attempt <= self.failures:
+            raise self.error(f"transient failure {attempt} for {url}")
+        return model.fetch_video_by_url(url)
+
+
+def video_urls(playlist_id, count):
+    register_playlist(playlist_id, count)
+    return list(model.open_playlist(f"https://www.youtube.com/playlist?list={playlist_id}").video_urls)
+
+
+@pytest.fixture
+def engine():
+    engine = FetchEngine(max_workers=4, max_retries=2, backoff_base=0)
+    yield engine
+    engine.shutdown()
+
+
+def test_fetches_every_video_in_order(engine):
+    urls = video_urls('PLtestOrder', 20)
+    results, report = engine.fetch_all(urls, FlakySource())
+
+    assert [video['link'].split('v=')[1] for video in results] == [url.split('v=')[1] for url in urls]
+    assert report.to_dict() == {'total': 20, 'fetched': 20, 'retried': 0, 'dropped': 0, 'expired': 0}
+
+
+def test_retries_transient_errors(engine):
+    urls = video_urls('PLtestRetry', 10)
+    source = FlakySource(failures=2)
+    results, report = engine.fetch_all(urls, source)
+
+    assert all(video is not None for video in results)
+    assert set(source.attempts.values()) == {3}
+    # A video counts as retried once, however many attempts it took
+    assert (report.fetched, report.retried, report.dropped) == (10, 10, 0)
+
+
+def test_drops_videos_that_keep_failing(engine):
+    urls = video_urls('PLtestDrop', 5)
+    source = FlakySource(failures=3)
+    results, report = engine.fetch_all(urls, source)
+
+    assert results == [None] * 5
+    assert set(source.attempts.values()) == {engine.max_retries + 1}
+    assert (report.fetched, report.retried, report.dropped, report.expired) == (0, 5, 5, 0)
+    assert engine.totals.dropped == 5
+
+
+def test_deadline_drops_unfinished_videos():
+    engine = FetchEngine(max_workers=1, backoff_base=0)
+    try:
+        urls = video_urls('PLtestDeadline', 6)
+        results, report = engine.fetch_all(urls, FlakySource(delay=0.1), timeout=0.25)
+    finally:
+        engine.shutdown()
+
+    assert results[0] is not None
+    assert results[-1] is None
+    assert report.expired == report.dropped == results.count(None)
+    assert report.fetched + report.dropped == report.total == 6
+
+
+def test_playlist_past_deadline_raises_instead_of_truncating(monkeypatch):
+    engine = FetchEngine(max_workers=1, backoff_base=0)
+    register_playlist('PLtestTimeout', 6)
+    fetch = model.fetch_video_by_url
+
+    def slow(url):
+        time.sleep(0.1)
+        return fetch(url)
+
+    monkeypatch.setattr(model, 'fetch_video_by_url', slow)
+    try:
+        with pytest.raises(FetchTimeout) as raised:
+            model.fetch_playlist_details(
+                'https://www.youtube.com/playlist?list=PLtestTimeout', engine=engine, timeout=0.25
+            )
+    finally:
+        engine.shutdown()
+
+    assert 0 < raised.value.report.expired < 6
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = RateLimiter(20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        assert limiter.acquire('youtube.com')
+    # The first token is the burst, the other four wait 1/20 s each
+    assert time.monotonic() - start >= 0.18
+    # Another host has its own bucket
+    assert limiter.acquire('img.youtube.com')
+
+
+def test_rate_limiter_gives_up_at_deadline():
+    limiter = RateLimiter(1, burst=1)
+    assert limiter.acquire('youtube.com')
+    assert not limiter.acquire('youtube.com', deadline=time.monotonic() + 0.1)
+
+
+def test_report_ignores_late_results():
+    report = FetchReport(total=2)
+    report.add(fetched=1)
+    report.close()
+    report.add(fetched=1, expired=1)
+    assert report.to_dict() == {'total': 2, 'fetched': 1, 'retried': 0, 'dropped': 0, 'expired': 0}
+
+
+def test_default_engine_has_no_rate_limit_or_deadline(monkeypatch):
+    monkeypatch.delenv('FETCH_RATE_PER_HOST', raising=False)
+    monkeypatch.delenv('FETCH_DEADLINE_SECONDS', raising=False)
+    monkeypatch.setattr(fetcher, '_default_engine_pid', None)
+    engine = fetcher.get_fetch_engine()
+
+    assert engine.rate_limiter.rate == 0
+    assert engine.default_timeout is None
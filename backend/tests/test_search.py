@@ -0,0 +1,48 @@
+# test_search.py
+#
+# Title lookups over stored schedules, including day-based ones padded with
+# revision days.
+
+import pytest
+
+from benchmarks.fixtures import load_app, register_playlist
+from search import TitleIndex
+
+app = load_app()
+pytestmark = pytest.mark.skipif(app is None, reason="mongomock/flask not installed")
+
+
+@pytest.fixture
+def revision_schedule():
+    """A 10-day schedule for a 3-video playlist, so most days are revision days."""
+    client = app.app.test_client()
+    response = client.post('/api/schedule', json={
+        'userId': '0' * 24,
+        'playlistUrl': register_playlist('PLtestRevision', 3),
+        'scheduleType': 'dayBased',
+        'targetDays': 10
+    })
+    assert response.status_code == 200, response.get_json()
+    return client, response.get_json()['scheduleId']
+
+
+def test_index_skips_revision_placeholders(revision_schedule):
+    _, schedule_id = revision_schedule
+    schedule = app.get_schedule_store().get(schedule_id)
+    assert any(video['link'] is None for day in schedule['schedule_data'] for video in day['videos'])
+
+    index = TitleIndex(schedule['schedule_data'])
+    assert len(index.by_id) == 3
+
+
+def test_verify_video_on_schedule_with_revision_days(revision_schedule):
+    client, schedule_id = revision_schedule
+    schedule = app.get_schedule_store().get(schedule_id)
+    title = schedule['schedule_data'][0]['videos'][0]['title']
+
+    response = client.post(f'/api/schedules/{schedule_id}/verify-video', json={'videoTitle': title})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['exists'] is True
+
+    response = client.post(f'/api/schedules/{schedule_id}/verify-video', json={'videoTitle': 'No such video'})
+    assert response.get_json()['exists'] is False
@@ -0,0 +1,60 @@
+# test_startup.py
+#
+# Cold start in a fresh interpreter: importing model.py never reaches for
+# pytubefix or a Google SDK, and the first request still works once the lazy
+# providers load. Attempted imports are recorded, so the check holds whether
+# or not those packages are installed.
+
+import pytest
+
+from benchmarks.bench_startup import run_fresh
+
+RECORD_IMPORTS = """
+import json, sys
+
+class RecordHeavyImports:
+    attempted = []
+
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in ('pytubefix', 'google'):
+            self.attempted.append(name)
+        return None
+
+recorder = RecordHeavyImports()
+sys.meta_path.insert(0, recorder)
+"""
+
+IMPORT_MODEL = RECORD_IMPORTS + """
+import model
+print(json.dumps(recorder.attempted))
+"""
+
+FIRST_REQUEST = RECORD_IMPORTS + """
+from benchmarks.fixtures import load_app, register_playlist
+app = load_app()
+if app is None:
+    print(json.dumps(None))
+    sys.exit()
+imported = list(recorder.attempted)
+response = app.app.test_client().post('/api/schedule', json={
+    'userId': '0' * 24,
+    'playlistUrl': register_playlist('PLstartup', 20),
+    'scheduleType': 'daily',
+    'dailyHours': 2
+})
+print(json.dumps({'imported': imported, 'status': response.status_code, 'days': len(response.get_json()['schedule'])}))
+"""
+
+
+def test_import_model_skips_heavy_sdks():
+    assert run_fresh(IMPORT_MODEL) == []
+
+
+def test_first_request_goes_through_lazy_providers():
+    result = run_fresh(FIRST_REQUEST)
+    if result is None:
+        pytest.skip('mongomock or the app dependencies are not installed')
+
+    assert result['imported'] == []
+    assert result['status'] == 200
+    assert result['days'] > 0